@@ -22,9 +22,9 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = 'bcy%*=fh(9h(i^&*v9t%dqsmtszscv0e&0acx45)30y_1apz7('
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = ['192.168.1.4']
+ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', '192.168.1.4').split(',')
 
 # Application definition
 
@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,16 +74,51 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'app.wsgi.application'
 
+# Server started by `manage.py serve`: 'gunicorn' for production or
+# 'runserver' for development. WORKERS processes with THREADS threads each
+# serve requests; a request taking longer than TIMEOUT seconds gets its
+# worker restarted, and idle keep-alive connections are closed after
+# KEEPALIVE seconds. Workers are recycled after MAX_REQUESTS requests (0
+# never recycles them).
+
+WEB_SERVER = {
+    'SERVER': os.environ.get('WEB_SERVER', 'gunicorn'),
+    'BIND': os.environ.get('WEB_BIND', '0.0.0.0:8000'),
+    'WORKERS': int(os.environ.get('WEB_WORKERS', 2 * os.cpu_count() + 1)),
+    'THREADS': int(os.environ.get('WEB_THREADS', 4)),
+    'TIMEOUT': int(os.environ.get('WEB_TIMEOUT', 30)),
+    'GRACEFUL_TIMEOUT': int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30)),
+    'KEEPALIVE': int(os.environ.get('WEB_KEEPALIVE', 5)),
+    'MAX_REQUESTS': int(os.environ.get('WEB_MAX_REQUESTS', 0)),
+}
+
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# DB_CONN_MAX_AGE keeps connections open between requests for that many
+# seconds (0 closes them after every request, 'none' never closes them) and
+# DB_CONN_HEALTH_CHECKS makes sure a kept connection still works before it is
+# reused. DB_POOL_MAX_SIZE > 0 enables a pool of connections per process for
+# threaded servers; connections are then handed back to the pool at the end
+# of every request, so DB_CONN_MAX_AGE should stay 0.
+
+DB_CONN_MAX_AGE = os.environ.get('DB_CONN_MAX_AGE', '0')
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 0))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': None if DB_CONN_MAX_AGE.lower() == 'none'
+        else int(DB_CONN_MAX_AGE),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'MAX_SIZE': DB_POOL_MAX_SIZE,
+        } if DB_POOL_MAX_SIZE else None,
     }
 }
 
@@ -126,3 +163,138 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 
 AUTH_USER_MODEL = 'core.User'
+
+TEST_RUNNER = 'app.test_runner.TestRunner'
+
+# Limits of uploaded images, enforced while the upload is being received.
+
+IMAGE_UPLOAD = {
+    'MAX_BYTES': int(os.environ.get('IMAGE_UPLOAD_MAX_BYTES', 10 * 1024 ** 2)),
+    'MAX_PIXELS': int(os.environ.get('IMAGE_UPLOAD_MAX_PIXELS', 50 * 10 ** 6)),
+}
+
+# Number of worker processes rendering the thumbnails of uploaded images in
+# the background. With 0 they are rendered during the upload request.
+
+IMAGE_DERIVATIVES = {
+    'WORKERS': int(os.environ.get('IMAGE_DERIVATIVE_WORKERS', 2)),
+}
+
+# Caches
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+# The file based caches are kept under CACHE_ROOT, next to the media of the
+# project. Tests keep them in a temporary directory, see app.test_runner.
+
+CACHE_ROOT = os.environ.get('CACHE_ROOT', '/vol/web/cache')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared by the processes of a host, which all have to see the same
+    # invalidations. The file based backend lists its directory on every
+    # write to cull it, so the number of entries is kept small; a shared
+    # backend like memcached suits larger caches.
+    'responses': {
+        'BACKEND': os.environ.get(
+            'RESPONSE_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.environ.get(
+            'RESPONSE_CACHE_LOCATION', os.path.join(CACHE_ROOT, 'responses')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1000)
+            ),
+        },
+    },
+    # Token lookups, shared likewise so every process sees the tokens and
+    # users made invalid.
+    'tokens': {
+        'BACKEND': os.environ.get(
+            'TOKEN_AUTH_CACHE_DJANGO_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.environ.get(
+            'TOKEN_AUTH_CACHE_LOCATION', os.path.join(CACHE_ROOT, 'tokens')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.environ.get('TOKEN_AUTH_CACHE_MAX_ENTRIES', 10000)
+            ),
+        },
+    },
+}
+
+# Retention of the change log of the sync endpoint, whose entries older than
+# RETENTION_DAYS are pruned by the prune_change_log command. Change tokens
+# from before the last pruning are answered 410 Gone, so clients have to
+# sync at least once every RETENTION_DAYS days to go on from their token.
+
+CHANGE_LOG = {
+    'RETENTION_DAYS': int(os.environ.get('CHANGE_LOG_RETENTION_DAYS', 30)),
+}
+
+# Cache of the recipe list and detail responses of every user. A TIMEOUT of
+# 0 disables it.
+
+RESPONSE_CACHE = {
+    'CACHE_ALIAS': 'responses',
+    'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300)),
+}
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+# The JSON renderer and parser use orjson when it is installed, and the json
+# module otherwise, with the same output.
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'user.authentication.CachedTokenAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'recipe.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
+}
+
+# Timing of the requests, off by default. When ENABLED every response gets a
+# Server-Timing header with the time spent in database queries, serializers,
+# rendering and the rest of the view, unless SERVER_TIMING is off, and the
+# totals per view of each process are served in the Prometheus text format at
+# /metrics/, to staff users and to the addresses of METRICS_ALLOWED_IPS (comma
+# separated).
+# Requests taking more than SLOW_REQUEST_MS milliseconds are logged with
+# their SQL (0 logs none).
+
+REQUEST_TIMING = {
+    'ENABLED': os.environ.get('REQUEST_TIMING', '0') == '1',
+    'SERVER_TIMING': os.environ.get('REQUEST_TIMING_HEADER', '1') == '1',
+    'SLOW_REQUEST_MS': int(os.environ.get('SLOW_REQUEST_MS', 0)),
+    'METRICS_ALLOWED_IPS': [
+        ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip
+    ],
+}
+
+# Cache of token authentication lookups. BACKEND is either 'django', the
+# CACHE_ALIAS cache of the Django cache framework which is shared by all
+# processes using the same cache, or 'local', an LRU cache inside each
+# process. The invalidation of a deleted token or of a saved user only
+# reaches the process making the change, so with 'local' the other processes
+# keep authenticating them for up to TIMEOUT seconds: it only suits a single
+# process.
+
+TOKEN_AUTH_CACHE = {
+    'BACKEND': os.environ.get('TOKEN_AUTH_CACHE_BACKEND', 'django'),
+    'TIMEOUT': int(os.environ.get('TOKEN_AUTH_CACHE_TIMEOUT', 300)),
+    'MAX_ENTRIES': int(os.environ.get('TOKEN_AUTH_CACHE_MAX_ENTRIES', 10000)),
+    'CACHE_ALIAS': 'tokens',
+}
@@ -0,0 +1,31 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+FILE_BASED_CACHE = 'django.core.cache.backends.filebased.FileBasedCache'
+
+
+class TestRunner(DiscoverRunner):
+    """Test runner keeping the file based caches in a temporary directory,
+    rather than in the one shared with the servers and other test runs."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_root = tempfile.mkdtemp(prefix='recipe-app-caches-')
+        caches = {}
+        for alias, config in settings.CACHES.items():
+            if config['BACKEND'] == FILE_BASED_CACHE:
+                location = os.path.join(self.cache_root, alias)
+                config = {**config, 'LOCATION': location}
+            caches[alias] = config
+        self.caches_override = override_settings(CACHES=caches)
+        self.caches_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.caches_override.disable()
+        shutil.rmtree(self.cache_root)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,123 @@
+import os
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import pool as psycopg2_pool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def close_pools():
+    """Close all the connections of the pools of this process."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """The PostgreSQL backend with two additions, configured through extra
+    keys of the database settings:
+
+    CONN_HEALTH_CHECKS: when true, a persistent connection is checked with
+        a `SELECT 1` before its first use in a request and replaced if the
+        server dropped it, instead of failing the request.
+    POOL: a `{'MIN_SIZE': ..., 'MAX_SIZE': ...}` dict. When given, the
+        connections are taken from a pool shared by the threads of the
+        process and handed back to it instead of being closed. MAX_SIZE
+        must be at least the number of threads serving requests.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_enabled = self.settings_dict.get(
+            'CONN_HEALTH_CHECKS', False
+        )
+        self.health_check_done = False
+        self._pool = None
+
+    def get_pool(self, conn_params):
+        pool_settings = self.settings_dict.get('POOL')
+        if not pool_settings:
+            return None
+
+        # The pool belongs to the process: workers forked from a parent that
+        # already opened connections must not share its sockets.
+        key = (os.getpid(), tuple(sorted(conn_params.items())))
+        with _pools_lock:
+            if key not in _pools:
+                _pools[key] = psycopg2_pool.ThreadedConnectionPool(
+                    pool_settings.get('MIN_SIZE', 1),
+                    pool_settings['MAX_SIZE'],
+                    **conn_params
+                )
+            return _pools[key]
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        # Checked out connections never have a transaction open, the pool
+        # rolls them back when they are handed back.
+        connection = pool.getconn()
+        connection.autocommit = True
+        while self.health_check_enabled and \
+                not self.connection_is_usable(connection):
+            pool.putconn(connection, close=True)
+            connection = pool.getconn()
+            connection.autocommit = True
+
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        self._pool = pool
+        return connection
+
+    def _close(self):
+        pool, self._pool = self._pool, None
+        if pool is None or self.connection is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            # Connections that saw errors are not trusted for other requests.
+            pool.putconn(self.connection, close=self.errors_occurred)
+
+    def connection_is_usable(self, connection):
+        try:
+            connection.cursor().execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        else:
+            return True
+
+    def is_usable(self):
+        return self.connection_is_usable(self.connection)
+
+    def connect(self):
+        # A new connection needs no check, and connect() itself goes through
+        # ensure_connection() while setting up the connection.
+        self.health_check_done = True
+        super().connect()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Called when a request starts and finishes; the connection kept for
+        # the next request is checked again before that request uses it.
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if self.health_check_enabled and not self.health_check_done and \
+                self.connection is not None and not self.in_atomic_block:
+            self.health_check_done = True
+            if not self.is_usable():
+                # Flagged so a pooled connection is discarded, not reused.
+                self.errors_occurred = True
+                self.close()
+        super().ensure_connection()
@@ -0,0 +1,45 @@
+"""Rendering of the smaller versions of uploaded images.
+
+This module only depends on Pillow so it can be imported by the worker
+processes of `core.tasks` without setting up Django.
+"""
+import io
+
+from PIL import Image as PILImage, features
+
+# (field name, bounding box, format) of every derivative of an image.
+DERIVATIVES = (
+    ('thumbnail', (200, 200), 'JPEG'),
+    ('medium', (800, 800), 'JPEG'),
+    ('webp', (1600, 1600), 'WEBP'),
+)
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+def render_derivatives(source_path):
+    """Return a `{field name: (extension, encoded bytes)}` dict holding the
+    derivatives of the image stored at `source_path`.
+    """
+    largest_box = max(box for _, box, _ in DERIVATIVES)
+    with PILImage.open(source_path) as original:
+        # JPEGs can be decoded straight at a reduced scale, which is much
+        # cheaper than decoding the full bitmap and resizing it afterwards.
+        original.draft('RGB', largest_box)
+        has_alpha = 'A' in original.getbands() or \
+            'transparency' in original.info
+        image = original.convert('RGBA' if has_alpha else 'RGB')
+
+    derivatives = {}
+    for name, box, image_format in DERIVATIVES:
+        if image_format == 'WEBP' and not features.check('webp'):
+            continue
+        resized = image.copy()
+        resized.thumbnail(box, PILImage.LANCZOS)
+        if image_format == 'JPEG' and resized.mode != 'RGB':
+            resized = resized.convert('RGB')
+
+        output = io.BytesIO()
+        resized.save(output, image_format, quality=85, optimize=True)
+        derivatives[name] = (EXTENSIONS[image_format], output.getvalue())
+    return derivatives
@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.db.backends.postgresql.base import close_pools
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the cost of simulated requests running one query when every '
+        'request opens its own connection, when connections persist and when '
+        'they come from a pool.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        self.wrapper_class = connections[options['database']].__class__
+        settings_dict = connections[options['database']].settings_dict
+        modes = (
+            ('New connection per request', {'CONN_MAX_AGE': 0, 'POOL': None}),
+            ('Persistent connections', {'CONN_MAX_AGE': None, 'POOL': None}),
+            (
+                'Pooled connections',
+                {
+                    'CONN_MAX_AGE': 0,
+                    'POOL': {'MIN_SIZE': 1, 'MAX_SIZE': options['threads']},
+                }
+            ),
+        )
+
+        self.stdout.write(
+            f'{options["requests"]} requests on {options["threads"]} threads'
+        )
+        for name, overrides in modes:
+            elapsed = self.run_mode(
+                {**settings_dict, **overrides},
+                options['requests'],
+                options['threads']
+            )
+            per_request = elapsed / options['requests'] * 1000
+            self.stdout.write(
+                f'{name:<28} {options["requests"] / elapsed:>9.1f} req/s '
+                f'{per_request:>8.3f} ms/request'
+            )
+
+    def run_mode(self, settings_dict, requests, threads):
+        def worker(count):
+            wrapper = self.wrapper_class(settings_dict, alias='benchmark')
+            try:
+                for _ in range(count):
+                    # What the request_started and request_finished signals
+                    # do around every request.
+                    wrapper.close_if_unusable_or_obsolete()
+                    with wrapper.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                    wrapper.close_if_unusable_or_obsolete()
+            finally:
+                wrapper.close()
+
+        counts = [requests // threads] * threads
+        counts[0] += requests % threads
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(worker, counts))
+        elapsed = time.perf_counter() - start
+        close_pools()
+        return elapsed
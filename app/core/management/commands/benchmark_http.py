@@ -0,0 +1,77 @@
+import http.client
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.metrics import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the throughput and latency of a running server by sending '
+        'concurrent GET requests over keep-alive connections, e.g. to '
+        'compare `manage.py serve` with runserver and with gunicorn.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--token',
+            help='Token sent in the Authorization header.'
+        )
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme not in ('http', 'https'):
+            raise CommandError('Only http and https URLs are supported.')
+        path = url.path + (f'?{url.query}' if url.query else '')
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+
+        def client(count):
+            connection_class = http.client.HTTPSConnection \
+                if url.scheme == 'https' else http.client.HTTPConnection
+            connection = connection_class(url.netloc, timeout=60)
+            latencies, errors = [], 0
+            try:
+                for _ in range(count):
+                    start = time.perf_counter()
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    latencies.append(time.perf_counter() - start)
+                    if response.status >= 400:
+                        errors += 1
+                    if response.getheader('Connection') == 'close':
+                        connection.close()
+            finally:
+                connection.close()
+            return latencies, errors
+
+        concurrency = options['concurrency']
+        counts = [options['requests'] // concurrency] * concurrency
+        counts[0] += options['requests'] % concurrency
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(client, counts))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(
+            latency for client_latencies, _ in results
+            for latency in client_latencies
+        )
+        errors = sum(client_errors for _, client_errors in results)
+        self.stdout.write(
+            f'{len(latencies)} requests, {concurrency} concurrent clients, '
+            f'{errors} errors\n'
+            f'Throughput: {len(latencies) / elapsed:.1f} req/s\n'
+            f'Latency p50: {percentile(latencies, 0.50) * 1000:.2f} ms, '
+            f'p95: {percentile(latencies, 0.95) * 1000:.2f} ms, '
+            f'p99: {percentile(latencies, 0.99) * 1000:.2f} ms'
+        )
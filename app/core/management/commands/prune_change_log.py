@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete the entries of the change log of the sync endpoint older '
+        'than the retention, keeping the last entry of every existing '
+        'object. Change tokens from before the pruned entries are answered '
+        '410 Gone afterwards, so clients have to sync at least once per '
+        'retention period. Meant to be run daily.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.CHANGE_LOG['RETENTION_DAYS'],
+            help='Number of days of changes kept, CHANGE_LOG_RETENTION_DAYS '
+                 'by default.'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('The number of days must be positive.')
+
+        before = timezone.now() - timedelta(days=options['days'])
+        deleted = ChangeLog.objects.prune(before)
+        self.stdout.write(
+            f'Deleted {deleted} change log entries logged before {before}.'
+        )
@@ -0,0 +1,30 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import ChangeLog, Ingredient, Tag
+from core.signals import record_changes
+
+
+class Command(BaseCommand):
+    help = (
+        'Count the recipes of every tag and ingredient again, fixing the '
+        'recipe counts which went wrong, e.g. after changing the recipe '
+        'relations with raw SQL.'
+    )
+
+    def handle(self, *args, **options):
+        for model in (Tag, Ingredient):
+            with transaction.atomic():
+                fixed = model.objects.rebuild_recipe_counts()
+                pks_by_user = defaultdict(list)
+                for user_id, pk in fixed:
+                    pks_by_user[user_id].append(pk)
+                for user_id, pks in pks_by_user.items():
+                    record_changes(user_id, model, pks, ChangeLog.UPDATED)
+
+            name = model._meta.verbose_name_plural
+            self.stdout.write(
+                f'Fixed the recipe counts of {len(fixed)} {name}.'
+            )
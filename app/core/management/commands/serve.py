@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from gunicorn.app.base import BaseApplication
+
+
+class WSGIServer(BaseApplication):
+    """Runs a WSGI application under gunicorn with the given settings."""
+
+    def __init__(self, application, options):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve the application with the server selected by the WEB_SERVER '
+        'setting: "gunicorn" runs app.wsgi under a pre-forking, threaded '
+        'server, "runserver" runs the development server. Send SIGHUP to '
+        'the gunicorn master process to reload the workers gracefully.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bind',
+            default=settings.WEB_SERVER['BIND'],
+            help='The address:port to listen on.'
+        )
+
+    def handle(self, *args, **options):
+        config = settings.WEB_SERVER
+        if config['SERVER'] == 'runserver':
+            call_command('runserver', options['bind'])
+            return
+
+        # Connections opened by the master would be shared by every forked
+        # worker.
+        connections.close_all()
+
+        from app.wsgi import application
+        WSGIServer(application, {
+            'bind': options['bind'],
+            'workers': config['WORKERS'],
+            'threads': config['THREADS'],
+            'worker_class': 'gthread' if config['THREADS'] > 1 else 'sync',
+            'timeout': config['TIMEOUT'],
+            'graceful_timeout': config['GRACEFUL_TIMEOUT'],
+            'keepalive': config['KEEPALIVE'],
+            'max_requests': config['MAX_REQUESTS'],
+            'max_requests_jitter': config['MAX_REQUESTS'] // 10,
+            'accesslog': '-',
+        }).run()
@@ -0,0 +1,130 @@
+import threading
+from collections import defaultdict
+
+# Upper bounds of the buckets of the request duration histogram, in seconds.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def format_labels(**labels):
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"')
+         .replace('\n', r'\n'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def percentile(sorted_values, fraction):
+    """Return the value below which a fraction of sorted values fall."""
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class EndpointMetrics:
+    """Totals of the requests served by one view for one method."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+        self.db_duration = 0
+        self.db_queries = 0
+        self.serialize_duration = 0
+        self.render_duration = 0
+        self.response_bytes = 0
+        # Cumulative, like the buckets of Prometheus histograms.
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+
+class RequestMetrics:
+    """Totals of the requests served by this process, by endpoint, rendered
+    in the Prometheus text format.
+
+    Every process keeps its own totals, so with several workers each scrape
+    only sees the requests of the worker which answers it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = defaultdict(EndpointMetrics)
+        self._statuses = defaultdict(int)
+
+    def observe(self, view, method, status, timing, response_bytes=None):
+        with self._lock:
+            self._statuses[view, method, status] += 1
+            endpoint = self._endpoints[view, method]
+            endpoint.count += 1
+            endpoint.duration += timing.duration
+            endpoint.db_duration += timing.db_duration
+            endpoint.db_queries += timing.db_queries
+            endpoint.serialize_duration += timing.serialize_duration
+            endpoint.render_duration += timing.render_duration
+            endpoint.response_bytes += response_bytes or 0
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if timing.duration <= bound:
+                    endpoint.buckets[index] += 1
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._statuses.clear()
+
+    def render(self):
+        with self._lock:
+            statuses = sorted(self._statuses.items())
+            endpoints = sorted(
+                (key, vars(endpoint).copy())
+                for key, endpoint in self._endpoints.items()
+            )
+
+        lines = [
+            '# HELP http_requests_total Requests served, by view, method '
+            'and status code.',
+            '# TYPE http_requests_total counter',
+        ]
+        lines.extend(
+            f'http_requests_total'
+            f'{format_labels(view=view, method=method, status=status)} {count}'
+            for (view, method, status), count in statuses
+        )
+
+        lines.extend((
+            '# HELP http_request_duration_seconds Time to serve requests.',
+            '# TYPE http_request_duration_seconds histogram',
+        ))
+        for (view, method), endpoint in endpoints:
+            for bound, count in zip(DURATION_BUCKETS + ('+Inf',),
+                                    endpoint['buckets'] + [endpoint['count']]):
+                labels = format_labels(view=view, method=method, le=bound)
+                lines.append(f'http_request_duration_seconds_bucket{labels} '
+                             f'{count}')
+            labels = format_labels(view=view, method=method)
+            lines.append(f'http_request_duration_seconds_sum{labels} '
+                         f'{endpoint["duration"]}')
+            lines.append(f'http_request_duration_seconds_count{labels} '
+                         f'{endpoint["count"]}')
+
+        totals = (
+            ('http_request_db_duration_seconds_total', 'db_duration',
+             'Time spent in database queries.'),
+            ('http_request_db_queries_total', 'db_queries',
+             'Database queries run.'),
+            ('http_request_serialize_duration_seconds_total',
+             'serialize_duration',
+             'Time spent representing response data with serializers.'),
+            ('http_request_render_duration_seconds_total', 'render_duration',
+             'Time spent rendering responses.'),
+            ('http_response_size_bytes_total', 'response_bytes',
+             'Size of the response bodies, streamed ones excepted.'),
+        )
+        for name, attribute, description in totals:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} counter')
+            lines.extend(
+                f'{name}{format_labels(view=view, method=method)} '
+                f'{endpoint[attribute]}'
+                for (view, method), endpoint in endpoints
+            )
+        return '\n'.join(lines) + '\n'
+
+
+REQUEST_METRICS = RequestMetrics()
@@ -0,0 +1,147 @@
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import REQUEST_METRICS
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTiming:
+    """The time spent serving a request, in its database queries, in
+    representing its data with serializers and in rendering its response, in
+    seconds.
+
+    It is installed as an execute wrapper of the database connections for
+    the duration of the request.
+    """
+
+    def __init__(self, keep_queries=False):
+        self.start = time.perf_counter()
+        self.duration = 0
+        self.db_duration = 0
+        self.db_queries = 0
+        self.serialize_duration = 0
+        self.render_duration = 0
+        # The SQL and duration of every query, for the slow request log.
+        self.queries = [] if keep_queries else None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.db_duration += duration
+            self.db_queries += 1
+            if self.queries is not None:
+                self.queries.append((sql, duration))
+
+    def stop(self):
+        self.duration = time.perf_counter() - self.start
+
+    def get_server_timing(self):
+        """Return the value of the Server-Timing header, in milliseconds."""
+        app_duration = self.duration - self.db_duration - \
+            self.serialize_duration - self.render_duration
+        return ', '.join((
+            f'db;dur={self.db_duration * 1000:.1f};'
+            f'desc="{self.db_queries} queries"',
+            f'serialize;dur={self.serialize_duration * 1000:.1f}',
+            f'render;dur={self.render_duration * 1000:.1f}',
+            f'app;dur={app_duration * 1000:.1f}',
+            f'total;dur={self.duration * 1000:.1f}',
+        ))
+
+
+@contextmanager
+def timed_serialization(request):
+    """Add the time spent in the block, its database queries excepted, to
+    the serialize duration of the request, when requests are timed."""
+    timing = getattr(request, 'timing', None)
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    db_start = timing.db_duration
+    try:
+        yield
+    finally:
+        timing.serialize_duration += time.perf_counter() - start - (
+            timing.db_duration - db_start
+        )
+
+
+class RequestTimingMiddleware:
+    """Time every request, its database queries, the serialization and the
+    rendering of its response, and add them to the REQUEST_METRICS of the
+    process.
+
+    The timings are sent in a Server-Timing header, and requests slower than
+    SLOW_REQUEST_MS are logged with their SQL. Unless REQUEST_TIMING is
+    enabled the middleware is left out of the request handling altogether.
+    """
+
+    def __init__(self, get_response):
+        options = settings.REQUEST_TIMING
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = options['SERVER_TIMING']
+        self.slow_request_duration = options['SLOW_REQUEST_MS'] / 1000
+
+    def __call__(self, request):
+        request.timing = timing = RequestTiming(
+            keep_queries=bool(self.slow_request_duration)
+        )
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing))
+            response = self.get_response(request)
+        timing.stop()
+
+        response_bytes = None if response.streaming else len(response.content)
+        match = request.resolver_match
+        REQUEST_METRICS.observe(
+            match.view_name if match else 'unmatched',
+            request.method,
+            response.status_code,
+            timing,
+            response_bytes
+        )
+        if self.server_timing:
+            response['Server-Timing'] = timing.get_server_timing()
+        if self.slow_request_duration and \
+                timing.duration >= self.slow_request_duration:
+            self.log_slow_request(request, timing)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered by the handler once the view returns.
+        render = response.render
+
+        def timed_render():
+            start = time.perf_counter()
+            try:
+                return render()
+            finally:
+                request.timing.render_duration += time.perf_counter() - start
+
+        response.render = timed_render
+        return response
+
+    def log_slow_request(self, request, timing):
+        # Without the query string, which may hold searches or tokens.
+        queries = ''.join(
+            f'\n  {duration * 1000:.1f} ms: {sql}'
+            for sql, duration in timing.queries
+        )
+        logger.warning(
+            'Slow request %s %s took %.1f ms, %d queries took %.1f ms.%s',
+            request.method, request.path, timing.duration * 1000,
+            timing.db_queries, timing.db_duration * 1000, queries
+        )
@@ -0,0 +1,42 @@
+# Generated by Django 2.1.15 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_image_description'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attributemodel',
+            index=models.Index(fields=['user', 'name'], name='core_attr_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['user', 'id'], name='core_image_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'id'], name='core_recipe_user_id_idx'),
+        ),
+        # The through tables only have a unique (recipe_id, <attr>_id) index,
+        # so lookups starting from a tag, ingredient or image get their own.
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_tags_reverse_idx '
+            'ON core_recipe_tags (tag_id, recipe_id);',
+            'DROP INDEX core_recipe_tags_reverse_idx;',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_ingredients_reverse_idx '
+            'ON core_recipe_ingredients (ingredient_id, recipe_id);',
+            'DROP INDEX core_recipe_ingredients_reverse_idx;',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_images_reverse_idx '
+            'ON core_recipe_images (image_id, recipe_id);',
+            'DROP INDEX core_recipe_images_reverse_idx;',
+        ),
+    ]
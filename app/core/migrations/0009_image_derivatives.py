@@ -0,0 +1,29 @@
+# Generated by Django 2.1.15 on 2026-10-18 19:05
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='medium',
+            field=models.ImageField(blank=True, upload_to=core.models.get_image_derivative_upload_path),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to=core.models.get_image_derivative_upload_path),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='webp',
+            field=models.ImageField(blank=True, upload_to=core.models.get_image_derivative_upload_path),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.1.15 on 2026-10-18 19:09
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='image',
+            field=models.ImageField(storage=core.storage.ContentAddressedStorage('upload/recipe/sha256'), upload_to=core.models.get_image_upload_path),
+        ),
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['content_hash'], name='core_image_content_hash_idx'),
+        ),
+    ]
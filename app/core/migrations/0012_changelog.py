@@ -0,0 +1,47 @@
+# Generated by Django 2.1.15 on 2026-10-18 19:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Existing objects are logged as created, so a first sync returns them all.
+SEED_CHANGELOG_SQL = '''
+    INSERT INTO core_changelog (user_id, model, object_id, action)
+    SELECT user_id, model, object_id, 'created' FROM (
+        SELECT user_id, 'recipe' AS model, id AS object_id FROM core_recipe
+        UNION ALL
+        SELECT a.user_id, 'tag', a.id FROM core_tag t
+            JOIN core_attributemodel a ON a.id = t.attributemodel_ptr_id
+        UNION ALL
+        SELECT a.user_id, 'ingredient', a.id FROM core_ingredient i
+            JOIN core_attributemodel a ON a.id = i.attributemodel_ptr_id
+        UNION ALL
+        SELECT user_id, 'image', id FROM core_image
+    ) objects
+    ORDER BY user_id, model, object_id
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=7)),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['user', 'id'], name='core_changelog_user_id_idx'),
+        ),
+        migrations.RunSQL(SEED_CHANGELOG_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,64 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+SET_KIND_SQL = '''
+    UPDATE core_attributemodel SET kind = 'tag'
+        WHERE id IN (SELECT attributemodel_ptr_id FROM core_tag);
+    UPDATE core_attributemodel SET kind = 'ingredient'
+        WHERE id IN (SELECT attributemodel_ptr_id FROM core_ingredient);
+'''
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Merge the tags and the ingredients of a user sharing a name into the
+    oldest of them, which the recipes of the others are moved to."""
+    AttributeModel = apps.get_model('core', 'AttributeModel')
+    Recipe = apps.get_model('core', 'Recipe')
+
+    duplicates = AttributeModel.objects.values(
+        'user', 'kind', 'name'
+    ).annotate(count=Count('id'), kept=Min('id')).filter(count__gt=1)
+    for duplicate in duplicates:
+        field = Recipe._meta.get_field(f'{duplicate["kind"]}s')
+        through = field.remote_field.through
+        recipe_field = field.m2m_field_name()
+        related_field = field.m2m_reverse_field_name()
+
+        merged = list(AttributeModel.objects.filter(
+            user=duplicate['user'],
+            kind=duplicate['kind'],
+            name=duplicate['name']
+        ).exclude(id=duplicate['kept']).values_list('id', flat=True))
+        recipes = set(through.objects.filter(**{
+            f'{related_field}_id__in': merged
+        }).values_list(f'{recipe_field}_id', flat=True))
+        recipes -= set(through.objects.filter(**{
+            f'{related_field}_id': duplicate['kept']
+        }).values_list(f'{recipe_field}_id', flat=True))
+
+        through.objects.bulk_create(
+            through(**{
+                f'{recipe_field}_id': recipe_id,
+                f'{related_field}_id': duplicate['kept']
+            })
+            for recipe_id in recipes
+        )
+        AttributeModel.objects.filter(id__in=merged).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_changelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attributemodel',
+            name='kind',
+            field=models.CharField(default='', editable=False, max_length=20),
+            preserve_default=False,
+        ),
+        migrations.RunSQL(SET_KIND_SQL, migrations.RunSQL.noop),
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Separate from the merge of the duplicates, as a table cannot be altered
+    # in the transaction which deleted rows referenced by deferred keys.
+
+    dependencies = [
+        ('core', '0013_attributemodel_kind'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='attributemodel',
+            unique_together={('user', 'kind', 'name')},
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.1.15 on 2026-10-18 19:24
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The search vectors of the existing recipes, as computed by core.search.
+POPULATE_SEARCH_VECTORS_SQL = '''
+    UPDATE core_recipe AS recipe SET search_vector =
+        setweight(to_tsvector('simple', recipe.title), 'A') ||
+        setweight(to_tsvector('simple', coalesce((
+            SELECT string_agg(attribute.name, ' ')
+            FROM core_attributemodel AS attribute
+            WHERE attribute.id IN (
+                SELECT tag_id FROM core_recipe_tags
+                WHERE recipe_id = recipe.id
+                UNION ALL
+                SELECT ingredient_id FROM core_recipe_ingredients
+                WHERE recipe_id = recipe.id
+            )
+        ), '')), 'B')
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_attributemodel_unique_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+        ),
+        migrations.RunSQL(POPULATE_SEARCH_VECTORS_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.1.15 on 2026-10-18 20:41
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_recipe_search_vector'),
+    ]
+
+    operations = [
+        # The key of core.models.NameKey, for autocompletion by name prefix.
+        migrations.RunSQL(
+            'CREATE INDEX core_attr_name_key_idx ON core_attributemodel '
+            '(user_id, kind, (UPPER(name::text)) COLLATE "C", id);',
+            'DROP INDEX core_attr_name_key_idx;',
+        ),
+    ]
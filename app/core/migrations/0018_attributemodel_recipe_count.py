@@ -0,0 +1,33 @@
+# Generated by Django 2.1.15 on 2026-10-18 20:53
+
+from django.db import migrations, models
+
+# The recipe counts of the existing tags and ingredients.
+COUNT_RECIPES_SQL = '''
+    UPDATE core_attributemodel AS attribute SET recipe_count = (
+        SELECT count(*) FROM core_recipe_tags WHERE tag_id = attribute.id
+    ) + (
+        SELECT count(*) FROM core_recipe_ingredients
+        WHERE ingredient_id = attribute.id
+    )
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_recipe_price_minutes_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attributemodel',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(COUNT_RECIPES_SQL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='attributemodel',
+            index=models.Index(fields=['user', 'kind', 'recipe_count', 'id'], name='core_attr_user_count_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.1.15 on 2026-10-18 22:38
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_attributemodel_recipe_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogPrune',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_token', models.BigIntegerField()),
+                ('pruned_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='changelog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
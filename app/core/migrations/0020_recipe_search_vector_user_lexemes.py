@@ -0,0 +1,42 @@
+# Generated by Django 2.1.15 on 2026-10-18 23:10
+
+from django.db import migrations
+
+# The search vectors of the existing recipes, as computed by core.search,
+# with the lexemes prefixed with the user of the recipe.
+POPULATE_SEARCH_VECTORS_SQL = '''
+    UPDATE core_recipe AS recipe SET search_vector = regexp_replace((
+        setweight(to_tsvector('simple', recipe.title), 'A') ||
+        setweight(to_tsvector('simple', coalesce((
+            SELECT string_agg(attribute.name, ' ')
+            FROM core_attributemodel AS attribute
+            WHERE attribute.id IN (
+                SELECT tag_id FROM core_recipe_tags
+                WHERE recipe_id = recipe.id
+                UNION ALL
+                SELECT ingredient_id FROM core_recipe_ingredients
+                WHERE recipe_id = recipe.id
+            )
+        ), '')), 'B')
+    )::text, $$(^| )'$$, $$\\1'u$$ || recipe.user_id || 'x', 'g')::tsvector
+'''
+
+# The search vectors without the prefix, as computed by core.0015.
+UNPREFIX_SEARCH_VECTORS_SQL = '''
+    UPDATE core_recipe SET search_vector = regexp_replace(
+        search_vector::text, $$(^| )'u[0-9]+x$$, $$\\1'$$, 'g'
+    )::tsvector
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_changelog_prune'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            POPULATE_SEARCH_VECTORS_SQL, UNPREFIX_SEARCH_VECTORS_SQL
+        ),
+    ]
@@ -1,9 +1,16 @@
+import hashlib
 import os
 import uuid
 from django.conf import settings
 from django.contrib.auth.base_user import BaseUserManager
-from django.db import models
+from django.db import connections, models, transaction
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
+from .storage import ContentAddressedStorage
+
+CONTENT_ADDRESSED_UPLOAD_DIR = 'upload/recipe/sha256'
 
 
 def get_image_upload_path(instance, filename):
@@ -12,13 +19,41 @@ def get_image_upload_path(instance, filename):
     if len(split_filename) == 1:
         extension = ''
     else:
-        extension = '.' + split_filename[-1]
+        extension = '.' + split_filename[-1].lower()
+
+    # Images with a known hash are stored once per content, under a directory
+    # level of their own to keep directories small.
+    content_hash = getattr(instance, 'content_hash', '')
+    if content_hash:
+        return os.path.join(
+            CONTENT_ADDRESSED_UPLOAD_DIR,
+            content_hash[:2],
+            f'{content_hash}{extension}'
+        )
 
     filename = f'{uuid.uuid4()}{extension}'
 
     return os.path.join('upload/recipe', filename)
 
 
+def get_content_hash(file):
+    """Return the SHA-256 of a file, reusing the one computed while it was
+    uploaded when there is one."""
+    content_hash = getattr(file, 'content_hash', None)
+    if content_hash:
+        return content_hash
+
+    sha256 = hashlib.sha256()
+    for chunk in file.chunks():
+        sha256.update(chunk)
+    file.seek(0)
+    return sha256.hexdigest()
+
+
+def get_image_derivative_upload_path(instance, filename):
+    return os.path.join('upload/recipe/derivatives', filename)
+
+
 class UserManager(BaseUserManager):
 
     def construct_user(self, email, password=None, **extra_fields):
@@ -55,21 +90,193 @@ class User(PermissionsMixin, AbstractBaseUser):
     objects = UserManager()
 
 
+class NameKey(models.Func):
+    """The upper case of a name, compared byte by byte.
+
+    Names are looked up by prefix in this order through the
+    core_attr_name_key_idx index, which Meta.indexes cannot declare.
+    """
+    function = 'UPPER'
+    template = '%(function)s(%(expressions)s::text) COLLATE "C"'
+    output_field = models.CharField()
+
+
 class AttributeModel(models.Model):
     """A model that just contains a name and a user associated with it."""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
+    # The name of the inheriting model, as tags and ingredients share this
+    # table while their names are only unique among their own kind.
+    kind = models.CharField(max_length=20, editable=False)
+    # The number of recipes having the object, maintained by core.signals
+    # and rebuilt by the rebuild_recipe_counts command.
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'name'], name='core_attr_user_name_idx'
+            ),
+            # For the most used tags and ingredients first.
+            models.Index(
+                fields=['user', 'kind', 'recipe_count', 'id'],
+                name='core_attr_user_count_idx'
+            ),
+        ]
+        unique_together = (('user', 'kind', 'name'),)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.kind = self._meta.model_name
+        super().save(*args, **kwargs)
+
+
+# Sets the recipe counts of the objects of a kind which differ from the
+# number of rows of its recipe relation, see rebuild_recipe_counts().
+REBUILD_RECIPE_COUNTS_SQL = '''
+    UPDATE core_attributemodel AS attribute
+    SET recipe_count = counted.recipe_count, updated_at = %(updated_at)s
+    FROM (
+        SELECT attribute.id, count(relation.id) AS recipe_count
+        FROM core_attributemodel AS attribute
+        LEFT JOIN {relation_table} AS relation
+            ON relation.{relation_column} = attribute.id
+        WHERE attribute.kind = %(kind)s
+        GROUP BY attribute.id
+    ) AS counted
+    WHERE attribute.id = counted.id
+        AND attribute.recipe_count <> counted.recipe_count
+    RETURNING attribute.user_id, attribute.id
+'''
+
+
+class AttributeModelManager(models.Manager):
+    """Manager of the models inheriting from AttributeModel."""
+
+    def rebuild_recipe_counts(self):
+        """Count the recipes of every object again, and return the objects
+        whose count was wrong as (user id, pk) pairs."""
+        relation = next(
+            field for field in Recipe._meta.many_to_many
+            if field.related_model is self.model
+        )
+        through = relation.remote_field.through
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        sql = REBUILD_RECIPE_COUNTS_SQL.format(
+            relation_table=quote_name(through._meta.db_table),
+            relation_column=quote_name(relation.m2m_reverse_name())
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {
+                'updated_at': timezone.now(),
+                'kind': self.model._meta.model_name,
+            })
+            return cursor.fetchall()
+
+    def bulk_create(self, objs, batch_size=None):
+        """Insert the objects with one query per table, which Django's
+        bulk_create cannot do for models stored in several tables.
+        """
+        objs = list(objs)
+        if not objs:
+            return objs
+
+        kind = self.model._meta.model_name
+        parents = [
+            AttributeModel(name=obj.name, user_id=obj.user_id, kind=kind)
+            for obj in objs
+        ]
+        with transaction.atomic(using=self.db, savepoint=False):
+            AttributeModel.objects.using(self.db).bulk_create(
+                parents, batch_size
+            )
+            self._insert_children([parent.pk for parent in parents])
+
+        for obj, parent in zip(objs, parents):
+            self._set_saved(obj, parent.pk, parent.updated_at)
+        return objs
+
+    def get_or_create_by_names(self, user, names):
+        """Return the objects of a user with the given names, as a dict by
+        name, and the list of those which had to be created.
+
+        The existing objects are read with one query and the missing ones
+        inserted with one query per table. Names created meanwhile by another
+        transaction are skipped by the insert, and read again once it is over.
+        """
+        names = set(names)
+        objects = {
+            obj.name: obj for obj in self.filter(user=user, name__in=names)
+        }
+        missing = names - set(objects)
+        if not missing:
+            return objects, []
+
+        created = self._insert_missing(user, sorted(missing))
+        objects.update((obj.name, obj) for obj in created)
+        if len(objects) < len(names):
+            objects.update(
+                (obj.name, obj) for obj in
+                self.filter(user=user, name__in=names - set(objects))
+            )
+        return objects, created
+
+    def _insert_missing(self, user, names):
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        opts = AttributeModel._meta
+        kind = self.model._meta.model_name
+        updated_at = timezone.now()
+        with transaction.atomic(using=self.db, savepoint=False):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {quote_name(opts.db_table)} '
+                    f'(name, user_id, kind, updated_at, recipe_count) '
+                    f'SELECT unnest(%s::varchar[]), %s, %s, %s, 0 '
+                    f'ON CONFLICT (user_id, kind, name) DO NOTHING '
+                    f'RETURNING id, name',
+                    [names, user.pk, kind, updated_at]
+                )
+                rows = cursor.fetchall()
+            self._insert_children([pk for pk, _ in rows])
+
+        return [
+            self._set_saved(
+                self.model(name=name, user=user, kind=kind), pk, updated_at
+            )
+            for pk, name in rows
+        ]
+
+    def _insert_children(self, pks):
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        opts = self.model._meta
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote_name(opts.db_table)} '
+                f'({quote_name(opts.pk.column)}) '
+                f'SELECT unnest(%s::integer[])',
+                [pks]
+            )
+
+    def _set_saved(self, obj, pk, updated_at):
+        obj.id = obj.attributemodel_ptr_id = pk
+        obj.updated_at = updated_at
+        obj._state.adding = False
+        obj._state.db = self.db
+        return obj
+
 
 class Tag(AttributeModel):
-    pass
+    objects = AttributeModelManager()
 
 
 class Ingredient(AttributeModel):
-    pass
+    objects = AttributeModelManager()
 
 
 class Image(models.Model):
@@ -77,12 +284,53 @@ class Image(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
-    image = models.ImageField(upload_to=get_image_upload_path)
+    image = models.ImageField(
+        upload_to=get_image_upload_path,
+        storage=ContentAddressedStorage(CONTENT_ADDRESSED_UPLOAD_DIR)
+    )
+    # SHA-256 of `image`, shared by all the images stored in the same file.
+    # Empty for images uploaded before files were content addressed.
+    content_hash = models.CharField(max_length=64, blank=True)
     description = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Smaller versions of `image`, rendered in the background by core.tasks
+    # and empty until then.
+    thumbnail = models.ImageField(
+        upload_to=get_image_derivative_upload_path,
+        blank=True
+    )
+    medium = models.ImageField(
+        upload_to=get_image_derivative_upload_path,
+        blank=True
+    )
+    webp = models.ImageField(
+        upload_to=get_image_derivative_upload_path,
+        blank=True
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'id'], name='core_image_user_id_idx'
+            ),
+            models.Index(
+                fields=['content_hash'], name='core_image_content_hash_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.description
 
+    def save(self, *args, **kwargs):
+        # A new file is named after its hash, which has to be known before
+        # the file is stored.
+        if self.image and not self.image._committed:
+            self.content_hash = get_content_hash(self.image.file)
+        # The file stays locked until the row is committed, for it not to be
+        # collected as unreferenced in the meantime.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Recipe(models.Model):
     user = models.ForeignKey(
@@ -96,6 +344,140 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient', blank=True)
     tags = models.ManyToManyField('Tag', blank=True)
+    # Also set when the related objects change, see core.signals.
+    updated_at = models.DateTimeField(auto_now=True)
+    # The title and the tag and ingredient names, maintained by core.signals.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'id'], name='core_recipe_user_id_idx'
+            ),
+            # For the price and duration filters and orderings of the recipe
+            # list, see recipe.views.RECIPE_ORDERINGS.
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='core_recipe_user_price_idx'
+            ),
+            models.Index(
+                fields=['user', 'minutes_required', 'id'],
+                name='core_recipe_user_minutes_idx'
+            ),
+            GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class ChangeLogManager(models.Manager):
+    # Identifies the advisory locks of the change log.
+    LOCK_ID = 1
+
+    def record(self, user_id, model, object_ids, action):
+        """Log that objects of a user have been created, updated or deleted.
+
+        Entries of a user are written under a lock held until the transaction
+        commits, so their ids increase in commit order and a client having
+        seen an id will never miss a change committed before it.
+        """
+        entries = [
+            self.model(user_id=user_id, model=model._meta.model_name,
+                       object_id=object_id, action=action)
+            for object_id in object_ids
+        ]
+        if not entries:
+            return
+
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(
+                    'SELECT pg_advisory_xact_lock(%s, %s)',
+                    [self.LOCK_ID, user_id]
+                )
+            self.bulk_create(entries)
+
+    def get_min_token(self):
+        """Return the lowest change token still valid, entries logged up to
+        it having been pruned."""
+        return ChangeLogPrune.objects.aggregate(
+            min_token=models.Max('min_token')
+        )['min_token'] or 0
+
+    def prune(self, before, batch_size=10000):
+        """Delete the entries logged before a time which clients can do
+        without, and return how many were deleted.
+
+        Those are the entries followed by a later one for the same object,
+        and every entry of the objects deleted by then. The last entry of an
+        existing object is kept, so a sync without a token still returns
+        every object. A token older than the pruned entries could miss
+        deletions, so it stops being valid, which is recorded first for
+        syncs not to read a partly pruned log.
+        """
+        min_token = self.filter(created_at__lt=before).aggregate(
+            min_token=models.Max('id')
+        )['min_token']
+        if min_token is None:
+            return 0
+        ChangeLogPrune.objects.create(min_token=min_token)
+
+        later_entries = self.filter(
+            user=models.OuterRef('user'),
+            model=models.OuterRef('model'),
+            object_id=models.OuterRef('object_id'),
+            id__gt=models.OuterRef('id')
+        )
+        first_id = self.aggregate(first_id=models.Min('id'))['first_id']
+        deleted = 0
+        for start in range(first_id, min_token + 1, batch_size):
+            deleted += self.filter(
+                id__gte=start, id__lte=min(start + batch_size - 1, min_token)
+            ).annotate(
+                superseded=models.Exists(later_entries)
+            ).filter(
+                models.Q(action=self.model.DELETED) |
+                models.Q(superseded=True)
+            ).delete()[0]
+        return deleted
+
+
+class ChangeLog(models.Model):
+    """A change to a recipe, tag, ingredient or image, whose id serves as the
+    change token of the sync endpoint."""
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+
+    id = models.BigAutoField(primary_key=True)
+    # Entries are written while the objects of a user are deleted with it,
+    # so they are removed by hand afterwards rather than by a cascade.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    model = models.CharField(max_length=20)
+    object_id = models.IntegerField()
+    action = models.CharField(max_length=7, choices=(
+        (CREATED, 'Created'), (UPDATED, 'Updated'), (DELETED, 'Deleted'),
+    ))
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = ChangeLogManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'id'], name='core_changelog_user_id_idx'
+            ),
+        ]
+
+
+class ChangeLogPrune(models.Model):
+    """A pruning of the change log, which made the change tokens below
+    `min_token` invalid."""
+    min_token = models.BigIntegerField()
+    pruned_at = models.DateTimeField(auto_now_add=True)
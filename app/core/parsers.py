@@ -0,0 +1,32 @@
+import codecs
+from io import BytesIO
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    """JSON parser decoding with orjson when it is installed, which rejects
+    NaN and infinities like the strict parser of DRF.
+
+    Documents orjson refuses are parsed again by DRF, which reports their
+    errors. orjson parses integers beyond 64 bits as floats, which the
+    serializers reject like the integers, as no field takes such numbers.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        content = stream.read()
+        try:
+            if codecs.lookup(encoding).name == 'utf-8':
+                return orjson.loads(content)
+            return orjson.loads(content.decode(encoding))
+        except ValueError:
+            return super().parse(BytesIO(content), media_type, parser_context)
@@ -0,0 +1,113 @@
+import math
+
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Valid in JSON strings but not in JavaScript ones, so escaped like DRF does.
+JAVASCRIPT_UNSAFE = (
+    (b'\xe2\x80\xa8', b'\\u2028'),
+    (b'\xe2\x80\xa9', b'\\u2029'),
+)
+
+# Encodes what orjson does not, e.g. Decimal or lazy translations, like the
+# renderer of DRF. Datetimes are passed to it too, for UTC to be written Z.
+default_encoder = JSONEncoder()
+
+
+# The serializer fields whose representations are never floats.
+FLOATLESS_FIELDS = (
+    serializers.BooleanField, serializers.CharField, serializers.DateField,
+    serializers.DateTimeField, serializers.DurationField,
+    serializers.FileField, serializers.IntegerField,
+    serializers.NullBooleanField, serializers.TimeField,
+    serializers.UUIDField, RelatedField,
+)
+
+# Whether the data of a serializer class may hold floats, by class.
+serializers_with_floats = {}
+
+
+def field_can_hold_floats(field):
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    elif isinstance(field, ManyRelatedField):
+        field = field.child_relation
+    if isinstance(field, serializers.BaseSerializer):
+        return serializer_can_hold_floats(field)
+    if isinstance(field, serializers.DecimalField):
+        # Like DecimalField.to_representation.
+        return not getattr(field, 'coerce_to_string',
+                           api_settings.COERCE_DECIMAL_TO_STRING)
+    return not isinstance(field, FLOATLESS_FIELDS)
+
+
+def serializer_can_hold_floats(serializer):
+    """Return whether the data of a serializer may hold floats, from the
+    classes of its fields, worked out once per serializer class."""
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    serializer_class = type(serializer)
+    if serializer_class not in serializers_with_floats:
+        serializers_with_floats[serializer_class] = any(
+            field_can_hold_floats(field)
+            for field in serializer.fields.values()
+        )
+    return serializers_with_floats[serializer_class]
+
+
+def has_special_floats(data):
+    """Return whether the data holds floats orjson renders unlike DRF, those
+    written with an exponent, e.g. 1e16 rather than 1e+16, and the non finite
+    ones, which DRF refuses.
+
+    The data of serializers, which DRF returns with the serializer, is only
+    walked when their fields may hold floats.
+    """
+    if isinstance(data, float):
+        return not math.isfinite(data) or 'e' in repr(data)
+    if not isinstance(data, (dict, list, tuple)):
+        return False
+    serializer = getattr(data, 'serializer', None)
+    if serializer is not None and not serializer_can_hold_floats(serializer):
+        return False
+    if isinstance(data, dict):
+        data = data.values()
+    return any(has_special_floats(value) for value in data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer encoding with orjson when it is installed, with the same
+    output as the renderer of DRF, which it falls back to otherwise.
+
+    Indented responses, like those of the browsable API, data orjson
+    refuses, like integers beyond 64 bits, and special floats, see
+    `has_special_floats`, are rendered by DRF too.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact \
+                or self.ensure_ascii or self.get_indent(
+                    accepted_media_type, renderer_context or {}
+                ) is not None or has_special_floats(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            content = orjson.dumps(
+                data,
+                default=default_encoder.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for character, escaped in JAVASCRIPT_UNSAFE:
+            if character in content:
+                content = content.replace(character, escaped)
+        return content
@@ -0,0 +1,111 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection
+
+# No stemming nor stop words, so a prefix typed by a user matches the words
+# starting with it, in any language.
+SEARCH_CONFIG = 'simple'
+
+# Words of a search, at most this many of them.
+MAX_SEARCH_TERMS = 10
+
+# Shorter prefixes match too many words to be worth looking up, so a last
+# word shorter than this only matches whole words.
+MIN_PREFIX_LENGTH = 3
+
+# Tokens of the parser made of others, like hyphenated words, which are
+# looked up by their parts only, so that the last part may be a prefix.
+COMPOUND_TOKEN_TYPES = ('asciihword', 'hword', 'numhword')
+
+# The title of a recipe weighs more than the names of its tags and
+# ingredients.
+#
+# Every lexeme is prefixed with the user of the recipe, see `user_lexeme`, by
+# rewriting the text form of the vector, where each one starts with a quote.
+# Only the lexemes made by the parser change, like those of the searches.
+# A search then reads the index entries of its user only, rather than those
+# of a word in the recipes of every user.
+UPDATE_SEARCH_VECTORS_SQL = '''
+    UPDATE core_recipe AS recipe SET search_vector = regexp_replace((
+        setweight(to_tsvector(%(config)s::regconfig, recipe.title), 'A') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce((
+            SELECT string_agg(attribute.name, ' ')
+            FROM core_attributemodel AS attribute
+            WHERE attribute.id IN (
+                SELECT tag_id FROM core_recipe_tags
+                WHERE recipe_id = recipe.id
+                UNION ALL
+                SELECT ingredient_id FROM core_recipe_ingredients
+                WHERE recipe_id = recipe.id
+            )
+        ), '')), 'B')
+    )::text, $$(^| )'$$, $$\\1'u$$ || recipe.user_id || 'x', 'g')::tsvector
+'''
+
+
+def user_lexeme(user_id, word):
+    """Return the lexeme of a word in the search vectors of a user."""
+    return f'u{user_id}x{word}'
+
+
+def update_search_vectors(recipe_ids=None):
+    """Compute the search vectors of the recipes, of all of them when no ids
+    are given, with a single query."""
+    sql, params = UPDATE_SEARCH_VECTORS_SQL, {'config': SEARCH_CONFIG}
+    if recipe_ids is not None:
+        sql += 'WHERE recipe.id = ANY(%(ids)s)'
+        params['ids'] = list(recipe_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def get_search_lexemes(text):
+    """Return the lexemes of the words of a text, in their order, made by the
+    parser and dictionaries of SEARCH_CONFIG like those of the vectors."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT lexemes FROM ts_debug(%s::regconfig, %s) '
+            'WHERE NOT alias = ANY(%s)',
+            [SEARCH_CONFIG, text, list(COMPOUND_TOKEN_TYPES)]
+        )
+        rows = cursor.fetchall()
+    return [lexeme for lexemes, in rows for lexeme in lexemes or ()]
+
+
+def quote_lexeme(lexeme):
+    """Quote a lexeme for the input of a tsquery."""
+    escaped = lexeme.replace('\\', '\\\\').replace("'", "''")
+    return f"'{escaped}'"
+
+
+class PrefixSearchQuery(SearchQuery):
+    """A search for recipes having all the words of a text, the last of
+    which may be incomplete as it is being typed.
+
+    The value is a tsquery of lexemes already made by SEARCH_CONFIG, so it
+    is cast rather than parsed again, which would split some of them once
+    prefixed with the user.
+    """
+
+    @classmethod
+    def from_text(cls, text, user_id):
+        """Return the query of a text among the recipes of a user, or None
+        when it has no words."""
+        if not re.search(r'[^\W_]', text):
+            return None
+        lexemes = get_search_lexemes(text)[:MAX_SEARCH_TERMS]
+        if not lexemes:
+            return None
+        terms = [
+            quote_lexeme(user_lexeme(user_id, lexeme)) for lexeme in lexemes
+        ]
+        if len(lexemes[-1]) >= MIN_PREFIX_LENGTH:
+            terms[-1] += ':*'
+        return cls(' & '.join(terms))
+
+    def as_sql(self, compiler, connection):
+        template = 'CAST(%s AS tsquery)'
+        if self.invert:
+            template = f'!!({template})'
+        return template, [self.value]
@@ -0,0 +1,367 @@
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+    pre_delete, pre_save
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.dispatch import receiver, Signal
+from django.utils import timezone
+
+from .derivatives import DERIVATIVES
+from .models import AttributeModel, ChangeLog, Image, Ingredient, Recipe, \
+    Tag
+from .search import update_search_vectors
+from .storage import lock_file
+
+IMAGE_FILE_FIELDS = ('image', ) + tuple(name for name, _, _ in DERIVATIVES)
+
+# Sent when the derivatives of an image are stored, which is done with an
+# update that sends no post_save.
+image_derivatives_saved = Signal(providing_args=['image'])
+
+# Sent once changes to objects of a user have been logged, however they were
+# made, by the model of the objects.
+objects_changed = Signal(providing_args=['user_id', 'object_ids', 'action'])
+
+_batch = threading.local()
+
+# The model whose objects are being deleted by `delete_objects`, whose
+# delete signals are then handled once for all of them.
+_bulk_delete = threading.local()
+
+
+def is_deleted_in_bulk(instance):
+    return getattr(_bulk_delete, 'model', None) is type(instance)
+
+
+def record_changes(user_id, model, object_ids, action):
+    """Log changes to objects of a user in the change log and announce them
+    with `objects_changed`, or keep them for later inside `batch_changes`.
+    """
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+
+    batch = getattr(_batch, 'changes', None)
+    if batch is not None:
+        batch[user_id, model, action].extend(object_ids)
+        return
+
+    ChangeLog.objects.record(user_id, model, object_ids, action)
+    objects_changed.send(sender=model, user_id=user_id,
+                         object_ids=object_ids, action=action)
+
+
+@contextmanager
+def batch_changes():
+    """Record the changes made inside the block together when it exits, with
+    one change log query and one signal per user, model and action instead
+    of one per object."""
+    if getattr(_batch, 'changes', None) is not None:
+        yield
+        return
+
+    _batch.changes = changes = defaultdict(list)
+    try:
+        yield
+    finally:
+        _batch.changes = None
+    for (user_id, model, action), object_ids in changes.items():
+        record_changes(user_id, model, object_ids, action)
+
+
+def release_image_files(content_hash, files):
+    """Delete the files, given as a dict of field name to file name, that no
+    image references anymore once the current transaction is committed.
+
+    Files are only shared between images with the same content hash, so only
+    those are looked at.
+    """
+    files = {field: name for field, name in files.items() if name}
+    if not files:
+        return
+
+    def delete_unreferenced_files():
+        for field, name in files.items():
+            # Under the lock, an upload of the same content either committed
+            # its image already or finds the file deleted and writes it anew.
+            with transaction.atomic():
+                lock_file(name)
+                referenced = Image.objects.filter(
+                    content_hash=content_hash, **{field: name}
+                ).exists()
+                if not referenced:
+                    Image._meta.get_field(field).storage.delete(name)
+
+    transaction.on_commit(delete_unreferenced_files)
+
+
+@receiver(pre_save, sender=Image)
+def remember_image_files(sender, instance, raw, **kwargs):
+    # The files replaced by this save are released once it is done.
+    instance._previous_files = None
+    if instance.pk is not None and not raw:
+        instance._previous_files = Image.objects.filter(
+            pk=instance.pk
+        ).values('content_hash', *IMAGE_FILE_FIELDS).first()
+
+
+@receiver(post_save, sender=Image)
+def release_replaced_image_files(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_files', None)
+    if previous is None:
+        return
+
+    content_hash = previous.pop('content_hash')
+    release_image_files(content_hash, {
+        field: name for field, name in previous.items()
+        if name != getattr(instance, field).name
+    })
+
+
+@receiver(post_delete, sender=Image)
+def release_deleted_image_files(sender, instance, **kwargs):
+    release_image_files(instance.content_hash, {
+        field: getattr(instance, field).name for field in IMAGE_FILE_FIELDS
+    })
+
+
+# The recipe fields relating them to other models, whose changes show in the
+# recipe details.
+RECIPE_RELATIONS = {Image: 'images', Ingredient: 'ingredients', Tag: 'tags'}
+
+
+def touch_recipes(**lookups):
+    """Set the modification time of the recipes matching the lookups, and log
+    them as updated."""
+    recipe_ids = defaultdict(list)
+    for user_id, pk in Recipe.objects.filter(**lookups).values_list(
+            'user_id', 'pk'):
+        recipe_ids[user_id].append(pk)
+    if not recipe_ids:
+        return
+
+    Recipe.objects.filter(
+        pk__in=[pk for pks in recipe_ids.values() for pk in pks]
+    ).update(updated_at=timezone.now())
+    for user_id, pks in recipe_ids.items():
+        record_changes(user_id, Recipe, pks, ChangeLog.UPDATED)
+
+
+def touch_related_recipes(sender, instance, created=False, raw=False,
+                          **kwargs):
+    if not created and not raw:
+        touch_recipes(**{RECIPE_RELATIONS[sender]: instance})
+
+
+def remember_related_recipes(sender, instance, **kwargs):
+    # They are touched once the relations are gone, for their search vectors
+    # to be computed without them.
+    if is_deleted_in_bulk(instance):
+        return
+    instance._related_recipe_ids = list(Recipe.objects.filter(**{
+        RECIPE_RELATIONS[type(instance)]: instance
+    }).values_list('pk', flat=True))
+
+
+def touch_remembered_recipes(sender, instance, **kwargs):
+    touch_recipes(pk__in=instance.__dict__.pop('_related_recipe_ids', []))
+
+
+def touch_recipes_of_changed_relation(sender, instance, action, reverse,
+                                      pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance.updated_at = timezone.now()
+            touch_recipes(pk=instance.pk)
+    elif action == 'pre_clear':
+        remember_related_recipes(sender, instance)
+    elif action == 'post_clear':
+        touch_remembered_recipes(sender, instance)
+    elif action in ('post_add', 'post_remove'):
+        touch_recipes(pk__in=pk_set)
+
+
+for model, field_name in RECIPE_RELATIONS.items():
+    post_save.connect(touch_related_recipes, sender=model)
+    pre_delete.connect(remember_related_recipes, sender=model)
+    post_delete.connect(touch_remembered_recipes, sender=model)
+    m2m_changed.connect(
+        touch_recipes_of_changed_relation,
+        sender=getattr(Recipe, field_name).through
+    )
+
+
+# The recipe fields relating them to the models with a recipe_count.
+COUNTED_RELATIONS = {Ingredient: 'ingredients', Tag: 'tags'}
+
+
+def add_recipe_counts(user_id, model, counts):
+    """Add numbers, given by pk, to the recipe counts of tags or ingredients
+    of a user, and log those whose count changed as updated."""
+    pks_by_count = defaultdict(list)
+    for pk, count in counts.items():
+        if count:
+            pks_by_count[count].append(pk)
+
+    updated_at = timezone.now()
+    changed_pks = []
+    for count, pks in pks_by_count.items():
+        if count < 0:
+            # Counts already at zero stay there, so are not changed.
+            pks = list(
+                AttributeModel.objects
+                .filter(pk__in=pks, recipe_count__gt=0)
+                .values_list('pk', flat=True)
+            )
+            if not pks:
+                continue
+        AttributeModel.objects.filter(pk__in=pks).update(
+            # Counts that went wrong are fixed by rebuild_recipe_counts,
+            # rather than failing the positive check here.
+            recipe_count=Greatest(F('recipe_count') + count, 0),
+            updated_at=updated_at
+        )
+        changed_pks.extend(pks)
+    record_changes(user_id, model, changed_pks, ChangeLog.UPDATED)
+
+
+def count_changed_relation(sender, instance, action, reverse, model, pk_set,
+                           **kwargs):
+    counted_model = type(instance) if reverse else model
+    field = Recipe._meta.get_field(COUNTED_RELATIONS[counted_model])
+    recipe_column = field.m2m_field_name()
+    counted_column = field.m2m_reverse_field_name()
+
+    if action in ('pre_remove', 'pre_clear'):
+        # The removed rows, which pk_set may not all be, are counted once
+        # they are gone.
+        instance_column, other_column = (counted_column, recipe_column) \
+            if reverse else (recipe_column, counted_column)
+        rows = sender.objects.filter(**{instance_column: instance.pk})
+        if pk_set is not None:
+            rows = rows.filter(**{f'{other_column}__in': pk_set})
+        instance._removed_counted_ids = list(
+            rows.values_list(f'{counted_column}_id', flat=True)
+        )
+    elif action in ('post_remove', 'post_clear'):
+        removed_ids = instance.__dict__.pop('_removed_counted_ids', [])
+        add_recipe_counts(instance.user_id, counted_model, {
+            pk: -count for pk, count in Counter(removed_ids).items()
+        })
+    elif action == 'post_add':
+        # The pk_set of an addition leaves out the rows already there.
+        added_ids = [instance.pk] * len(pk_set) if reverse else pk_set
+        add_recipe_counts(instance.user_id, counted_model, Counter(added_ids))
+
+
+for model, field_name in COUNTED_RELATIONS.items():
+    m2m_changed.connect(
+        count_changed_relation,
+        sender=getattr(Recipe, field_name).through
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_counted_ids(sender, instance, **kwargs):
+    # The relation rows of a deleted recipe are deleted without signals.
+    if is_deleted_in_bulk(instance):
+        return
+    instance._counted_ids = {
+        model: list(
+            getattr(instance, field_name).values_list('pk', flat=True)
+        )
+        for model, field_name in COUNTED_RELATIONS.items()
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def uncount_deleted_recipe(sender, instance, **kwargs):
+    for model, pks in instance.__dict__.pop('_counted_ids', {}).items():
+        add_recipe_counts(instance.user_id, model, {pk: -1 for pk in pks})
+
+
+def delete_objects(queryset):
+    """Delete the objects of a queryset, doing the work of their delete
+    signals with a few queries for all of them rather than for each one.
+
+    The deletions are logged by the post_delete of every object, which
+    `batch_changes` gathers in a single change log query.
+    """
+    model = queryset.model
+    pks = list(queryset.values_list('pk', flat=True))
+    if not pks:
+        return
+
+    related_recipe_ids = []
+    if model in RECIPE_RELATIONS:
+        related_recipe_ids = list(Recipe.objects.filter(**{
+            f'{RECIPE_RELATIONS[model]}__in': pks
+        }).values_list('pk', flat=True).distinct())
+    counted_rows = {}
+    if model is Recipe:
+        for counted_model, field_name in COUNTED_RELATIONS.items():
+            field = Recipe._meta.get_field(field_name)
+            recipe_column = field.m2m_field_name()
+            through = field.remote_field.through
+            counted_rows[counted_model] = list(through.objects.filter(**{
+                f'{recipe_column}__in': pks
+            }).values_list(
+                f'{recipe_column}__user_id',
+                f'{field.m2m_reverse_field_name()}_id'
+            ))
+
+    _bulk_delete.model = model
+    try:
+        model.objects.filter(pk__in=pks).delete()
+    finally:
+        _bulk_delete.model = None
+
+    touch_recipes(pk__in=related_recipe_ids)
+    for counted_model, rows in counted_rows.items():
+        counts = defaultdict(Counter)
+        for user_id, pk in rows:
+            counts[user_id][pk] -= 1
+        for user_id, user_counts in counts.items():
+            add_recipe_counts(user_id, counted_model, user_counts)
+
+
+# The models whose changes are logged for the sync endpoint.
+SYNCED_MODELS = (Recipe, Tag, Ingredient, Image)
+
+
+def log_saved_object(sender, instance, created, **kwargs):
+    action = ChangeLog.CREATED if created else ChangeLog.UPDATED
+    record_changes(instance.user_id, sender, [instance.pk], action)
+
+
+def log_deleted_object(sender, instance, **kwargs):
+    record_changes(instance.user_id, sender, [instance.pk], ChangeLog.DELETED)
+
+
+for model in SYNCED_MODELS:
+    post_save.connect(log_saved_object, sender=model)
+    post_delete.connect(log_deleted_object, sender=model)
+
+
+@receiver(image_derivatives_saved, sender=Image)
+def log_image_with_derivatives(sender, image, **kwargs):
+    record_changes(image.user_id, Image, [image.pk], ChangeLog.UPDATED)
+
+
+@receiver(post_delete, sender=get_user_model())
+def delete_user_change_log(sender, instance, **kwargs):
+    # Including the entries logged while the objects of the user were deleted.
+    ChangeLog.objects.filter(user_id=instance.pk).delete()
+
+
+@receiver(objects_changed, sender=Recipe)
+def update_changed_search_vectors(sender, object_ids, action, **kwargs):
+    # Any change to a recipe, its relations or the names of its tags and
+    # ingredients is logged as an update of the recipe.
+    if action != ChangeLog.DELETED:
+        update_search_vectors(object_ids)
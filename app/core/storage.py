@@ -0,0 +1,60 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.db import connection
+from django.utils.deconstruct import deconstructible
+
+
+def lock_file(name):
+    """Lock a file name until the end of the current transaction.
+
+    A content addressed file is looked up before being stored, and a file is
+    only deleted once no row references it, both under this lock. So a file
+    found to exist by an upload cannot be deleted before the row of the
+    upload is committed, nor a file being deleted be found to exist.
+    """
+    digest = hashlib.sha256(name.encode()).digest()
+    key = int.from_bytes(digest[:8], 'big', signed=True)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', [key])
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage whose files under `directory` are named after a
+    hash of their content.
+
+    Such a file is only written once: saving it again while it exists is a
+    no-op returning the same name, instead of storing a copy under a new
+    one. New files are written to a temporary name and renamed into place,
+    so concurrent uploads of the same content never see a partial file.
+
+    The name is locked with `lock_file` first, which lasts until the row
+    referencing the file is committed when saved inside a transaction.
+    """
+
+    def __init__(self, directory, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+
+    def is_content_addressed(self, name):
+        return name.startswith(self.directory.rstrip('/') + '/')
+
+    def get_available_name(self, name, max_length=None):
+        if self.is_content_addressed(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        if not self.is_content_addressed(name):
+            return super()._save(name, content)
+        lock_file(name)
+        if self.exists(name):
+            return name
+
+        temporary_name = super()._save(f'{name}.{uuid.uuid4().hex}.tmp',
+                                       content)
+        os.replace(self.path(temporary_name), self.path(name))
+        return name
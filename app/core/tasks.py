@@ -0,0 +1,152 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .derivatives import render_derivatives, DERIVATIVES
+from .models import Image
+from .signals import image_derivatives_saved, touch_recipes
+from .storage import lock_file
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process pool rendering image derivatives, created on first
+    use in every process.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            # Spawned rather than forked workers, as forking a threaded
+            # server process can leave locks held in the child.
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_DERIVATIVES['WORKERS'],
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def save_derivatives(image_id, image_name, derivatives):
+    """Store the derivatives rendered from the file `image_name` of an image
+    and point the image row at them.
+
+    Nothing is kept when the image has been deleted, or given another file,
+    since the rendering started, the derivatives being of a stale file.
+    """
+    image = Image.objects.filter(pk=image_id, image=image_name).first()
+    if image is None:
+        return
+
+    basename = os.path.splitext(os.path.basename(image.image.name))[0]
+    for name, (extension, content) in derivatives.items():
+        field_file = getattr(image, name)
+        field_file.save(
+            f'{basename}_{name}.{extension}',
+            ContentFile(content),
+            save=False
+        )
+
+    # Only the derivative columns are written, so changes made to the image
+    # while it was being rendered are kept.
+    saved = set_image_derivatives(image, {
+        name: getattr(image, name).name for name in derivatives
+    })
+    if not saved:
+        # The file changed while the derivatives were being stored.
+        for name in derivatives:
+            getattr(image, name).delete(save=False)
+
+
+def set_image_derivatives(image, names):
+    """Point an image at derivatives, provided it still has the file they
+    were made from, returning whether it had."""
+    updated = Image.objects.filter(pk=image.pk, image=image.image.name).update(
+        updated_at=timezone.now(), **names
+    )
+    if not updated:
+        return False
+    # The derivatives show in the details of the recipes.
+    touch_recipes(images=image.pk)
+    image_derivatives_saved.send(sender=Image, image=image)
+    return True
+
+
+def reuse_image_derivatives(image):
+    """Point an image at the derivatives already rendered for another image
+    with the same content, returning whether there were any.
+    """
+    if not image.content_hash:
+        return False
+
+    others = Image.objects.filter(
+        content_hash=image.content_hash
+    ).exclude(pk=image.pk)
+    with transaction.atomic():
+        names = others.exclude(thumbnail='').values(
+            *(name for name, _, _ in DERIVATIVES)
+        ).first()
+        if names is None:
+            return False
+
+        # The files must still be referenced once locked, or they may have
+        # been collected with the last image referencing them.
+        for name in names.values():
+            lock_file(name)
+        if not others.filter(**names).exists():
+            return False
+        return set_image_derivatives(image, names)
+
+
+def generate_image_derivatives(image):
+    """Render the derivatives of an image in the background and return the
+    future of the rendering.
+
+    With no IMAGE_DERIVATIVES workers configured they are rendered right
+    away instead, in the calling thread. Nothing is rendered, and None is
+    returned, when an image with the same content already has derivatives.
+    """
+    if reuse_image_derivatives(image):
+        return None
+
+    if not settings.IMAGE_DERIVATIVES['WORKERS']:
+        save_derivatives(image.pk, image.image.name,
+                         render_derivatives(image.image.path))
+        return None
+
+    image_id = image.pk
+    image_name = image.image.name
+    submitting_thread = threading.current_thread()
+    future = get_executor().submit(render_derivatives, image.image.path)
+
+    def on_done(future):
+        try:
+            save_derivatives(image_id, image_name, future.result())
+        except Exception:
+            logger.exception('Rendering the derivatives of image %s failed.',
+                             image_id)
+        finally:
+            # Callbacks run on a thread of the executor, whose connection
+            # would otherwise stay open.
+            if threading.current_thread() is not submitting_thread:
+                connection.close()
+
+    future.add_done_callback(on_done)
+    return future
+
+
+def clear_image_derivatives(image):
+    """Forget the derivatives of an image whose file is being replaced."""
+    for name, _, _ in DERIVATIVES:
+        setattr(image, name, '')
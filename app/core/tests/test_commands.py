@@ -1,6 +1,7 @@
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.conf import settings
 from django.db.utils import OperationalError
 from django.core.management import call_command
 
@@ -19,3 +20,26 @@ class CommandsTest(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+    @patch('core.management.commands.serve.connections')
+    @patch('core.management.commands.serve.WSGIServer')
+    def test_serve_runs_gunicorn(self, server, connections):
+        config = {**settings.WEB_SERVER, 'SERVER': 'gunicorn', 'THREADS': 8}
+        with override_settings(WEB_SERVER=config):
+            call_command('serve', bind='127.0.0.1:9000')
+
+        application, options = server.call_args[0]
+        self.assertEqual(options['bind'], '127.0.0.1:9000')
+        self.assertEqual(options['workers'], config['WORKERS'])
+        self.assertEqual(options['threads'], 8)
+        self.assertEqual(options['worker_class'], 'gthread')
+        server.return_value.run.assert_called_once_with()
+        connections.close_all.assert_called_once_with()
+
+    @patch('core.management.commands.serve.call_command')
+    def test_serve_runs_runserver(self, runserver):
+        config = {**settings.WEB_SERVER, 'SERVER': 'runserver'}
+        with override_settings(WEB_SERVER=config):
+            call_command('serve', bind='127.0.0.1:9000')
+
+        runserver.assert_called_once_with('runserver', '127.0.0.1:9000')
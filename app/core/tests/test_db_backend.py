@@ -0,0 +1,57 @@
+from django.db import connections
+from django.test import TestCase
+
+from core.db.backends.postgresql.base import close_pools
+
+
+class DatabaseBackendTests(TestCase):
+
+    def create_wrapper(self, **overrides):
+        connection = connections['default']
+        settings_dict = {**connection.settings_dict, **overrides}
+        wrapper = connection.__class__(settings_dict, alias=connection.alias)
+        self.addCleanup(close_pools)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def run_request(self, wrapper):
+        """Run a query like a request would and return the connection used."""
+        wrapper.close_if_unusable_or_obsolete()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        raw_connection = wrapper.connection
+        wrapper.close_if_unusable_or_obsolete()
+        return raw_connection
+
+    def test_persistent_connection_is_reused(self):
+        wrapper = self.create_wrapper(CONN_MAX_AGE=None, POOL=None)
+        first = self.run_request(wrapper)
+        second = self.run_request(wrapper)
+        self.assertIs(first, second)
+
+    def test_health_check_replaces_broken_connection(self):
+        wrapper = self.create_wrapper(
+            CONN_MAX_AGE=None,
+            CONN_HEALTH_CHECKS=True,
+            POOL=None
+        )
+        first = self.run_request(wrapper)
+        first.close()
+
+        second = self.run_request(wrapper)
+
+        self.assertIsNot(first, second)
+        self.assertFalse(second.closed)
+
+    def test_pooled_connection_is_handed_back_and_reused(self):
+        wrapper = self.create_wrapper(
+            CONN_MAX_AGE=0,
+            POOL={'MIN_SIZE': 1, 'MAX_SIZE': 1}
+        )
+        first = self.run_request(wrapper)
+        self.assertIsNone(wrapper.connection)
+        self.assertFalse(first.closed)
+
+        second = self.run_request(wrapper)
+
+        self.assertIs(first, second)
@@ -0,0 +1,96 @@
+import io
+import os
+import tempfile
+import time
+
+import PIL
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.derivatives import render_derivatives
+from core.models import Image
+from core.tasks import generate_image_derivatives, save_derivatives
+
+
+def create_image_file(size=(1000, 500), image_format='JPEG'):
+    output = io.BytesIO()
+    PIL.Image.new('RGB', size, color='red').save(output, format=image_format)
+    return SimpleUploadedFile('photo.jpg', output.getvalue())
+
+
+class DerivativesTestMixin:
+
+    def create_image(self):
+        user = get_user_model().objects.create_user(
+            email='derivatives@email.com',
+            password='derivatives123'
+        )
+        return Image.objects.create(user=user, image=create_image_file())
+
+    def assertDerivativesSaved(self, image):
+        for name, size in (('thumbnail', (200, 100)), ('medium', (800, 400))):
+            field_file = getattr(image, name)
+            self.assertTrue(os.path.exists(field_file.path))
+            with PIL.Image.open(field_file.path) as derivative:
+                self.assertEqual(derivative.size, size)
+
+
+class RenderDerivativesTests(TestCase):
+
+    def test_derivatives_fit_their_box(self):
+        with tempfile.NamedTemporaryFile(suffix='.png') as ntf:
+            PIL.Image.new('RGBA', (3000, 1500)).save(ntf, format='PNG')
+            ntf.seek(0)
+            derivatives = render_derivatives(ntf.name)
+
+        sizes = {}
+        for name, (extension, content) in derivatives.items():
+            with PIL.Image.open(io.BytesIO(content)) as derivative:
+                sizes[name] = (extension, derivative.size)
+
+        self.assertEqual(sizes['thumbnail'], ('jpg', (200, 100)))
+        self.assertEqual(sizes['medium'], ('jpg', (800, 400)))
+        self.assertEqual(sizes['webp'], ('webp', (1600, 800)))
+
+
+@override_settings(IMAGE_DERIVATIVES={'WORKERS': 0})
+class InlineDerivativesTests(DerivativesTestMixin, TestCase):
+
+    def test_derivatives_are_rendered_inline(self):
+        image = self.create_image()
+
+        self.assertIsNone(generate_image_derivatives(image))
+
+        image.refresh_from_db()
+        self.assertDerivativesSaved(image)
+
+    def test_derivatives_of_a_replaced_file_are_dropped(self):
+        image = self.create_image()
+        rendered_name = image.image.name
+        derivatives = render_derivatives(image.image.path)
+        image.image = create_image_file(size=(10, 10))
+        image.save()
+
+        save_derivatives(image.pk, rendered_name, derivatives)
+
+        image.refresh_from_db()
+        self.assertNotEqual(image.image.name, rendered_name)
+        self.assertFalse(image.thumbnail)
+
+
+@override_settings(IMAGE_DERIVATIVES={'WORKERS': 1})
+class BackgroundDerivativesTests(DerivativesTestMixin, TransactionTestCase):
+
+    def test_derivatives_are_rendered_in_the_background(self):
+        image = self.create_image()
+
+        future = generate_image_derivatives(image)
+        future.result(timeout=60)
+
+        deadline = time.monotonic() + 10
+        image.refresh_from_db()
+        while not image.thumbnail and time.monotonic() < deadline:
+            time.sleep(0.05)
+            image.refresh_from_db()
+        self.assertDerivativesSaved(image)
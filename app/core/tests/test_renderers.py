@@ -0,0 +1,128 @@
+import datetime
+from collections import OrderedDict
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer, has_special_floats
+
+DATA = OrderedDict((
+    ('id', 1),
+    ('price', Decimal('4.50')),
+    ('title', 'Crème brûlée   "quoted"'),
+    ('updated_at', datetime.datetime(2020, 1, 2, 3, 4, 5, 678901,
+                                     tzinfo=timezone.utc)),
+    ('message', gettext_lazy('This field is required.')),
+    ('tags', [1, 2, None, True, 1.5]),
+))
+
+
+class PriceSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=5, decimal_places=2)
+
+
+class ScoreSerializer(PriceSerializer):
+    score = serializers.FloatField()
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def test_renders_like_the_drf_renderer(self):
+        for data in (DATA, [DATA, {}], {'nested': DATA}, []):
+            expected = JSONRenderer().render(data)
+            # Without falling back to it.
+            with patch.object(JSONRenderer, 'render') as drf_render:
+                self.assertEqual(FastJSONRenderer().render(data), expected)
+            drf_render.assert_not_called()
+
+    def test_renders_like_the_drf_renderer_what_orjson_cannot(self):
+        for value in (2 ** 70, 1e16, -1e-7, [0.5, {'a': 1e300}]):
+            data = {'value': value}
+            self.assertEqual(
+                FastJSONRenderer().render(data), JSONRenderer().render(data)
+            )
+
+    def test_non_finite_floats_are_refused(self):
+        for value in (float('nan'), float('inf')):
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({'value': [value]})
+
+    def test_renders_like_the_drf_renderer_without_orjson(self):
+        with patch('core.renderers.orjson', None):
+            self.assertEqual(
+                FastJSONRenderer().render(DATA), JSONRenderer().render(DATA)
+            )
+
+    def test_indented_responses(self):
+        media_type = 'application/json; indent=2'
+
+        self.assertEqual(
+            FastJSONRenderer().render(DATA, media_type),
+            JSONRenderer().render(DATA, media_type)
+        )
+
+    def test_none_renders_nothing(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_data_of_serializers_without_floats_is_not_walked(self):
+        items = [{'id': i, 'price': Decimal(i)} for i in range(5)]
+        data = PriceSerializer(items, many=True).data
+
+        with patch('core.renderers.has_special_floats',
+                   wraps=has_special_floats) as walk:
+            content = FastJSONRenderer().render({'results': data})
+
+        self.assertEqual(walk.call_count, 2)
+        self.assertEqual(content, JSONRenderer().render({'results': data}))
+
+    def test_data_of_serializers_with_floats_is_walked(self):
+        items = [{'id': 1, 'price': Decimal(1), 'score': 1e16}]
+        data = ScoreSerializer(items, many=True).data
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+        with self.assertRaises(ValueError):
+            FastJSONRenderer().render(ScoreSerializer(
+                {'id': 1, 'price': Decimal(1), 'score': float('nan')}
+            ).data)
+
+
+class FastJSONParserTests(SimpleTestCase):
+
+    def parse(self, content, encoding='utf-8'):
+        return FastJSONParser().parse(
+            BytesIO(content), parser_context={'encoding': encoding}
+        )
+
+    def test_parses_documents(self):
+        content = '{"title": "Crème", "price": 4.5, "tags": [1, "a"]}'
+
+        self.assertEqual(
+            self.parse(content.encode()),
+            {'title': 'Crème', 'price': 4.5, 'tags': [1, 'a']}
+        )
+        self.assertEqual(
+            self.parse(content.encode('latin-1'), 'latin-1')['title'], 'Crème'
+        )
+
+    def test_parses_like_the_drf_parser_without_orjson(self):
+        content = b'{"title": "Cr\xc3\xa8me", "price": 4.5}'
+
+        with patch('core.parsers.orjson', None):
+            self.assertEqual(self.parse(content),
+                             {'title': 'Crème', 'price': 4.5})
+
+    def test_invalid_documents_are_parse_errors(self):
+        for content in (b'{"a": }', b'[NaN]', b'\xff'):
+            with self.assertRaises(ParseError):
+                self.parse(content)
@@ -0,0 +1,154 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import PIL
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+
+from core.models import Image
+from core.storage import ContentAddressedStorage
+from core.tasks import generate_image_derivatives
+
+
+def encode_image(color='red'):
+    output = io.BytesIO()
+    PIL.Image.new('RGB', (300, 200), color=color).save(output, format='JPEG')
+    return output.getvalue()
+
+
+class StorageTestMixin:
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            IMAGE_DERIVATIVES={'WORKERS': 0}
+        )
+        self.settings_override.enable()
+        self.user = get_user_model().objects.create_user(
+            email='storage@email.com',
+            password='storage123'
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def create_image(self, content, filename='photo.jpg', user=None):
+        return Image.objects.create(
+            user=user or self.user,
+            image=SimpleUploadedFile(filename, content)
+        )
+
+
+class ContentAddressedStorageTests(StorageTestMixin, TransactionTestCase):
+
+    def test_content_addressed_file_is_written_once(self):
+        storage = ContentAddressedStorage('hashed')
+
+        first = storage.save('hashed/ab/abc.txt', ContentFile(b'content'))
+        second = storage.save('hashed/ab/abc.txt', ContentFile(b'content'))
+
+        self.assertEqual(first, second)
+        self.assertEqual(os.listdir(storage.path('hashed/ab')), ['abc.txt'])
+
+    def test_other_files_are_not_overwritten(self):
+        storage = ContentAddressedStorage('hashed')
+
+        first = storage.save('other/abc.txt', ContentFile(b'content'))
+        second = storage.save('other/abc.txt', ContentFile(b'content'))
+
+        self.assertNotEqual(first, second)
+
+
+class ImageDeduplicationTests(StorageTestMixin, TransactionTestCase):
+
+    def test_identical_images_share_one_file(self):
+        content = encode_image()
+
+        first = self.create_image(content)
+        second = self.create_image(content, filename='copy.JPG')
+
+        content_hash = hashlib.sha256(content).hexdigest()
+        self.assertEqual(first.content_hash, content_hash)
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertIn(content_hash, first.image.name)
+        with open(first.image.path, 'rb') as stored:
+            self.assertEqual(stored.read(), content)
+
+    def test_file_is_deleted_with_its_last_image(self):
+        content = encode_image()
+        first = self.create_image(content)
+        second = self.create_image(content)
+        path = first.image.path
+
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+
+        second.delete()
+        self.assertFalse(os.path.exists(path))
+
+    def test_file_is_kept_for_an_image_saved_while_collected(self):
+        content = encode_image()
+        first = self.create_image(content)
+        path = first.image.path
+        # Another user, whose changes are not serialized with those of the
+        # first one.
+        other_user = get_user_model().objects.create_user(
+            email='other@email.com',
+            password='storage123'
+        )
+        saved = threading.Event()
+
+        def save_second_image():
+            try:
+                with transaction.atomic():
+                    self.create_image(content, user=other_user)
+                    saved.set()
+                    # Collecting the file waits for this commit.
+                    time.sleep(0.5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=save_second_image)
+        thread.start()
+        self.assertTrue(saved.wait(10))
+        first.delete()
+        thread.join()
+
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(Image.objects.get().image.path, path)
+
+    def test_replaced_file_is_deleted(self):
+        image = self.create_image(encode_image())
+        path = image.image.path
+
+        image.image = SimpleUploadedFile('new.jpg', encode_image('blue'))
+        image.save()
+
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(image.image.path))
+
+    def test_derivatives_are_reused(self):
+        content = encode_image()
+        first = self.create_image(content)
+        generate_image_derivatives(first)
+        first.refresh_from_db()
+
+        second = self.create_image(content)
+        generate_image_derivatives(second)
+        second.refresh_from_db()
+
+        self.assertEqual(first.thumbnail.name, second.thumbnail.name)
+        first.delete()
+        self.assertTrue(os.path.exists(second.thumbnail.path))
+        second.delete()
+        self.assertFalse(os.path.exists(first.thumbnail.path))
@@ -0,0 +1,160 @@
+import time
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.metrics import REQUEST_METRICS
+from core.models import Recipe, Tag
+from recipe.serializers import TagSerializer
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+METRICS_URL = reverse('metrics')
+
+
+def timing_settings(**options):
+    return override_settings(
+        REQUEST_TIMING={**settings.REQUEST_TIMING, 'ENABLED': True, **options}
+    )
+
+
+class RequestTimingTests(TestCase):
+
+    def setUp(self):
+        REQUEST_METRICS.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='timing@email.com',
+            password='timing123'
+        )
+        self.client.force_authenticate(self.user)
+        self.staff_client = APIClient()
+        self.staff_client.force_login(get_user_model().objects.create_user(
+            email='staff@email.com',
+            password='staff123',
+            is_staff=True
+        ))
+
+    def get_metric(self, text, line_start):
+        for line in text.splitlines():
+            if line.startswith(line_start):
+                return float(line.rsplit(' ', 1)[1])
+        self.fail(f'No metric starting with {line_start}')
+
+    @timing_settings(ENABLED=False)
+    def test_disabled_timing_leaves_responses_alone(self):
+        response = self.client.get(TAGS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(
+            self.staff_client.get(METRICS_URL).status_code,
+            status.HTTP_404_NOT_FOUND
+        )
+
+    def get_server_timing(self, response):
+        return dict(
+            entry.strip().split(';', 1)
+            for entry in response['Server-Timing'].split(',')
+        )
+
+    @timing_settings()
+    def test_server_timing_header(self):
+        response = self.client.get(TAGS_URL)
+
+        timing = self.get_server_timing(response)
+        self.assertEqual(set(timing),
+                         {'db', 'serialize', 'render', 'app', 'total'})
+        self.assertRegex(timing['db'], r'^dur=[\d.]+;desc="[1-9]\d* queries"$')
+
+    @timing_settings()
+    def test_serialization_is_timed_apart_from_the_view(self):
+        Tag.objects.create(user=self.user, name='Slow')
+        to_representation = TagSerializer.to_representation
+
+        def slow_representation(serializer, instance):
+            time.sleep(0.05)
+            return to_representation(serializer, instance)
+
+        with patch.object(TagSerializer, 'to_representation',
+                          slow_representation):
+            response = self.client.get(TAGS_URL)
+
+        timing = {
+            name: float(value.split(';')[0][len('dur='):])
+            for name, value in self.get_server_timing(response).items()
+        }
+        self.assertGreaterEqual(timing['serialize'], 50)
+        self.assertLess(timing['app'], 50)
+        text = self.staff_client.get(METRICS_URL).content.decode()
+        self.assertGreaterEqual(self.get_metric(
+            text, 'http_request_serialize_duration_seconds_total'
+            '{view="recipe:tag-list",method="GET"}'
+        ), 0.05)
+
+    @timing_settings()
+    def test_representation_of_recipe_rows_is_timed(self):
+        Recipe.objects.create(
+            user=self.user, title='Soup', minutes_required=5, price=2
+        )
+        self.client.get(RECIPES_URL)
+
+        text = self.staff_client.get(METRICS_URL).content.decode()
+        self.assertGreater(self.get_metric(
+            text, 'http_request_serialize_duration_seconds_total'
+            '{view="recipe:recipe-list",method="GET"}'
+        ), 0)
+
+    @timing_settings(SERVER_TIMING=False)
+    def test_server_timing_header_can_be_left_out(self):
+        response = self.client.get(TAGS_URL)
+
+        self.assertNotIn('Server-Timing', response)
+
+    @timing_settings()
+    def test_metrics_per_view(self):
+        self.client.get(TAGS_URL)
+        response = self.client.get(TAGS_URL)
+        content_length = len(response.content)
+
+        text = self.staff_client.get(METRICS_URL).content.decode()
+
+        labels = '{view="recipe:tag-list",method="GET"'
+        self.assertEqual(self.get_metric(
+            text, f'http_requests_total{labels},status="200"}}'
+        ), 2)
+        self.assertEqual(self.get_metric(
+            text, f'http_request_duration_seconds_bucket{labels},le="+Inf"}}'
+        ), 2)
+        self.assertGreater(self.get_metric(
+            text, f'http_request_db_queries_total{labels}}}'
+        ), 0)
+        self.assertEqual(self.get_metric(
+            text, f'http_response_size_bytes_total{labels}}}'
+        ), 2 * content_length)
+
+    @timing_settings()
+    def test_metrics_are_only_served_to_staff(self):
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @timing_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_metrics_are_served_to_allowed_addresses(self):
+        response = APIClient().get(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @timing_settings(SLOW_REQUEST_MS=1)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            self.client.get(TAGS_URL, {'name': 'secret'})
+
+        self.assertIn(f'GET {TAGS_URL} ', logs.output[0])
+        self.assertNotIn('secret', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
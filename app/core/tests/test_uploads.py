@@ -0,0 +1,55 @@
+import hashlib
+import io
+
+import PIL
+from django.core.files.uploadhandler import SkipFile
+from django.test import SimpleTestCase, override_settings
+
+from core.uploads import ImageUploadHandler
+
+
+def encode_image(size, image_format='PNG'):
+    output = io.BytesIO()
+    PIL.Image.new('RGB', size).save(output, format=image_format)
+    return output.getvalue()
+
+
+@override_settings(IMAGE_UPLOAD={'MAX_BYTES': 10 ** 6, 'MAX_PIXELS': 10 ** 4})
+class ImageUploadHandlerTests(SimpleTestCase):
+
+    def stream(self, content, chunk_size=16):
+        handler = ImageUploadHandler()
+        handler.handle_raw_input(None, {}, len(content), b'boundary')
+        handler.new_file('image', 'image.png', 'image/png', len(content))
+        for start in range(0, len(content), chunk_size):
+            handler.receive_data_chunk(
+                content[start:start + chunk_size], start
+            )
+        return handler, handler.file_complete(len(content))
+
+    def test_content_is_hashed_while_streaming(self):
+        content = encode_image((50, 40))
+
+        handler, uploaded_file = self.stream(content)
+
+        self.assertEqual(
+            uploaded_file.content_hash,
+            hashlib.sha256(content).hexdigest()
+        )
+        self.assertEqual(uploaded_file.image_format, 'PNG')
+        self.assertEqual(uploaded_file.image_size, (50, 40))
+        uploaded_file.seek(0)
+        self.assertEqual(uploaded_file.read(), content)
+        uploaded_file.close()
+
+    def test_too_many_pixels_rejected_from_the_header(self):
+        content = encode_image((101, 100))
+        handler = ImageUploadHandler()
+        handler.handle_raw_input(None, {}, len(content), b'boundary')
+        handler.new_file('image', 'image.png', 'image/png', len(content))
+
+        with self.assertRaises(SkipFile):
+            # The first chunk holds the header, the rest is never read.
+            handler.receive_data_chunk(content[:64], 0)
+
+        self.assertEqual(len(handler.errors), 1)
@@ -0,0 +1,109 @@
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, StopUpload, \
+    TemporaryFileUploadHandler
+from PIL import Image as PILImage
+
+# The part of an upload kept in memory to read the image header from. Images
+# whose header does not fit are rejected.
+MAX_HEADER_BYTES = 256 * 1024
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Streams uploaded images chunk by chunk to a temporary file, and rejects
+    them as soon as possible: files larger than IMAGE_UPLOAD['MAX_BYTES']
+    are cut off once the limit is crossed, and the dimensions are read from
+    the header so images above IMAGE_UPLOAD['MAX_PIXELS'] (decompression
+    bombs included) are refused before any pixel is decoded.
+
+    The SHA-256 of the content is computed while streaming and set as the
+    `content_hash` attribute of the uploaded file, next to `image_format`
+    and `image_size`. Rejections are collected in `errors`.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = settings.IMAGE_UPLOAD['MAX_BYTES']
+        self.max_pixels = settings.IMAGE_UPLOAD['MAX_PIXELS']
+        self.errors = []
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        self.request_too_large = content_length > self.max_bytes + \
+            settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if self.request_too_large or (
+                self.content_length is not None and
+                self.content_length > self.max_bytes):
+            self.reject_too_large()
+
+        self.hash = hashlib.sha256()
+        self.header = b''
+        self.image_format = None
+        self.image_size = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_bytes:
+            self.reject_too_large()
+        if self.image_format is None:
+            self.read_header(raw_data)
+
+        self.hash.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if self.image_format is None:
+            # Too late for SkipFile, dropping the file has the same effect.
+            self.errors.append('Upload a valid image.')
+            self.file.close()
+            return None
+
+        uploaded_file = super().file_complete(file_size)
+        uploaded_file.content_hash = self.hash.hexdigest()
+        uploaded_file.image_format = self.image_format
+        uploaded_file.image_size = self.image_size
+        return uploaded_file
+
+    def read_header(self, raw_data):
+        self.header += raw_data
+        try:
+            # Opening an image only parses its header, the pixels are only
+            # decoded when they are accessed.
+            with PILImage.open(io.BytesIO(self.header)) as image:
+                image_format, image_size = image.format, image.size
+        except PILImage.DecompressionBombError:
+            self.reject_too_many_pixels()
+        except Exception:
+            if len(self.header) >= MAX_HEADER_BYTES:
+                self.reject('Upload a valid image.')
+            return
+
+        if image_format not in ALLOWED_FORMATS:
+            self.reject(f'{image_format} images are not supported.')
+        if image_size[0] * image_size[1] > self.max_pixels:
+            self.reject_too_many_pixels()
+
+        self.image_format, self.image_size = image_format, image_size
+        self.header = b''
+
+    def reject_too_large(self):
+        self.errors.append(
+            f'The image must be at most {self.max_bytes} bytes.'
+        )
+        self.file.close()
+        # The rest of the request is not read at all.
+        raise StopUpload(connection_reset=True)
+
+    def reject_too_many_pixels(self):
+        self.reject(f'The image must have at most {self.max_pixels} pixels.')
+
+    def reject(self, message):
+        self.errors.append(message)
+        self.file.close()
+        raise SkipFile()
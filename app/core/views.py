@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+
+from .metrics import REQUEST_METRICS
+
+
+def metrics(request):
+    """Serve the request metrics of this process in the Prometheus text
+    format, when REQUEST_TIMING is enabled, to staff users and to the
+    METRICS_ALLOWED_IPS."""
+    options = settings.REQUEST_TIMING
+    if not options['ENABLED']:
+        raise Http404
+    allowed = request.user.is_staff or \
+        request.META.get('REMOTE_ADDR') in options['METRICS_ALLOWED_IPS']
+    if not allowed:
+        raise PermissionDenied
+    return HttpResponse(
+        REQUEST_METRICS.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
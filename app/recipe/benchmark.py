@@ -0,0 +1,615 @@
+import json
+import math
+import os
+import random
+import subprocess
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.metrics import percentile
+from core.models import ChangeLog, Image, Ingredient, Recipe, Tag
+from core.search import update_search_vectors
+from recipe.cache import get_response_cache
+from recipe.imports import copy_rows
+
+# The users of the synthetic dataset have emails of this domain, and all the
+# same password.
+BENCHMARK_EMAIL_DOMAIN = 'benchmark.example.com'
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+# Recipes written per transaction while seeding.
+SEED_BATCH_SIZE = 20000
+
+ADJECTIVES = (
+    'Classic', 'Creamy', 'Crispy', 'Easy', 'Grilled', 'Hearty', 'Homemade',
+    'Lemony', 'Roasted', 'Smoky', 'Spicy', 'Sticky', 'Sweet', 'Zesty',
+)
+DISHES = (
+    'bake', 'bowl', 'burger', 'casserole', 'curry', 'pasta', 'pie', 'salad',
+    'sandwich', 'soup', 'stew', 'stir fry', 'tacos', 'tart',
+)
+TAG_NAMES = (
+    'Vegan', 'Vegetarian', 'Quick', 'Dessert', 'Breakfast', 'Dinner',
+    'Lunch', 'Gluten free', 'Spicy', 'Comfort food', 'Healthy', 'Budget',
+    'Party', 'Summer', 'Winter', 'Italian', 'Mexican', 'Indian', 'Thai',
+    'French', 'Japanese', 'Baking', 'Grill', 'One pot', 'Kids',
+)
+INGREDIENT_NAMES = (
+    'Salt', 'Pepper', 'Olive oil', 'Garlic', 'Onion', 'Butter', 'Flour',
+    'Sugar', 'Egg', 'Milk', 'Tomato', 'Lemon', 'Chicken', 'Beef', 'Rice',
+    'Pasta', 'Potato', 'Carrot', 'Cheese', 'Cream', 'Basil', 'Parsley',
+    'Cumin', 'Paprika', 'Ginger', 'Soy sauce', 'Honey', 'Chili', 'Spinach',
+    'Mushroom', 'Bell pepper', 'Coconut milk', 'Lime', 'Beans', 'Lentils',
+    'Chickpeas', 'Salmon', 'Shrimp', 'Tofu', 'Yogurt',
+)
+
+# Probabilities of a recipe having 0, 1, 2... tags, and of it having 0, 1 or
+# 2 images.
+TAGS_PER_RECIPE = (0.1, 0.25, 0.3, 0.2, 0.1, 0.05)
+IMAGES_PER_RECIPE = (0.3, 0.6, 0.1)
+
+
+def get_names(words, count):
+    """Return `count` distinct names, the words followed by numbered
+    variants of them."""
+    return [
+        words[i % len(words)] + (f' {i // len(words) + 1}'
+                                 if i >= len(words) else '')
+        for i in range(count)
+    ]
+
+
+def get_recipe_counts(rng, recipes, recipes_per_user):
+    """Share recipes between users with a log-normal distribution, most
+    users having a few recipes and a few users very many."""
+    users = max(1, round(recipes / recipes_per_user))
+    weights = [rng.lognormvariate(0, 1) for _ in range(users)]
+    total = sum(weights)
+    counts = [int(recipes * weight / total) for weight in weights]
+    largest = sorted(range(users), key=lambda user: -weights[user])
+    for user in largest[:recipes - sum(counts)]:
+        counts[user] += 1
+    return counts
+
+
+def reserve_ids(model, count):
+    """Return `count` ids from the sequence of a model's table, for rows
+    written with COPY."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+            'FROM generate_series(1, %s)',
+            [model._meta.db_table, model._meta.pk.column, count]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def analyze(*models):
+    """Update the planner statistics of the tables of the models, and of
+    the tables they inherit from."""
+    tables = []
+    for model in models:
+        for table in [model._meta.db_table] + [
+                parent._meta.db_table for parent in model._meta.parents]:
+            if table not in tables:
+                tables.append(table)
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {", ".join(map(quote_name, tables))}')
+
+
+class DatasetSeeder:
+    """Generate the synthetic dataset of the benchmarks, the same for the
+    same seed.
+
+    Recipes are shared between users with a log-normal distribution, and
+    users have more tags and ingredients the more recipes they have. Some
+    tags and ingredients of a user are much more used than others, and most
+    recipes have an image. Users, tags and ingredients are inserted with
+    bulk_create, the other rows with COPY, and the change log, search
+    vectors and recipe counts filled in like for recipes created through
+    the API.
+    """
+
+    def __init__(self, seed=0, report=None):
+        self.rng = random.Random(seed)
+        self.report = report or (lambda message: None)
+        self.password = make_password(BENCHMARK_PASSWORD)
+
+    def seed(self, recipes, recipes_per_user, batch_size=SEED_BATCH_SIZE):
+        counts = get_recipe_counts(self.rng, recipes, recipes_per_user)
+        # The ids of the users of a flushed database are used again, and
+        # would find the responses cached for their previous owners.
+        get_response_cache().clear()
+        start = time.monotonic()
+        seeded, index = 0, 0
+        while index < len(counts):
+            batch = [counts[index]]
+            while index + len(batch) < len(counts) and \
+                    sum(batch) + counts[index + len(batch)] <= batch_size:
+                batch.append(counts[index + len(batch)])
+            with transaction.atomic():
+                self.seed_users(index, batch)
+            index += len(batch)
+            seeded += sum(batch)
+            self.report(
+                f'{index} users and {seeded} recipes seeded, '
+                f'{seeded / (time.monotonic() - start):.0f} recipes/s.'
+            )
+
+        # The relations are inserted without the signals counting them.
+        Tag.objects.rebuild_recipe_counts()
+        Ingredient.objects.rebuild_recipe_counts()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def seed_users(self, first_index, recipe_counts):
+        rng = self.rng
+        now = timezone.now()
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(
+                email=f'user{first_index + i}@{BENCHMARK_EMAIL_DOMAIN}',
+                name=f'User {first_index + i}',
+                password=self.password
+            )
+            for i in range(len(recipe_counts))
+        )
+
+        tags, ingredients = {}, {}
+        for user, count in zip(users, recipe_counts):
+            tags[user] = [
+                Tag(user=user, name=name) for name in
+                get_names(TAG_NAMES, 3 + round(2 * math.sqrt(count)))
+            ]
+            ingredients[user] = [
+                Ingredient(user=user, name=name) for name in
+                get_names(INGREDIENT_NAMES, 5 + round(6 * math.sqrt(count)))
+            ]
+        Tag.objects.bulk_create(
+            tag for user_tags in tags.values() for tag in user_tags
+        )
+        Ingredient.objects.bulk_create(
+            ingredient for user_ingredients in ingredients.values()
+            for ingredient in user_ingredients
+        )
+
+        recipe_ids = iter(reserve_ids(Recipe, sum(recipe_counts)))
+        recipe_rows, tag_rows, ingredient_rows = [], [], []
+        recipe_images, changes = [], []
+        for user, count in zip(users, recipe_counts):
+            changes.extend(
+                (user.pk, model._meta.model_name, obj.pk, ChangeLog.CREATED,
+                 now)
+                for model, objects in ((Tag, tags), (Ingredient, ingredients))
+                for obj in objects[user]
+            )
+            # The popularity of the tags and ingredients of a user follows
+            # Zipf's law.
+            tag_weights = list(
+                self.get_cumulative_weights(len(tags[user]))
+            )
+            ingredient_weights = list(
+                self.get_cumulative_weights(len(ingredients[user]))
+            )
+            for _ in range(count):
+                recipe_id = next(recipe_ids)
+                recipe_rows.append(self.get_recipe_row(
+                    recipe_id, user, ingredients[user], now
+                ))
+                tag_count = rng.choices(
+                    range(len(TAGS_PER_RECIPE)), TAGS_PER_RECIPE
+                )[0]
+                tag_rows.extend(
+                    (recipe_id, tag.pk) for tag in self.pick(
+                        tags[user], tag_weights, tag_count
+                    )
+                )
+                ingredient_rows.extend(
+                    (recipe_id, ingredient.pk) for ingredient in self.pick(
+                        ingredients[user], ingredient_weights,
+                        rng.randint(3, 12)
+                    )
+                )
+                image_count = rng.choices(
+                    range(len(IMAGES_PER_RECIPE)), IMAGES_PER_RECIPE
+                )[0]
+                recipe_images.extend([(user, recipe_id)] * image_count)
+                changes.append(
+                    (user.pk, 'recipe', recipe_id, ChangeLog.CREATED, now)
+                )
+
+        image_rows, recipe_image_rows = [], []
+        for image_id, (user, recipe_id) in zip(
+                reserve_ids(Image, len(recipe_images)), recipe_images):
+            image_rows.append((
+                image_id, user.pk, f'upload/benchmark/{image_id}.jpg', '', '',
+                now, '', '', ''
+            ))
+            recipe_image_rows.append((recipe_id, image_id))
+            changes.append(
+                (user.pk, 'image', image_id, ChangeLog.CREATED, now)
+            )
+
+        copy_rows(Image, (
+            'id', 'user_id', 'image', 'content_hash', 'description',
+            'updated_at', 'thumbnail', 'medium', 'webp'
+        ), image_rows)
+        copy_rows(Recipe, (
+            'id', 'user_id', 'title', 'minutes_required', 'price', 'link',
+            'updated_at'
+        ), recipe_rows)
+        for name, rows in (('tags', tag_rows),
+                           ('ingredients', ingredient_rows),
+                           ('images', recipe_image_rows)):
+            field = Recipe._meta.get_field(name)
+            copy_rows(field.remote_field.through, (
+                field.m2m_column_name(), field.m2m_reverse_name()
+            ), rows)
+        copy_rows(ChangeLog, (
+            'user_id', 'model', 'object_id', 'action', 'created_at'
+        ), changes)
+        # Without statistics on the rows just written, the planner would
+        # scan the relations for every recipe.
+        analyze(Recipe, Tag, Ingredient, Image, *(
+            field.remote_field.through for field in Recipe._meta.many_to_many
+        ))
+        update_search_vectors([row[0] for row in recipe_rows])
+
+    def get_cumulative_weights(self, count):
+        total = 0
+        for rank in range(count):
+            total += 1 / (rank + 1)
+            yield total
+
+    def pick(self, objects, cumulative_weights, count):
+        """Return up to `count` distinct objects, the most weighted the most
+        likely."""
+        picked = self.rng.choices(objects, cum_weights=cumulative_weights,
+                                  k=count)
+        return list({obj.pk: obj for obj in picked}.values())
+
+    def get_recipe_row(self, recipe_id, user, ingredients, now):
+        rng = self.rng
+        title = ' '.join((
+            rng.choice(ADJECTIVES),
+            rng.choice(ingredients).name.lower(),
+            rng.choice(DISHES),
+        ))
+        minutes = min(int(rng.lognormvariate(3.4, 0.6)) + 5, 600)
+        price = Decimal(min(rng.lognormvariate(2.3, 0.7), 999.99)) \
+            .quantize(Decimal('0.01'))
+        link = f'https://example.com/recipes/{recipe_id}' \
+            if rng.random() < 0.4 else ''
+        return (recipe_id, user.pk, title, minutes, price, link, now)
+
+
+def get_dataset_size():
+    """Return the number of rows of the benchmark dataset, by table."""
+    users = get_user_model().objects.filter(
+        email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}'
+    )
+    return {
+        'users': users.count(),
+        'recipes': Recipe.objects.filter(user__in=users).count(),
+        'tags': Tag.objects.filter(user__in=users).count(),
+        'ingredients': Ingredient.objects.filter(user__in=users).count(),
+        'images': Image.objects.filter(user__in=users).count(),
+    }
+
+
+class BenchmarkContext:
+    """The user whose requests are benchmarked, with a sample of the ids of
+    their objects to request."""
+
+    def __init__(self, user, seed=0, sample_size=1000):
+        self.user = user
+        self.rng = random.Random(seed)
+        self.ids = {
+            name: list(
+                model.objects.filter(user=user).order_by('?')
+                .values_list('pk', flat=True)[:sample_size]
+            )
+            for name, model in (('recipes', Recipe), ('tags', Tag),
+                                ('ingredients', Ingredient),
+                                ('images', Image))
+        }
+        self.words = [
+            title.split()[1] for title in Recipe.objects.filter(
+                pk__in=self.ids['recipes'][:50]
+            ).values_list('title', flat=True)
+        ] or ['recipe']
+        self.counter = 0
+
+    def choice(self, name):
+        return self.rng.choice(self.ids[name])
+
+    def sample(self, name, count):
+        ids = self.ids[name]
+        return self.rng.sample(ids, min(count, len(ids)))
+
+    def unique_name(self, prefix):
+        self.counter += 1
+        return f'{prefix} {self.counter}'
+
+    def get_recipe_data(self):
+        return {
+            'title': self.unique_name('Benchmark recipe'),
+            'minutes_required': self.rng.randint(5, 120),
+            'price': '12.50',
+            'tags': self.sample('tags', 3),
+            'ingredients': self.sample('ingredients', 6),
+        }
+
+
+class BenchmarkCase:
+    """A request to an endpoint, whose URL arguments and query or body are
+    returned by `get_request` from a BenchmarkContext.
+
+    The writes of requests which change data are rolled back, so every run
+    starts from the same dataset.
+    """
+
+    def __init__(self, name, method, url_name, get_request=None,
+                 writes=False, authenticated=True):
+        self.name = name
+        self.method = method
+        self.url_name = url_name
+        self.get_request = get_request or (lambda context: ({}, None))
+        self.writes = writes
+        self.authenticated = authenticated
+
+
+BENCHMARK_CASES = (
+    BenchmarkCase('API root', 'get', 'recipe:api-root'),
+    BenchmarkCase('Recipe list', 'get', 'recipe:recipe-list'),
+    BenchmarkCase(
+        'Recipe list by tags', 'get', 'recipe:recipe-list',
+        lambda context: ({}, {
+            'tags': ','.join(map(str, context.sample('tags', 2))),
+        })
+    ),
+    BenchmarkCase(
+        'Recipe list by price', 'get', 'recipe:recipe-list',
+        lambda context: ({}, {'max_price': 15, 'ordering': 'price'})
+    ),
+    BenchmarkCase(
+        'Recipe search', 'get', 'recipe:recipe-list',
+        lambda context: ({}, {'q': context.rng.choice(context.words)})
+    ),
+    BenchmarkCase(
+        'Recipe detail', 'get', 'recipe:recipe-detail',
+        lambda context: ({'pk': context.choice('recipes')}, None)
+    ),
+    BenchmarkCase('Tag list', 'get', 'recipe:tag-list'),
+    BenchmarkCase(
+        'Most used tags', 'get', 'recipe:tag-list',
+        lambda context: ({}, {'ordering': '-recipe_count'})
+    ),
+    BenchmarkCase('Ingredient list', 'get', 'recipe:ingredient-list'),
+    BenchmarkCase('Image list', 'get', 'recipe:image-list'),
+    BenchmarkCase(
+        'Image detail', 'get', 'recipe:image-detail',
+        lambda context: ({'pk': context.choice('images')}, None)
+    ),
+    BenchmarkCase('Sync', 'get', 'recipe:sync'),
+    BenchmarkCase('Export', 'get', 'recipe:export'),
+    BenchmarkCase('Profile', 'get', 'user:update'),
+    BenchmarkCase(
+        'Recipe create', 'post', 'recipe:recipe-list',
+        lambda context: ({}, context.get_recipe_data()), writes=True
+    ),
+    BenchmarkCase(
+        'Recipe update', 'patch', 'recipe:recipe-detail',
+        lambda context: ({'pk': context.choice('recipes')}, {
+            'title': context.unique_name('Benchmark recipe'),
+            'tags': context.sample('tags', 2),
+        }),
+        writes=True
+    ),
+    BenchmarkCase(
+        'Recipe delete', 'delete', 'recipe:recipe-detail',
+        lambda context: ({'pk': context.choice('recipes')}, None),
+        writes=True
+    ),
+    BenchmarkCase(
+        'Recipe bulk create', 'post', 'recipe:recipe-bulk',
+        lambda context: ({}, [context.get_recipe_data() for _ in range(20)]),
+        writes=True
+    ),
+    BenchmarkCase(
+        'Tag create', 'post', 'recipe:tag-list',
+        lambda context: ({}, {'name': context.unique_name('Benchmark tag')}),
+        writes=True
+    ),
+    BenchmarkCase(
+        'Tag bulk create', 'post', 'recipe:tag-bulk',
+        lambda context: ({}, [
+            {'name': context.unique_name('Benchmark tag')} for _ in range(20)
+        ]),
+        writes=True
+    ),
+    BenchmarkCase(
+        'Ingredient bulk update', 'patch', 'recipe:ingredient-bulk',
+        lambda context: ({}, [
+            {'id': pk, 'name': context.unique_name('Benchmark ingredient')}
+            for pk in context.sample('ingredients', 20)
+        ]),
+        writes=True
+    ),
+    BenchmarkCase(
+        'Profile update', 'patch', 'user:update',
+        lambda context: ({}, {'name': context.unique_name('User')}),
+        writes=True
+    ),
+    BenchmarkCase(
+        'User create', 'post', 'user:create',
+        lambda context: ({}, {
+            'email': f'{context.unique_name("new").replace(" ", "")}'
+                     f'@{BENCHMARK_EMAIL_DOMAIN}',
+            'password': BENCHMARK_PASSWORD,
+            'name': 'New user',
+        }),
+        writes=True, authenticated=False
+    ),
+    BenchmarkCase(
+        'Token', 'post', 'user:token',
+        lambda context: ({}, {
+            'email': context.user.email, 'password': BENCHMARK_PASSWORD,
+        }),
+        writes=True, authenticated=False
+    ),
+)
+
+
+class CaseResult:
+
+    def __init__(self, case):
+        self.case = case
+        self.latencies = []
+        self.queries = 0
+        self.errors = 0
+
+    def as_dict(self):
+        latencies = sorted(self.latencies)
+        return {
+            'name': self.case.name,
+            'method': self.case.method.upper(),
+            'url_name': self.case.url_name,
+            'requests': len(latencies),
+            'errors': self.errors,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'queries': round(self.queries / len(latencies), 2),
+            # Requests are sent one at a time, so this is the inverse of the
+            # mean latency rather than the throughput under concurrency.
+            'requests_per_second_single_client': round(
+                len(latencies) / sum(latencies), 1
+            ),
+        }
+
+
+def get_benchmark_user(email=None):
+    """Return the user of the email, or the benchmark user with the most
+    recipes."""
+    users = get_user_model().objects.all()
+    if email is not None:
+        return users.get(email=email)
+    return users.filter(
+        email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}'
+    ).annotate(recipes=Count('recipe')).order_by('-recipes', 'pk').first()
+
+
+def run_case(case, context, requests, warmup):
+    """Send the requests of a case in this process, and return their
+    CaseResult."""
+    client = APIClient()
+    if case.authenticated:
+        client.force_authenticate(context.user)
+    result = CaseResult(case)
+
+    def count_queries(execute, sql, params, many, execute_context):
+        result.queries += 1
+        return execute(sql, params, many, execute_context)
+
+    def send(path, data):
+        start = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            response = getattr(client, case.method)(
+                path, data, **({'format': 'json'} if case.method != 'get'
+                               else {})
+            )
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, time.perf_counter() - start
+
+    for index in range(warmup + requests):
+        kwargs, data = case.get_request(context)
+        path = reverse(case.url_name, kwargs=kwargs)
+        queries = result.queries
+        if case.writes:
+            # The transactions of the view become savepoints, and the commit
+            # is not measured.
+            with transaction.atomic():
+                response, latency = send(path, data)
+                transaction.set_rollback(True)
+        else:
+            response, latency = send(path, data)
+        if index < warmup:
+            result.queries = queries
+            continue
+        result.latencies.append(latency)
+        if response.status_code >= 400:
+            result.errors += 1
+    return result
+
+
+def get_revision():
+    """Return the abbreviated git commit of the code, with `+` when it has
+    uncommitted changes, or None outside of a git checkout."""
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True
+        ).stdout.decode().strip()
+        status = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            cwd=settings.BASE_DIR, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision + ('+' if status.strip() else '')
+
+
+def run_benchmark(user, requests=100, warmup=10, seed=0, cases=None,
+                  report=None):
+    """Benchmark the endpoints with the requests of a user, and return the
+    results with what they were measured on, as a dict of JSON types."""
+    report = report or (lambda message: None)
+    context = BenchmarkContext(user, seed)
+    results = []
+    # The host of the test client, allowed by the test runner only.
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS,
+                                          'testserver']):
+        for case in cases or BENCHMARK_CASES:
+            result = run_case(case, context, requests, warmup).as_dict()
+            report(result)
+            results.append(result)
+    return {
+        'revision': get_revision(),
+        'created_at': timezone.now().isoformat(),
+        'dataset': get_dataset_size(),
+        'user': {
+            'email': user.email,
+            'recipes': Recipe.objects.filter(user=user).count(),
+        },
+        'requests': requests,
+        'warmup': warmup,
+        'response_cache_timeout': settings.RESPONSE_CACHE['TIMEOUT'],
+        'results': results,
+    }
+
+
+def save_results(results, directory):
+    """Write results to a JSON file of the directory named after their
+    revision and time, and return its path."""
+    os.makedirs(directory, exist_ok=True)
+    created_at = results['created_at'][:19].replace(':', '')
+    path = os.path.join(
+        directory, f'{created_at}-{results["revision"] or "unknown"}.json'
+    )
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+        file.write('\n')
+    return path
@@ -0,0 +1,184 @@
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import MethodNotAllowed, ValidationError
+from rest_framework.response import Response
+
+from core.signals import batch_changes, delete_objects, record_changes
+
+
+def bulk_update_fields(model, changes, batch_size=500):
+    """Update many objects of a model with one query per batch.
+
+    `changes` are `(pk, values)` pairs, where `values` maps the names of the
+    fields to change to their new value. The other fields are left as they
+    are, and `updated_at` is set on all the objects.
+    """
+    now = timezone.now()
+    # Fields of models inheriting from AttributeModel are stored in its table.
+    manager = model._meta.get_field('updated_at').model._default_manager
+    for start in range(0, len(changes), batch_size):
+        batch = changes[start:start + batch_size]
+        updates = {}
+        for name in {name for _, values in batch for name in values}:
+            field = model._meta.get_field(name)
+            updates[name] = Case(
+                *(
+                    When(pk=pk, then=Value(values[name], output_field=field))
+                    for pk, values in batch if name in values
+                ),
+                default=F(name),
+                output_field=field
+            )
+        manager.filter(pk__in=[pk for pk, _ in batch]).update(
+            updated_at=now, **updates
+        )
+
+
+# The methods of the bulk endpoint and the hooks of the viewsets writing
+# their items.
+BULK_HOOKS = {
+    'POST': 'perform_bulk_create',
+    'PATCH': 'perform_bulk_update',
+    'DELETE': 'perform_bulk_destroy',
+}
+
+
+class BulkModelMixin:
+    """Adds a `bulk/` endpoint taking a list of items: POST creates them,
+    PATCH updates the objects whose `id` they contain and DELETE deletes the
+    objects whose ids they are.
+
+    Every item is validated before anything is written, errors being
+    reported in a list matching the items. The writes are then made in a
+    single transaction, with queries per table rather than per object.
+
+    Creating and updating depend on the model, so viewsets define
+    `perform_bulk_create(validated_data)`, returning the created objects,
+    and `perform_bulk_update(pks, validated_data)`. A method whose hook is
+    not defined is not allowed.
+    """
+    bulk_max_items = 1000
+
+    def get_bulk_serializer_class(self):
+        return self.get_serializer_class()
+
+    def get_bulk_serializer(self, *args, **kwargs):
+        serializer_class = self.get_bulk_serializer_class()
+        kwargs['context'] = self.get_serializer_context()
+        return serializer_class(*args, many=True, **kwargs)
+
+    def get_bulk_queryset(self):
+        return self.queryset.filter(user=self.request.user)
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request, *args, **kwargs):
+        if not hasattr(self, BULK_HOOKS[request.method]):
+            raise MethodNotAllowed(request.method)
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'non_field_errors': [
+                'Expected a list of items.'
+            ]})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError({'non_field_errors': [
+                f'At most {self.bulk_max_items} items can be sent at once.'
+            ]})
+
+        handler = {
+            'POST': self.bulk_create,
+            'PATCH': self.bulk_update,
+            'DELETE': self.bulk_destroy,
+        }[request.method]
+        with transaction.atomic(), batch_changes():
+            return handler(items)
+
+    def bulk_create(self, items):
+        validated_data = self.validate_bulk(self.get_bulk_serializer(
+            data=items
+        ))
+        objects = self.perform_bulk_create(validated_data)
+        return Response(
+            self.get_bulk_response_data([obj.pk for obj in objects]),
+            status=status.HTTP_201_CREATED
+        )
+
+    def bulk_update(self, items):
+        pks = self.validate_bulk_pks(
+            [item.get('id') if isinstance(item, dict) else None
+             for item in items],
+            'id'
+        )
+        validated_data = self.validate_bulk(self.get_bulk_serializer(
+            data=items, partial=True
+        ), pks)
+        self.perform_bulk_update(pks, validated_data)
+        return Response(self.get_bulk_response_data(pks))
+
+    def bulk_destroy(self, items):
+        pks = self.validate_bulk_pks(items)
+        self.perform_bulk_destroy(pks)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def validate_bulk_pks(self, pks, field_name=None):
+        """Check that the primary keys are the ids of distinct objects of the
+        user, reporting errors under `field_name` of the items when given.
+        """
+        messages = [None] * len(pks)
+        seen = set()
+        for index, pk in enumerate(pks):
+            if not isinstance(pk, int) or isinstance(pk, bool):
+                messages[index] = 'A valid integer is required.'
+            elif pk in seen:
+                messages[index] = 'The same object is given more than once.'
+            seen.add(pk)
+
+        existing = set(self.get_bulk_queryset().filter(pk__in=[
+            pk for pk, message in zip(pks, messages) if message is None
+        ]).values_list('pk', flat=True))
+        for index, pk in enumerate(pks):
+            if messages[index] is None and pk not in existing:
+                messages[index] = 'Not found.'
+
+        if any(messages):
+            raise ValidationError([
+                {} if message is None else
+                {field_name: [message]} if field_name else [message]
+                for message in messages
+            ])
+        return pks
+
+    def validate_bulk(self, serializer, pks=None):
+        if not serializer.is_valid():
+            raise ValidationError(serializer.errors)
+
+        errors = self.validate_bulk_items(serializer.validated_data, pks)
+        if any(errors):
+            raise ValidationError(errors)
+        return serializer.validated_data
+
+    def validate_bulk_items(self, validated_data, pks=None):
+        """Return the errors of the validated items which can only be found by
+        looking at all of them, as a list of dicts matching the items.
+
+        `pks` are the primary keys of the objects updated by the items.
+        """
+        return [{} for _ in validated_data]
+
+    def get_bulk_response_data(self, pks):
+        objects = self.get_queryset().in_bulk(pks)
+        return self.get_serializer(
+            [objects[pk] for pk in pks], many=True
+        ).data
+
+    def perform_bulk_destroy(self, pks):
+        # With one query per table, and one update of the recipes they
+        # relate to, rather than per object.
+        delete_objects(self.get_bulk_queryset().filter(pk__in=pks))
+
+    def record_bulk_changes(self, pks, action):
+        record_changes(
+            self.request.user.pk, self.queryset.model, pks, action
+        )
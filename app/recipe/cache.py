@@ -0,0 +1,66 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+
+
+def get_response_cache():
+    return caches[settings.RESPONSE_CACHE['CACHE_ALIAS']]
+
+
+def get_version_key(user_id):
+    return f'recipe-responses-version:{user_id}'
+
+
+def get_response_key(user_id, *parts):
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode())
+    return f'recipe-response:{user_id}:{digest.hexdigest()}'
+
+
+def get_cached_response(user_id, key):
+    """Return the cached entry stored under `key` for a user, or None when
+    there is none or it predates the last change of the user's data.
+
+    The second value returned is the current version of the user's data,
+    under which a new entry has to be stored. The version and the entry are
+    read at once, so a hit costs a single round trip to the cache.
+    """
+    cache = get_response_cache()
+    version_key = get_version_key(user_id)
+    found = cache.get_many([version_key, key])
+
+    version = found.get(version_key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(version_key, version, None):
+            version = cache.get(version_key, version)
+        return None, version
+
+    entry = found.get(key)
+    if entry is None or entry[0] != version:
+        return None, version
+    return entry[1], version
+
+
+def set_cached_response(key, version, value):
+    get_response_cache().set(
+        key, (version, value), settings.RESPONSE_CACHE['TIMEOUT']
+    )
+
+
+def invalidate_user_responses(*user_ids):
+    """Make the cached responses of the users stale, now and once the current
+    transaction is committed, since a response cached in between may have
+    been read before the changes were visible.
+    """
+    def bump_versions():
+        get_response_cache().set_many({
+            get_version_key(user_id): uuid.uuid4().hex
+            for user_id in set(user_ids)
+        }, None)
+
+    bump_versions()
+    if connection.in_atomic_block:
+        transaction.on_commit(bump_versions)
@@ -0,0 +1,123 @@
+import csv
+import json
+
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+from django.db.models import OuterRef, Subquery
+
+from core.models import Image, Ingredient, Recipe, Tag
+from core.renderers import FastJSONRenderer
+
+# The columns of exported recipes, preceded by the email of their user when
+# every user is exported.
+EXPORT_COLUMNS = (
+    'id', 'title', 'minutes_required', 'price', 'link', 'tags', 'ingredients',
+    'images',
+)
+
+# Rows read per round trip of the server side cursor, and lines per chunk of
+# the output.
+EXPORT_CHUNK_SIZE = 2000
+
+
+class ArraySubquery(Subquery):
+    """The values of a subquery of one column, as an array."""
+    template = 'ARRAY(%(subquery)s)'
+
+
+def get_related_values(model, column):
+    queryset = model.objects.filter(recipe=OuterRef('pk')).order_by(column)
+    return ArraySubquery(
+        queryset.values(column),
+        output_field=ArrayField(models.CharField())
+    )
+
+
+def get_export_columns(users=None):
+    if users is None:
+        return ('user', ) + EXPORT_COLUMNS
+    return EXPORT_COLUMNS
+
+
+def get_export_records(users=None):
+    """Return the recipes of the users, or of every user, as dicts of JSON
+    types with the names of their tags and ingredients and the paths of
+    their images inlined.
+
+    They are read through a server side cursor, so only a chunk of them is
+    held in memory however many there are.
+    """
+    queryset = Recipe.objects.all()
+    fields = ()
+    if users is None:
+        fields = ('user__email', )
+    else:
+        queryset = queryset.filter(user__in=users)
+    rows = queryset.annotate(
+        tag_names=get_related_values(Tag, 'name'),
+        ingredient_names=get_related_values(Ingredient, 'name'),
+        image_paths=get_related_values(Image, 'image'),
+    ).order_by('pk').values_list(
+        *fields, 'id', 'title', 'minutes_required', 'price', 'link',
+        'tag_names', 'ingredient_names', 'image_paths'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    columns = get_export_columns(users)
+    for values in rows:
+        record = dict(zip(columns, values))
+        record['price'] = str(record['price'])
+        yield record
+
+
+def iter_chunks(lines):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == EXPORT_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def iter_ndjson_lines(records, columns):
+    renderer = FastJSONRenderer()
+    for record in records:
+        yield renderer.render(record).decode() + '\n'
+
+
+class Line:
+    """File whose writes return the text written, for csv.writer to turn
+    rows into lines."""
+
+    def write(self, text):
+        return text
+
+
+def iter_csv_lines(records, columns):
+    # The lists of names and paths are written as JSON arrays.
+    writer = csv.writer(Line())
+    yield writer.writerow(columns)
+    for record in records:
+        yield writer.writerow([
+            json.dumps(value, ensure_ascii=False) if isinstance(value, list)
+            else value
+            for value in record.values()
+        ])
+
+
+# The output formats of exports, as their content type and the function
+# returning the lines of the records.
+EXPORT_OUTPUTS = {
+    'ndjson': ('application/x-ndjson', iter_ndjson_lines),
+    'csv': ('text/csv', iter_csv_lines),
+}
+
+
+def export_recipes(output, users=None):
+    """Return the text of the recipes of the users, or of every user, in the
+    output format, as chunks of lines."""
+    _, iter_lines = EXPORT_OUTPUTS[output]
+    return iter_chunks(
+        iter_lines(get_export_records(users), get_export_columns(users))
+    )
@@ -0,0 +1,388 @@
+import csv
+import json
+import os
+import time
+import zlib
+from collections import Counter, defaultdict
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from core.models import ChangeLog, Image, Ingredient, Recipe, Tag
+from core.signals import add_recipe_counts, batch_changes, record_changes
+
+# The fields of imported recipes, their relations being given by the names
+# of the tags and ingredients and the paths of the images, like in exports.
+IMPORTED_FIELDS = ('title', 'minutes_required', 'price', 'link')
+IMPORTED_RELATIONS = (('tags', Tag), ('ingredients', Ingredient))
+
+# Records written per transaction.
+IMPORT_BATCH_SIZE = 2000
+
+NAME_MAX_LENGTH = Tag._meta.get_field('name').max_length
+
+
+class InvalidRecord(Exception):
+
+    def __init__(self, line, message):
+        super().__init__(line, message)
+        self.line = line
+        self.message = message
+
+    def __str__(self):
+        return f'Line {self.line}: {self.message}'
+
+
+def read_ndjson(file):
+    """Return the lines of NDJSON text which are not blank, with their
+    number."""
+    for line_number, line in enumerate(file, 1):
+        if line.strip():
+            yield line_number, line
+
+
+def read_csv(file):
+    """Return the rows of CSV text with a header as dicts, with the number of
+    their last line."""
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, row
+
+
+# The input formats of imports and the function reading their records.
+IMPORT_INPUTS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+def decode_record(line, record):
+    """Return a record read from an import as a dict of JSON types.
+
+    The records of NDJSON are decoded from their line, and the lists of the
+    records of CSV from their JSON array cells.
+    """
+    if isinstance(record, str):
+        try:
+            record = json.loads(record)
+        except ValueError as error:
+            raise InvalidRecord(line, f'Invalid JSON: {error}')
+        if not isinstance(record, dict):
+            raise InvalidRecord(line, 'Expected a JSON object.')
+        return record
+
+    record = dict(record)
+    for name in ('tags', 'ingredients', 'images'):
+        if isinstance(record.get(name), str) and record[name]:
+            try:
+                record[name] = json.loads(record[name])
+            except ValueError as error:
+                raise InvalidRecord(line, f'{name}: Invalid JSON: {error}')
+    return record
+
+
+class ParsedRecord:
+    """A valid recipe of an import, owned by the user of the email, if any."""
+
+    def __init__(self, line, email, fields, relations):
+        self.line = line
+        self.email = email
+        self.fields = fields
+        # Names, or paths for the images, by relation.
+        self.relations = relations
+
+
+def parse_record(line, record):
+    """Return the ParsedRecord of a decoded record, or raise InvalidRecord.
+
+    The fields are cleaned by the fields of Recipe, and the names of the
+    relations stripped and deduplicated. The id of exported records is
+    ignored, recipes being always created.
+    """
+    fields = {}
+    for name in IMPORTED_FIELDS:
+        field = Recipe._meta.get_field(name)
+        value = record.get(name)
+        if value is None and field.blank:
+            value = ''
+        try:
+            fields[name] = field.clean(value, None)
+        except ValidationError as error:
+            raise InvalidRecord(line, f'{name}: {" ".join(error.messages)}')
+
+    relations = {}
+    for name in ('tags', 'ingredients', 'images'):
+        values = record.get(name) or []
+        if not isinstance(values, list) or not all(
+                isinstance(value, str) and value.strip() for value in values):
+            raise InvalidRecord(line, f'{name}: Expected a list of names.')
+        values = [value.strip() for value in values]
+        if any(len(value) > NAME_MAX_LENGTH for value in values):
+            raise InvalidRecord(
+                line,
+                f'{name}: Names have at most {NAME_MAX_LENGTH} characters.'
+            )
+        relations[name] = list(dict.fromkeys(values))
+
+    email = record.get('user') or None
+    if email is not None and not isinstance(email, str):
+        raise InvalidRecord(line, 'user: Expected an email.')
+    return ParsedRecord(line, email, fields, relations)
+
+
+def get_worker(record, workers):
+    """Return the index of the worker importing a decoded record, the same
+    for every record of a user and in every run."""
+    email = record.get('user')
+    if not isinstance(email, str):
+        return 0
+    return zlib.crc32(email.encode()) % workers
+
+
+def copy_rows(model, columns, rows):
+    """Insert rows into the table of a model with COPY, much faster than
+    INSERT for the many rows of relations."""
+    buffer = StringIO()
+    for row in rows:
+        buffer.write('\t'.join(str(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {quote_name(model._meta.db_table)} '
+            f'({", ".join(quote_name(column) for column in columns)}) '
+            f'FROM STDIN',
+            buffer
+        )
+
+
+class RecipeImporter:
+    """Write batches of parsed records, with queries per table and per user
+    rather than per recipe.
+
+    Tags and ingredients are looked up by name and created when missing, all
+    the names of a user at once. Images are looked up by path among those of
+    the user, unknown paths being counted in `missing_images`. The changes
+    are logged, which also computes the search vectors, and the recipe
+    counts maintained.
+    """
+
+    def __init__(self, default_user=None):
+        self.default_user = default_user
+        self.users = {}
+        self.missing_images = 0
+
+    def find_users(self, emails):
+        """Read the users of the emails not read yet, and return the emails
+        of no user."""
+        emails = set(emails)
+        unknown = emails - set(self.users)
+        if unknown:
+            self.users.update(
+                (user.email, user) for user in
+                get_user_model().objects.filter(email__in=unknown)
+            )
+        return emails - set(self.users)
+
+    def get_user(self, record):
+        if record.email is None:
+            return self.default_user
+        return self.users[record.email]
+
+    def import_batch(self, records):
+        """Write the records, whose users have been found, in one
+        transaction."""
+        records_by_user = defaultdict(list)
+        for record in records:
+            records_by_user[self.get_user(record)].append(record)
+
+        with transaction.atomic(), batch_changes():
+            for user, user_records in records_by_user.items():
+                self.import_user_records(user, user_records)
+
+    def import_user_records(self, user, records):
+        related_pks = {}
+        for name, model in IMPORTED_RELATIONS:
+            names = {
+                value for record in records for value in record.relations[name]
+            }
+            objects, created = model.objects.get_or_create_by_names(
+                user, names
+            )
+            record_changes(user.pk, model, [obj.pk for obj in created],
+                           ChangeLog.CREATED)
+            related_pks[name] = {
+                value: obj.pk for value, obj in objects.items()
+            }
+
+        paths = {
+            path for record in records for path in record.relations['images']
+        }
+        related_pks['images'] = dict(
+            Image.objects.filter(user=user, image__in=paths)
+            .values_list('image', 'pk')
+        ) if paths else {}
+        self.missing_images += sum(
+            path not in related_pks['images']
+            for record in records for path in record.relations['images']
+        )
+
+        recipes = Recipe.objects.bulk_create(
+            Recipe(user=user, **record.fields) for record in records
+        )
+        for name, model in IMPORTED_RELATIONS + (('images', Image), ):
+            rows = [
+                (recipe.pk, related_pks[name][value])
+                for recipe, record in zip(recipes, records)
+                for value in record.relations[name]
+                if value in related_pks[name]
+            ]
+            if not rows:
+                continue
+            field = Recipe._meta.get_field(name)
+            copy_rows(field.remote_field.through, (
+                field.m2m_column_name(), field.m2m_reverse_name()
+            ), rows)
+            if model is not Image:
+                add_recipe_counts(
+                    user.pk, model, Counter(pk for _, pk in rows)
+                )
+
+        record_changes(user.pk, Recipe, [recipe.pk for recipe in recipes],
+                       ChangeLog.CREATED)
+
+
+class Checkpoint:
+    """The number of the last line of an input whose records have been
+    written, saved in a JSON file after each batch to resume a failed
+    import.
+
+    The file is replaced atomically, but written after the commit of the
+    batch, so a crash between both imports the batch again on resume.
+    """
+
+    def __init__(self, path, input_path):
+        self.path = path
+        self.input_path = os.path.abspath(input_path)
+
+    def load(self):
+        """Return the line to resume after, 0 without a checkpoint, or raise
+        ValueError if the checkpoint is of another input."""
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return 0
+        if state['input'] != self.input_path:
+            raise ValueError(
+                f'The checkpoint {self.path} is of {state["input"]}.'
+            )
+        return state['line']
+
+    def save(self, line):
+        temporary_path = f'{self.path}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump({'input': self.input_path, 'line': line}, file)
+        os.replace(temporary_path, self.path)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class ImportResult:
+
+    def __init__(self):
+        self.recipes = 0
+        self.invalid = 0
+        self.missing_images = 0
+        self.seconds = 0.0
+
+    @property
+    def rate(self):
+        return self.recipes / self.seconds if self.seconds else 0.0
+
+
+def import_recipes(records, batch_size=IMPORT_BATCH_SIZE, default_user=None,
+                   checkpoint=None, skip_invalid=False, worker=0, workers=1,
+                   report=None):
+    """Import the records read from an input, as (line number, record)
+    pairs, and return an ImportResult.
+
+    Only the records of the users of the worker are imported, for workers
+    importing the same input in parallel processes. Records before the line
+    of the checkpoint are skipped, and the checkpoint saved after each batch
+    and removed once the import is over. Invalid records raise InvalidRecord,
+    or are passed to `report` with `skip_invalid`, like the progress after
+    each batch.
+    """
+    report = report or (lambda message: None)
+    importer = RecipeImporter(default_user)
+    result = ImportResult()
+    start = time.monotonic()
+    resume_line = checkpoint.load() if checkpoint else 0
+
+    def invalid(error):
+        if not skip_invalid:
+            raise error
+        result.invalid += 1
+        report(str(error))
+
+    def write(batch, line):
+        missing = importer.find_users(
+            record.email for record in batch if record.email
+        )
+        valid = []
+        for record in batch:
+            if record.email is None and default_user is None:
+                invalid(InvalidRecord(record.line,
+                                      'user: This field is required.'))
+            elif record.email in missing:
+                invalid(InvalidRecord(record.line,
+                                      f'user: Unknown user {record.email}.'))
+            else:
+                valid.append(record)
+        if valid:
+            importer.import_batch(valid)
+        if checkpoint:
+            checkpoint.save(line)
+        result.recipes += len(valid)
+        result.seconds = time.monotonic() - start
+        report(f'{result.recipes} recipes imported, '
+               f'{result.rate:.0f} recipes/s.')
+
+    batch = []
+    line = resume_line
+    for line, record in records:
+        if line <= resume_line:
+            continue
+        try:
+            record = decode_record(line, record)
+        except InvalidRecord as error:
+            if worker == 0:
+                invalid(error)
+            continue
+        if get_worker(record, workers) != worker:
+            continue
+        try:
+            batch.append(parse_record(line, record))
+        except InvalidRecord as error:
+            invalid(error)
+            continue
+        if len(batch) == batch_size:
+            write(batch, line)
+            batch = []
+    if batch:
+        write(batch, line)
+
+    if checkpoint:
+        checkpoint.remove()
+    result.missing_images = importer.missing_images
+    result.seconds = time.monotonic() - start
+    return result
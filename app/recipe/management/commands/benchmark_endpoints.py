@@ -0,0 +1,129 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.benchmark import BENCHMARK_CASES, get_benchmark_user, \
+    run_benchmark, save_results
+
+ROW_FORMAT = '{:<24} {:>6} {:>9} {:>9} {:>9} {:>8} {:>15}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every endpoint of the recipe and user APIs with requests '
+        'of a user of the seed_benchmark dataset, sent in this process, and '
+        'report their p50, p95 and p99 latencies, queries per request and '
+        'requests per second of a single client. Writes are rolled back after '
+        'each request. The results are saved as JSON named after the git '
+        'commit, to compare with those of other commits.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=10,
+            help='Number of unmeasured requests sent first.'
+        )
+        parser.add_argument(
+            '--user',
+            help='Email of the user sending the requests, by default the '
+                 'benchmark user with the most recipes.'
+        )
+        parser.add_argument(
+            '--case',
+            action='append',
+            dest='cases',
+            help='Benchmark only the cases whose name contains this text.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--results-dir',
+            default='benchmarks',
+            help='Directory where the results are saved.'
+        )
+        parser.add_argument(
+            '--no-save',
+            action='store_true',
+            help='Do not save the results.'
+        )
+        parser.add_argument(
+            '--compare',
+            help='Results saved earlier to compare with.'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['warmup'] < 0:
+            raise CommandError('There must be requests to measure.')
+        try:
+            user = get_benchmark_user(options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'Unknown user: {options["user"]}')
+        if user is None:
+            raise CommandError('No benchmark dataset, run seed_benchmark.')
+
+        cases = BENCHMARK_CASES
+        if options['cases']:
+            cases = [
+                case for case in BENCHMARK_CASES
+                if any(text.lower() in case.name.lower()
+                       for text in options['cases'])
+            ]
+            if not cases:
+                raise CommandError('No case matches.')
+
+        previous = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                previous = {
+                    result['name']: result
+                    for result in json.load(file)['results']
+                }
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{options["requests"]} requests per case as {user.email}, '
+            f'in milliseconds'
+        ))
+        self.stdout.write(ROW_FORMAT.format(
+            'Case', 'Method', 'p50', 'p95', 'p99', 'Queries', 'Req/s 1 client'
+        ))
+        results = run_benchmark(
+            user,
+            options['requests'],
+            options['warmup'],
+            options['seed'],
+            cases,
+            lambda result: self.write_result(result, previous)
+        )
+
+        if not options['no_save']:
+            path = save_results(results, options['results_dir'])
+            self.stdout.write(self.style.SUCCESS(f'Results saved to {path}'))
+
+    def write_result(self, result, previous):
+        self.stdout.write(ROW_FORMAT.format(
+            result['name'], result['method'], result['p50_ms'],
+            result['p95_ms'], result['p99_ms'], result['queries'],
+            result['requests_per_second_single_client']
+        ))
+        if result['errors']:
+            self.stdout.write(self.style.ERROR(
+                f'  {result["errors"]} requests failed'
+            ))
+        before = previous.get(result['name'])
+        if before:
+            self.stdout.write(ROW_FORMAT.format(
+                '  before', '', before['p50_ms'], before['p95_ms'],
+                before['p99_ms'], before['queries'],
+                # Named throughput in the results of older commits.
+                before.get('requests_per_second_single_client',
+                           before.get('throughput'))
+            ) + f' ({self.get_change(before, result)})')
+
+    def get_change(self, before, after):
+        if not before['p50_ms']:
+            return 'p50 n/a'
+        change = (after['p50_ms'] - before['p50_ms']) / before['p50_ms']
+        return f'p50 {change:+.0%}'
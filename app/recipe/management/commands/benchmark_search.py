@@ -0,0 +1,199 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from core.models import Ingredient, Tag
+from core.search import update_search_vectors
+from recipe.views import RecipeViewSet
+
+SYLLABLES = (
+    'ba', 'ca', 'chi', 'do', 'fe', 'ga', 'hu', 'ki', 'la', 'lo', 'ma', 'mi',
+    'na', 'no', 'pa', 'pe', 'ra', 'ri', 'sa', 'so', 'ta', 'to', 'va', 'zu',
+)
+
+SEEDED_TABLES = (
+    'core_user', 'core_attributemodel', 'core_tag', 'core_ingredient',
+    'core_recipe', 'core_recipe_tags', 'core_recipe_ingredients',
+)
+
+# Titles of three words, where the first words of the vocabulary are much
+# more frequent than the last ones, like in real titles.
+INSERT_RECIPES_SQL = '''
+    INSERT INTO core_recipe
+        (user_id, title, minutes_required, price, link, updated_at)
+    SELECT
+        (%(user_ids)s::integer[])[1 + i %% %(users)s],
+        (%(words)s::text[])[1 + floor(%(vocabulary)s * random() ^ 3)::int]
+        || ' ' ||
+        (%(words)s::text[])[1 + floor(%(vocabulary)s * random() ^ 3)::int]
+        || ' ' ||
+        (%(words)s::text[])[1 + floor(%(vocabulary)s * random() ^ 3)::int],
+        5 + i %% 175, (100 + i %% 9900) / 100.0, '', now()
+    FROM generate_series(1, %(count)s) AS i
+'''
+
+# The attributes of a user are created together, so their ids are
+# consecutive and the remainder picks `per_recipe` of them for each recipe.
+INSERT_RELATIONS_SQL = '''
+    INSERT INTO {table} (recipe_id, {column})
+    SELECT recipe.id, attribute.id
+    FROM core_recipe AS recipe
+    JOIN core_attributemodel AS attribute
+        ON attribute.user_id = recipe.user_id AND attribute.kind = %(kind)s
+    WHERE recipe.user_id = ANY(%(user_ids)s)
+        AND (recipe.id + attribute.id) %% %(per_user)s < %(per_recipe)s
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway dataset, a million recipes by default, and time '
+        'the queries of recipe searches against a target latency. '
+        'Everything is rolled back at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes-per-user', type=int, default=10000)
+        parser.add_argument('--attributes-per-user', type=int, default=30)
+        parser.add_argument('--vocabulary', type=int, default=2000)
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Number of timed searches per case.'
+        )
+        parser.add_argument(
+            '--target',
+            type=float,
+            default=50,
+            help='Target latency in milliseconds.'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        words = self.get_vocabulary(rng, options['vocabulary'])
+
+        with transaction.atomic():
+            users = self.seed(
+                words,
+                options['users'],
+                options['recipes_per_user'],
+                options['attributes_per_user']
+            )
+            self.run_cases(
+                self.get_cases(words), users, rng,
+                options['repeat'], options['target']
+            )
+            transaction.set_rollback(True)
+
+    def get_vocabulary(self, rng, size):
+        words = set()
+        while len(words) < size:
+            words.add(''.join(rng.choice(SYLLABLES) for _ in range(3)))
+        return sorted(words, key=lambda word: rng.random())
+
+    def seed(self, words, users_count, recipes_per_user, attributes_per_user):
+        """Create the dataset and return its users."""
+        recipes_count = users_count * recipes_per_user
+        self.stdout.write(f'Seeding {recipes_count} recipes...')
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f'search{i}@example.com')
+            for i in range(users_count)
+        )
+        user_ids = [user.id for user in users]
+
+        for model in (Tag, Ingredient):
+            model.objects.bulk_create(
+                model(user=user, name=words[-i - 1])
+                for user in users
+                for i in range(attributes_per_user)
+            )
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT setseed(0)')
+            cursor.execute(INSERT_RECIPES_SQL, {
+                'user_ids': user_ids,
+                'users': users_count,
+                'words': words,
+                'vocabulary': len(words),
+                'count': recipes_count,
+            })
+            self.analyze()
+            relations = (
+                ('core_recipe_tags', 'tag_id', 'tag', 3),
+                ('core_recipe_ingredients', 'ingredient_id', 'ingredient', 5),
+            )
+            for table, column, kind, per_recipe in relations:
+                cursor.execute(
+                    INSERT_RELATIONS_SQL.format(table=table, column=column),
+                    {
+                        'kind': kind,
+                        'user_ids': user_ids,
+                        'per_user': attributes_per_user,
+                        'per_recipe': min(per_recipe, attributes_per_user),
+                    }
+                )
+
+            self.analyze()
+            self.stdout.write('Computing the search vectors...')
+            update_search_vectors()
+            cursor.execute('ANALYZE core_recipe;')
+        return users
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            for table in SEEDED_TABLES:
+                cursor.execute(f'ANALYZE {table};')
+
+    def get_cases(self, words):
+        return (
+            ('Frequent word', words[0]),
+            ('Rare word', words[-100]),
+            ('Prefix', words[1][:3]),
+            ('Two words', f'{words[2]} {words[3][:4]}'),
+            ('Tag or ingredient name', words[-2]),
+        )
+
+    def search(self, user, text):
+        """Run the queries of the first page of a search, like the list view
+        does, and return their duration in milliseconds.
+
+        The related objects are prefetched like for any other list, so they
+        are left out. The words of the search are read by the database when
+        making the queryset, which is timed too.
+        """
+        view = RecipeViewSet(action='list', format_kwarg=None)
+        view.request = Request(RequestFactory().get('/', {'q': text}))
+        view.request.user = user
+        start = time.perf_counter()
+        queryset = view.get_queryset().prefetch_related(None)
+        view.paginator.paginate_queryset(queryset, view.request)
+        return (time.perf_counter() - start) * 1000
+
+    def run_cases(self, cases, users, rng, repeat, target):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\nSearch latency over {repeat} searches, in milliseconds'
+        ))
+        for name, text in cases:
+            durations = sorted(
+                self.search(rng.choice(users), text) for _ in range(repeat)
+            )
+            percentiles = {
+                percentile: durations[
+                    min(len(durations) - 1, len(durations) * percentile // 100)
+                ]
+                for percentile in (50, 95, 99)
+            }
+            line = f'{name} ({text!r}): ' + ', '.join(
+                f'p{percentile} {duration:.1f}'
+                for percentile, duration in percentiles.items()
+            )
+            style = self.style.SUCCESS if percentiles[95] <= target \
+                else self.style.ERROR
+            self.stdout.write(style(line))
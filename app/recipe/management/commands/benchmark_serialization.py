@@ -0,0 +1,144 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Image, Ingredient, Recipe, Tag
+from recipe.mixins import RowListMixin
+from recipe.serializers import RecipeSerializer
+
+# The many relations of recipes and their models.
+RELATIONS = (('tags', Tag), ('ingredients', Ingredient), ('images', Image))
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway page of recipes and time its list representation '
+        'from model instances, field by field, and from rows, checking both '
+        'render the same bytes. Everything is rolled back at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Number of timed representations per path.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(options['recipes'])
+            queryset = Recipe.objects.filter(user=user).order_by('-id')
+            paths = (
+                ('Instances', self.from_instances),
+                ('Rows', self.from_rows),
+            )
+
+            contents = set()
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'\nMedian over {options["repeat"]} lists of '
+                f'{options["recipes"]} recipes, in milliseconds'
+            ))
+            for name, path in paths:
+                queries, representations = [], []
+                for _ in range(options['repeat']):
+                    query, represent, content = path(queryset)
+                    queries.append(query)
+                    representations.append(represent)
+                    contents.add(content)
+                query = sorted(queries)[len(queries) // 2]
+                represent = sorted(representations)[len(representations) // 2]
+                self.stdout.write(
+                    f'{name}: queries {query:.1f}, '
+                    f'representation {represent:.1f}'
+                )
+            transaction.set_rollback(True)
+
+        if len(contents) != 1:
+            raise CommandError('The paths rendered different bytes.')
+        self.stdout.write(self.style.SUCCESS('Both paths rendered identical '
+                                             'bytes.'))
+
+    def seed(self, recipes_count):
+        """Create the recipes and return their user."""
+        rng = random.Random(0)
+        user = get_user_model().objects.create_user(
+            email='serialization@example.com',
+            password='serialization'
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f'tag {i}') for i in range(30)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f'ingredient {i}') for i in range(30)
+        )
+        images = Image.objects.bulk_create(
+            Image(user=user, image=f'upload/recipe/{i}.jpg')
+            for i in range(recipes_count)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                user=user,
+                title=f'recipe {i}',
+                minutes_required=rng.randint(5, 180),
+                price=rng.randint(100, 99999) / 100,
+                link=f'https://example.com/{i}'
+            )
+            for i in range(recipes_count)
+        )
+
+        for (name, _), related, count in zip(
+                RELATIONS, (tags, ingredients, images), (3, 5, 1)):
+            through = getattr(Recipe, name).through
+            field = Recipe._meta.get_field(name)
+            through.objects.bulk_create(
+                through(**{
+                    f'{field.m2m_field_name()}_id': recipe.id,
+                    f'{field.m2m_reverse_field_name()}_id': obj.id
+                })
+                for index, recipe in enumerate(recipes)
+                for obj in (
+                    [images[index]] if related is images
+                    else rng.sample(related, count)
+                )
+            )
+        return user
+
+    def from_instances(self, queryset):
+        """Represent the recipes like the serializer fields do, and return
+        the durations of the queries and of the representation, and the
+        rendered bytes."""
+        start = time.perf_counter()
+        recipes = list(queryset.prefetch_related(*(
+            Prefetch(name, queryset=model.objects.only('pk').order_by('pk'))
+            for name, model in RELATIONS
+        )))
+        queried = time.perf_counter()
+        content = JSONRenderer().render(
+            RecipeSerializer(recipes, many=True).data
+        )
+        return self.get_durations(start, queried, content)
+
+    def from_rows(self, queryset):
+        """Represent the recipes like the list view does, and return the
+        durations of the queries and of the representation, and the rendered
+        bytes."""
+        start = time.perf_counter()
+        rows = list(queryset.values(*RecipeSerializer.get_row_columns()))
+        for name, _ in RELATIONS:
+            RowListMixin().add_related_pks(Recipe, rows, name)
+        queried = time.perf_counter()
+        content = JSONRenderer().render(
+            RecipeSerializer.to_row_representations(rows)
+        )
+        return self.get_durations(start, queried, content)
+
+    def get_durations(self, start, queried, content):
+        end = time.perf_counter()
+        return (queried - start) * 1000, (end - queried) * 1000, content
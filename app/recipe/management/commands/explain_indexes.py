@@ -0,0 +1,196 @@
+import random
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from core.models import Recipe, Tag, Ingredient, Image
+from recipe.views import RecipeViewSet, TagViewSet, ImageViewSet
+
+# The indexes added by core.0008_composite_indexes,
+# core.0017_recipe_price_minutes_indexes and
+# core.0018_attributemodel_recipe_count.
+COMPOSITE_INDEXES = (
+    'core_attr_user_name_idx',
+    'core_attr_user_count_idx',
+    'core_image_user_id_idx',
+    'core_recipe_user_id_idx',
+    'core_recipe_user_price_idx',
+    'core_recipe_user_minutes_idx',
+    'core_recipe_tags_reverse_idx',
+    'core_recipe_ingredients_reverse_idx',
+    'core_recipe_images_reverse_idx',
+)
+
+SEEDED_TABLES = (
+    'core_user', 'core_attributemodel', 'core_tag', 'core_ingredient',
+    'core_image', 'core_recipe', 'core_recipe_tags',
+    'core_recipe_ingredients', 'core_recipe_images',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway dataset and print the EXPLAIN plans of the recipe '
+        'API queries without and with the composite indexes. Everything is '
+        'rolled back at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--recipes-per-user', type=int, default=500)
+        parser.add_argument('--attributes-per-user', type=int, default=30)
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Run EXPLAIN ANALYZE instead of EXPLAIN.'
+        )
+
+    def handle(self, *args, **options):
+        self.explain_prefix = 'EXPLAIN ANALYZE ' if options['analyze'] \
+            else 'EXPLAIN '
+
+        with transaction.atomic():
+            user, tags = self.seed(
+                options['users'],
+                options['recipes_per_user'],
+                options['attributes_per_user']
+            )
+            self.analyze()
+            cases = self.get_cases(tags)
+
+            savepoint = transaction.savepoint()
+            self.drop_composite_indexes()
+            self.explain_cases('Without composite indexes', cases, user)
+            transaction.savepoint_rollback(savepoint)
+
+            self.explain_cases('With composite indexes', cases, user)
+            transaction.set_rollback(True)
+
+    def seed(self, users_count, recipes_per_user, attributes_per_user):
+        """Create the dataset and return the user to explain queries for."""
+        self.stdout.write('Seeding the dataset...')
+        rng = random.Random(0)
+        # Unique per run, not to collide with the users of the database.
+        suffix = uuid.uuid4().hex[:8]
+        users = [
+            get_user_model().objects.create_user(
+                email=f'explain{i}-{suffix}@example.com',
+                password='explain'
+            )
+            for i in range(users_count)
+        ]
+
+        for user in users:
+            tags = [
+                Tag.objects.create(user=user, name=f'tag {i}')
+                for i in range(attributes_per_user)
+            ]
+            ingredients = [
+                Ingredient.objects.create(user=user, name=f'ingredient {i}')
+                for i in range(attributes_per_user)
+            ]
+            images = Image.objects.bulk_create(
+                Image(user=user, image=f'upload/recipe/{i}.jpg')
+                for i in range(recipes_per_user)
+            )
+            recipes = Recipe.objects.bulk_create(
+                Recipe(
+                    user=user,
+                    title=f'recipe {i}',
+                    minutes_required=rng.randint(5, 180),
+                    price=rng.randint(100, 99999) / 100
+                )
+                for i in range(recipes_per_user)
+            )
+
+            tag_rows, ingredient_rows, image_rows = [], [], []
+            for recipe, image in zip(recipes, images):
+                tag_rows.extend(
+                    Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+                    for tag in rng.sample(tags, 3)
+                )
+                ingredient_rows.extend(
+                    Recipe.ingredients.through(
+                        recipe_id=recipe.id,
+                        ingredient_id=ingredient.id
+                    )
+                    for ingredient in rng.sample(ingredients, 5)
+                )
+                image_rows.append(
+                    Recipe.images.through(
+                        recipe_id=recipe.id,
+                        image_id=image.id
+                    )
+                )
+            Recipe.tags.through.objects.bulk_create(tag_rows)
+            Recipe.ingredients.through.objects.bulk_create(ingredient_rows)
+            Recipe.images.through.objects.bulk_create(image_rows)
+
+        # The relations are inserted without the signals counting them.
+        Tag.objects.rebuild_recipe_counts()
+        Ingredient.objects.rebuild_recipe_counts()
+        return users[0], Tag.objects.filter(user=users[0])[:2]
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            for table in SEEDED_TABLES:
+                cursor.execute(f'ANALYZE {table};')
+
+    def drop_composite_indexes(self):
+        with connection.cursor() as cursor:
+            for index in COMPOSITE_INDEXES:
+                cursor.execute(f'DROP INDEX {index};')
+
+    def get_cases(self, tags):
+        tag_ids = ','.join(str(tag.id) for tag in tags)
+        return (
+            ('Recipe list', RecipeViewSet, {}),
+            ('Recipes with any tag', RecipeViewSet, {'tags': tag_ids}),
+            (
+                'Recipes with all tags',
+                RecipeViewSet,
+                {'tags': tag_ids, 'tags_mode': 'all'}
+            ),
+            (
+                'Quick and cheap recipes',
+                RecipeViewSet,
+                {'max_minutes': 30, 'max_price': 10, 'ordering': 'price'}
+            ),
+            (
+                'Quickest recipes',
+                RecipeViewSet,
+                {'ordering': 'minutes_required'}
+            ),
+            ('Tag list', TagViewSet, {}),
+            ('Assigned tags', TagViewSet, {'assigned_only': 1}),
+            ('Most used tags', TagViewSet, {'ordering': '-recipe_count'}),
+            ('Image list', ImageViewSet, {}),
+        )
+
+    def get_list_queryset(self, viewset_class, params, user):
+        """Return the first page queryset the list view would evaluate."""
+        view = viewset_class(action='list', format_kwarg=None)
+        view.request = Request(RequestFactory().get('/', params))
+        view.request.user = user
+        queryset = view.get_queryset()
+        ordering = view.paginator.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        return queryset.order_by(*ordering)[:page_size]
+
+    def explain_cases(self, title, cases, user):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{title}'))
+        for name, viewset_class, params in cases:
+            queryset = self.get_list_queryset(viewset_class, params, user)
+            sql, sql_params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(self.explain_prefix + sql, sql_params)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+            self.stdout.write(self.style.SUCCESS(f'\n{name}'))
+            self.stdout.write(plan)
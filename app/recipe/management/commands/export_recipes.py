@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.export import EXPORT_OUTPUTS, export_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        'Export the recipes of every user, or of the users given by email, '
+        'with the names of their tags and ingredients and the paths of their '
+        'images, as NDJSON or CSV. The recipes are streamed, so the memory '
+        'used does not grow with their number.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            choices=sorted(EXPORT_OUTPUTS),
+            default='ndjson'
+        )
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='emails',
+            help='Email of a user to export, all users by default.'
+        )
+        parser.add_argument(
+            '--file',
+            help='File to write, the standard output by default.'
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options['emails']:
+            users = list(get_user_model().objects.filter(
+                email__in=options['emails']
+            ))
+            missing = set(options['emails']) - {user.email for user in users}
+            if missing:
+                missing = ', '.join(sorted(missing))
+                raise CommandError(f'Unknown users: {missing}')
+
+        chunks = export_recipes(options['output'], users)
+        if options['file'] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(options['file'], 'w', encoding='utf-8', newline='') as file:
+            for chunk in chunks:
+                file.write(chunk)
@@ -0,0 +1,176 @@
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError, \
+    OutputWrapper
+from django.db import connections
+
+from recipe.imports import IMPORT_BATCH_SIZE, IMPORT_INPUTS, Checkpoint, \
+    InvalidRecord, import_recipes
+
+
+def open_input(path):
+    if path == '-':
+        return sys.stdin
+    return open(path, encoding='utf-8', newline='')
+
+
+# The options passed to the workers.
+WORKER_OPTIONS = (
+    'file', 'input', 'user', 'batch_size', 'checkpoint', 'skip_invalid',
+    'verbosity',
+)
+
+
+def get_checkpoint(options, worker, workers):
+    if not options['checkpoint']:
+        return None
+    path = options['checkpoint']
+    if workers > 1:
+        path = f'{path}.{worker}-of-{workers}'
+    return Checkpoint(path, options['file'])
+
+
+def run_worker(options, worker, workers, report=None):
+    """Import the records of the users of a worker, returning its
+    ImportResult."""
+    checkpoint = get_checkpoint(options, worker, workers)
+
+    default_user = None
+    if options['user']:
+        default_user = get_user_model().objects.get(email=options['user'])
+
+    if report is None and options['verbosity']:
+        stdout = OutputWrapper(sys.stdout)
+
+        def report(message):
+            stdout.write(f'Worker {worker}: {message}')
+
+    file = open_input(options['file'])
+    try:
+        return import_recipes(
+            IMPORT_INPUTS[options['input']](file),
+            batch_size=options['batch_size'],
+            default_user=default_user,
+            checkpoint=checkpoint,
+            skip_invalid=options['skip_invalid'],
+            worker=worker,
+            workers=workers,
+            report=report
+        )
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Import recipes from NDJSON or CSV, in the format of export_recipes, '
+        'creating the tags and ingredients named by the recipes of each user '
+        'and linking the images of the user by path. Recipes are written in '
+        'batches, optionally by parallel processes each importing the '
+        'recipes of part of the users, and a checkpoint lets a failed import '
+        'resume after its last written batch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'file',
+            help='File to read, "-" for the standard input.'
+        )
+        parser.add_argument(
+            '--input',
+            choices=sorted(IMPORT_INPUTS),
+            help='Format of the file, by its extension by default.'
+        )
+        parser.add_argument(
+            '--user',
+            help='Email of the user of the recipes with none.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help='Number of recipes written per transaction.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes importing the recipes.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='File recording the progress of the import, to resume it '
+                 'if it fails. It is removed once the import is over.'
+        )
+        parser.add_argument(
+            '--skip-invalid',
+            action='store_true',
+            help='Report invalid recipes and go on, instead of stopping.'
+        )
+
+    def handle(self, *args, **options):
+        if options['input'] is None:
+            options['input'] = \
+                'csv' if options['file'].endswith('.csv') else 'ndjson'
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('The batch size and workers must be positive.')
+        if options['workers'] > 1 and options['file'] == '-':
+            raise CommandError('Workers each read the file, which cannot be '
+                               'the standard input.')
+        if options['user'] and not get_user_model().objects.filter(
+                email=options['user']).exists():
+            raise CommandError(f'Unknown user: {options["user"]}')
+        for worker in range(options['workers']):
+            checkpoint = get_checkpoint(options, worker, options['workers'])
+            if checkpoint is None:
+                break
+            try:
+                checkpoint.load()
+            except ValueError as error:
+                raise CommandError(error)
+
+        start = time.monotonic()
+        try:
+            results = self.run(options)
+        except InvalidRecord as error:
+            raise CommandError(error)
+        seconds = time.monotonic() - start
+
+        recipes = sum(result.recipes for result in results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {recipes} recipes in {seconds:.1f}s, '
+            f'{recipes / seconds if seconds else 0:.0f} recipes/s.'
+        ))
+        invalid = sum(result.invalid for result in results)
+        if invalid:
+            self.stdout.write(self.style.WARNING(
+                f'Skipped {invalid} invalid recipes.'
+            ))
+        missing_images = sum(result.missing_images for result in results)
+        if missing_images:
+            self.stdout.write(self.style.WARNING(
+                f'Skipped {missing_images} unknown image paths.'
+            ))
+
+    def run(self, options):
+        workers = options['workers']
+        options = {name: options[name] for name in WORKER_OPTIONS}
+        if workers == 1:
+            return [run_worker(options, 0, 1, self.stdout.write)]
+
+        # Forked rather than spawned workers, so they share the settings of
+        # the command, but without its connections.
+        connections.close_all()
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('fork')) as executor:
+            futures = [
+                executor.submit(run_worker, options, worker, workers)
+                for worker in range(workers)
+            ]
+            return [future.result() for future in futures]
@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.benchmark import BENCHMARK_EMAIL_DOMAIN, BENCHMARK_PASSWORD, \
+    SEED_BATCH_SIZE, DatasetSeeder, get_dataset_size
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic dataset for benchmark_endpoints: users with a '
+        'realistic spread of recipes, tags, ingredients and images, the same '
+        'for the same seed. Use a dedicated database, which '
+        '`manage.py flush` empties before seeding it again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=10000,
+            help='Number of recipes, from thousands to tens of millions.'
+        )
+        parser.add_argument(
+            '--recipes-per-user',
+            type=int,
+            default=50,
+            help='Mean number of recipes per user.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SEED_BATCH_SIZE,
+            help='Number of recipes written per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        if min(options['recipes'], options['recipes_per_user'],
+               options['batch_size']) < 1:
+            raise CommandError('The numbers of recipes must be positive.')
+        if get_user_model().objects.filter(
+                email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}').exists():
+            raise CommandError(
+                'The database already has a benchmark dataset, run '
+                '`manage.py flush` first.'
+            )
+
+        DatasetSeeder(options['seed'], self.stdout.write).seed(
+            options['recipes'],
+            options['recipes_per_user'],
+            options['batch_size']
+        )
+        size = get_dataset_size()
+        self.stdout.write(self.style.SUCCESS(', '.join(
+            f'{count} {name}' for name, count in size.items()
+        ) + f' seeded. Users log in with the password {BENCHMARK_PASSWORD}.'))
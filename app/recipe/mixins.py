@@ -0,0 +1,257 @@
+import hashlib
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import exceptions
+from rest_framework.response import Response
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from core.middleware import timed_serialization
+
+from .cache import get_cached_response, get_response_key, set_cached_response
+from .pagination import KeysetPagination
+
+# The headers of a response kept in the response cache.
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+
+def wrap_retrieve(cls, method_name):
+    """Make the retrieve action of a viewset class, when it has one, hand
+    its handler to the `method_name` method of a mixin.
+
+    Defining retrieve on the mixin instead would route detail URLs for the
+    viewsets which have no such action. Mixins call it after
+    `super().__init_subclass__()`, so that the first of them in the MRO stays
+    the outermost, like with methods.
+    """
+    retrieve = getattr(cls, 'retrieve', None)
+    if retrieve is None or any(
+        method_name in getattr(base.__dict__.get('retrieve'), 'wrapped_by', ())
+        for base in cls.__mro__
+    ):
+        return
+
+    def wrapped_retrieve(self, request, *args, **kwargs):
+        handler = partial(retrieve, self, request, *args, **kwargs)
+        return getattr(self, method_name)(handler)
+
+    wrapped_retrieve.wrapped_by = \
+        getattr(retrieve, 'wrapped_by', ()) + (method_name,)
+    cls.retrieve = wrapped_retrieve
+
+
+class ConditionalGetMixin:
+    """Answer list and retrieve requests with 304 Not Modified when the copy
+    of the client is still current, which is decided from an aggregate over
+    the `updated_at` of the rows instead of serializing them.
+
+    Lists are identified by the number of rows and their latest modification,
+    which changes with any addition, change or removal. Removals do not show
+    in a modification time, so only details also get a Last-Modified.
+
+    The retrieve action is only wrapped for viewsets which have one.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        wrap_retrieve(cls, 'conditional_retrieve')
+
+    def get_etag(self, *state):
+        # A representation differs between renderers and between the list
+        # and detail serializers.
+        state = (self.request.accepted_renderer.format, self.action) + state
+        content = ':'.join(str(value) for value in state)
+        return hashlib.md5(content.encode()).hexdigest()
+
+    def conditional_response(self, handler, etag, last_modified=None):
+        timestamp = None
+        if last_modified is not None:
+            timestamp = int(last_modified.timestamp())
+
+        response = get_conditional_response(
+            self.request, etag=quote_etag(etag), last_modified=timestamp
+        )
+        if response is None:
+            response = handler()
+        response['ETag'] = quote_etag(etag)
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        state = self.filter_queryset(self.get_queryset()).aggregate(
+            count=Count('pk'), last_modified=Max('updated_at')
+        )
+        etag = self.get_etag(state['count'], state['last_modified'])
+        return self.conditional_response(
+            partial(super().list, request, *args, **kwargs), etag
+        )
+
+    def conditional_retrieve(self, handler):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup = self.kwargs[lookup_url_kwarg]
+        try:
+            last_modified = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: lookup}
+            ).prefetch_related(None).values_list(
+                'updated_at', flat=True
+            ).first()
+        except (TypeError, ValueError, ValidationError):
+            last_modified = None
+        if last_modified is None:
+            # Not found, which is left to the regular lookup to report.
+            return handler()
+
+        etag = self.get_etag(lookup, last_modified)
+        return self.conditional_response(handler, etag, last_modified)
+
+
+class CachedResponseMixin:
+    """Serve list and retrieve responses from the RESPONSE_CACHE, per user
+    and URL, so repeated reads neither query the database nor serialize
+    anything.
+
+    Entries are made stale by any change to the data of their user, see
+    `recipe.signals`. A cached ETag still answers 304 Not Modified. The
+    retrieve action is only wrapped for viewsets which have one.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        wrap_retrieve(cls, 'cached_response')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(partial(super().list, request, *args,
+                                            **kwargs))
+
+    def cached_response(self, handler):
+        if not settings.RESPONSE_CACHE['TIMEOUT']:
+            return handler()
+
+        user_id = self.request.user.pk
+        key = get_response_key(
+            user_id,
+            self.action,
+            self.request.accepted_renderer.format,
+            # The links of the pages are absolute URLs.
+            self.request.scheme,
+            self.request.get_host(),
+            self.request.get_full_path()
+        )
+        cached, version = get_cached_response(user_id, key)
+        if cached is not None:
+            return self.get_cached_response(*cached)
+
+        response = handler()
+        if response.status_code == 200:
+            headers = {
+                header: response[header] for header in CACHED_HEADERS
+                if response.has_header(header)
+            }
+            set_cached_response(key, version, (response.data, headers))
+        return response
+
+    def get_cached_response(self, data, headers):
+        response = get_conditional_response(
+            self.request,
+            etag=headers.get('ETag'),
+            last_modified=parse_http_date_safe(headers.get('Last-Modified'))
+        )
+        if response is None:
+            response = Response(data)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+
+class OrderingMixin:
+    """Order lists by the `ordering` parameter, one of the keys of
+    `orderings`.
+
+    The orderings end with a unique field, so that the keyset pagination,
+    which is given the ordering, has a unique position.
+    """
+    orderings = {}
+
+    def get_ordering(self):
+        """Return the ordering of the `ordering` parameter, or None to keep
+        the default one."""
+        ordering = self.request.query_params.get('ordering')
+        if not ordering:
+            return None
+        if ordering not in self.orderings:
+            choices = ', '.join(f'"{choice}"' for choice in self.orderings)
+            msg = f'ordering must be one of {choices}.'
+            raise exceptions.ValidationError({'ordering': [msg]})
+        return self.orderings[ordering]
+
+    @property
+    def paginator(self):
+        paginator = super().paginator
+        ordering = self.get_ordering()
+        if isinstance(paginator, KeysetPagination) and ordering:
+            paginator.ordering = ordering
+        return paginator
+
+
+class RowListMixin:
+    """List objects from rows read with values() and represented by the
+    RowRepresentationMixin of the serializer, rather than from model
+    instances represented field by field.
+
+    The related pks of the many relations are read from their through
+    tables, with one query per relation for the whole page, in pk order like
+    the prefetches of the other actions.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        if not hasattr(serializer_class, 'to_row_representations'):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        pk_name = queryset.model._meta.pk.name
+        columns = serializer_class.get_row_columns()
+        if pk_name not in columns:
+            columns.append(pk_name)
+        rows = queryset.prefetch_related(None).values(*columns)
+
+        page = self.paginate_queryset(rows)
+        if page is None:
+            page = list(rows)
+        _, relations = serializer_class.get_row_fields()
+        for field_name in relations:
+            self.add_related_pks(queryset.model, page, field_name)
+
+        with timed_serialization(request):
+            # With the serializer, like the data of the serializers.
+            data = ReturnList(
+                serializer_class.to_row_representations(page),
+                serializer=self.get_serializer(many=True)
+            )
+        if self.paginator is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+    def add_related_pks(self, model, rows, field_name):
+        """Set the pks related to every row by a many to many field, as a
+        list under the name of the field."""
+        field = model._meta.get_field(field_name)
+        through = field.remote_field.through
+        column = f'{field.m2m_field_name()}_id'
+        related_column = f'{field.m2m_reverse_field_name()}_id'
+        pk_name = model._meta.pk.name
+
+        related_pks = {row[pk_name]: [] for row in rows}
+        if related_pks:
+            pairs = through.objects.filter(
+                **{f'{column}__in': list(related_pks)}
+            ).order_by(related_column).values_list(column, related_column)
+            for pk, related_pk in pairs:
+                related_pks[pk].append(related_pk)
+        for row in rows:
+            row[field_name] = related_pks[row[pk_name]]
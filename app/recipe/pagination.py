@@ -0,0 +1,156 @@
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def reverse_ordering(ordering):
+    return tuple(
+        field[1:] if field.startswith('-') else f'-{field}'
+        for field in ordering
+    )
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination that filters on the ordering key instead of using
+    OFFSET, so every page costs the same no matter how deep it is.
+
+    The orderings end with a unique field and a cursor holds the values of
+    all of them, so rows sharing a price or a duration are paged through
+    without offsets either.
+
+    The page size defaults to the `PAGE_SIZE` REST framework setting and can
+    be changed by the client through the `page_size` query parameter.
+    """
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, position = self.cursor or (0, False, None)
+
+        ordering = reverse_ordering(self.ordering) if reverse \
+            else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(ordering, position)
+            )
+
+        # One more row tells whether there is a following page.
+        try:
+            results = list(queryset[offset:offset + self.page_size + 1])
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+
+        has_position = position is not None or offset > 0
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = has_position, position
+            self.has_previous = following_position is not None
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.next_position = following_position
+            self.has_previous, self.previous_position = has_position, position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_position_filter(self, ordering, position):
+        """Return the condition of the rows after a position in an ordering.
+
+        That is `(a, b) > (x, y)`, written as `a >= x AND (a > x OR
+        (a = x AND b > y))` with `<` for the descending fields, so an index
+        on the fields can start the scan at the position.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = None
+        for field, value in reversed(list(zip(ordering, values))):
+            name, lookup = field.lstrip('-'), self.get_lookup(field)
+            after = Q(**{f'{name}__{lookup}': value})
+            if condition is not None:
+                after |= Q(**{name: value}) & condition
+            condition = after
+
+        name, lookup = ordering[0].lstrip('-'), self.get_lookup(ordering[0])
+        return Q(**{f'{name}__{lookup}e': values[0]}) & condition
+
+    def get_lookup(self, field):
+        return 'lt' if field.startswith('-') else 'gt'
+
+    def _get_position_from_instance(self, instance, ordering):
+        names = [field.lstrip('-') for field in ordering]
+        # Rows read with values() are dicts.
+        if isinstance(instance, dict):
+            values = [instance[name] for name in names]
+        else:
+            values = [getattr(instance, name) for name in names]
+        return json.dumps([str(value) for value in values])
+
+
+class AttributeModelPagination(KeysetPagination):
+    ordering = ('-name', 'id')
+
+
+class SearchPagination(LimitOffsetPagination):
+    """Offset pagination of search results, which are ordered by relevance
+    instead of a key.
+
+    A page is read with one more row than its limit, to know whether there is
+    a next one without counting every result. The page size defaults to the
+    `PAGE_SIZE` REST framework setting and can be changed by the client
+    through the `limit` query parameter.
+    """
+    max_limit = 500
+    template = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        self.request = request
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit
+        return results[:self.limit]
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(
+            url, self.offset_query_param, self.offset + self.limit
+        )
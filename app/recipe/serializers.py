@@ -1,46 +1,233 @@
+from collections import OrderedDict
+
+from django.core.exceptions import ImproperlyConfigured
 from rest_framework import serializers
-from core.models import Tag, Ingredient, Recipe, Image
+from core.derivatives import DERIVATIVES
+from core.middleware import timed_serialization
+from core.models import Tag, Ingredient, Recipe, Image, AttributeModel, \
+    ChangeLog
+from core.signals import record_changes
+
+ATTRIBUTE_NAME_MAX_LENGTH = AttributeModel._meta.get_field('name').max_length
+
+
+def to_attribute_reference(value):
+    """Return the id of a tag or ingredient given by its id, or its name when
+    given one. Numbers are ids, even in strings as sent by forms.
+
+    A name made of digits is given explicitly as `{"name": "2024"}`.
+    """
+    explicit_name = isinstance(value, dict) and list(value) == ['name']
+    if explicit_name:
+        value = value['name']
+    elif isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        value = value.strip()
+        if value.isdigit() and not explicit_name:
+            return int(value)
+        if 0 < len(value) <= ATTRIBUTE_NAME_MAX_LENGTH:
+            return value
+    raise serializers.ValidationError(
+        f'Expected an id or a name of at most {ATTRIBUTE_NAME_MAX_LENGTH} '
+        f'characters.'
+    )
+
+
+def resolve_attribute_names(user, validated_data):
+    """Replace the names of tags and ingredients in validated recipes by the
+    ids of the objects of the user named so, created when missing, with one
+    query per type for all the recipes."""
+    for field_name, model in (('tags', Tag), ('ingredients', Ingredient)):
+        names = {
+            reference for item in validated_data
+            for reference in item.get(field_name, ())
+            if isinstance(reference, str)
+        }
+        if not names:
+            continue
+
+        objects, created = model.objects.get_or_create_by_names(user, names)
+        record_changes(user.pk, model, [obj.pk for obj in created],
+                       ChangeLog.CREATED)
+        for item in validated_data:
+            if field_name in item:
+                item[field_name] = [
+                    objects[reference].pk if isinstance(reference, str)
+                    else reference
+                    for reference in item[field_name]
+                ]
+
+
+class AttributeRelatedField(serializers.PrimaryKeyRelatedField):
+    """A tag or an ingredient given by its id or by its name, the latter
+    being resolved by the serializer when saving."""
 
+    def to_internal_value(self, data):
+        reference = to_attribute_reference(data)
+        if isinstance(reference, str):
+            return reference
+        return super().to_internal_value(reference)
 
-class AttributeModelSerializer(serializers.ModelSerializer):
 
-    def __init__(self, class_model, **kwargs):
-        super().__init__(**kwargs)
+class AttributeReferenceField(serializers.Field):
+    """The id or the name of a tag or an ingredient, as is."""
 
-        class Meta:
-            model = class_model
-            fields = ('id', 'name')
-            read_only_fields = ('id',)
+    def to_internal_value(self, data):
+        return to_attribute_reference(data)
 
-        self.Meta = Meta
+    def to_representation(self, value):
+        return value
+
+
+class TimedDataMixin:
+    """Time the representation of the data of the serializer, when requests
+    are timed, apart from the rest of the view.
+
+    Nested serializers are represented by the data of their parent, so only
+    the outer serializer is timed.
+    """
+
+    @property
+    def data(self):
+        with timed_serialization(self.context.get('request')):
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+
+
+class AttributeModelSerializer(TimedDataMixin, serializers.ModelSerializer):
+
+    class Meta:
+        list_serializer_class = TimedListSerializer
+        fields = ('id', 'name', 'recipe_count')
+        read_only_fields = ('id', 'recipe_count')
 
 
-class ImageSerializer(serializers.ModelSerializer):
+class ImageSerializer(TimedDataMixin, serializers.ModelSerializer):
     # TODO you might change it to True later.
     image = serializers.ImageField(use_url=False)
+    urls = serializers.SerializerMethodField()
 
     class Meta:
+        list_serializer_class = TimedListSerializer
         model = Image
-        fields = ('id', 'image', 'description')
+        fields = ('id', 'image', 'description', 'urls')
         read_only_fields = ('id', )
 
+    def get_urls(self, image):
+        """The URLs of the original and of every derivative of the image, the
+        latter being None until they have been rendered."""
+        urls = {'original': image.image.url if image.image else None}
+        for name, _, _ in DERIVATIVES:
+            field_file = getattr(image, name)
+            urls[name] = field_file.url if field_file else None
+        return urls
+
 
 class TagSerializer(AttributeModelSerializer):
 
-    # TODO remove the "*args" parameter.
-    def __init__(self, *args, **kwargs):
-        super().__init__(Tag, **kwargs)
+    class Meta(AttributeModelSerializer.Meta):
+        model = Tag
 
 
 class IngredientSerializer(AttributeModelSerializer):
 
-    # TODO remove the "*args" parameter.
-    def __init__(self, *args, **kwargs):
-        super().__init__(Ingredient, **kwargs)
+    class Meta(AttributeModelSerializer.Meta):
+        model = Ingredient
+
+
+class NestedTagSerializer(TagSerializer):
+    """Tag of the recipe details, without the count which changes without
+    the recipe."""
+
+    class Meta(TagSerializer.Meta):
+        fields = ('id', 'name')
+
+
+class NestedIngredientSerializer(IngredientSerializer):
+    """Ingredient of the recipe details, without the count which changes
+    without the recipe."""
+
+    class Meta(IngredientSerializer.Meta):
+        fields = ('id', 'name')
+
+
+class RowRepresentationMixin:
+    """Represent plain rows, as read with values(), like the serializer would
+    represent model instances, for read only lists.
+
+    The fields are compiled once per serializer class into the column of
+    each field and the function representing its value, the latter None when
+    the value read from the database is its own representation. The value of
+    a many related field is the list of related pks under its source.
+    """
+    # The fields whose representation of database values is the value itself.
+    raw_field_classes = (serializers.CharField, serializers.IntegerField)
 
+    @classmethod
+    def get_row_fields(cls):
+        """Return the (name, column, representation) triples of the fields
+        and the relations among the columns, compiled on the first call."""
+        compiled = cls.__dict__.get('_compiled_row_fields')
+        if compiled is not None:
+            return compiled
+
+        row_fields, relations = [], []
+        for name, field in cls().fields.items():
+            if '.' in field.source or field.source == '*':
+                raise ImproperlyConfigured(
+                    f'{cls.__name__}.{name} is not a column, it cannot be '
+                    f'represented from a row.'
+                )
+            if isinstance(field, serializers.ManyRelatedField):
+                relations.append(field.source)
+                row_fields.append((name, field.source, None))
+            elif isinstance(field, cls.raw_field_classes):
+                row_fields.append((name, field.source, None))
+            else:
+                row_fields.append(
+                    (name, field.source, field.to_representation)
+                )
+        cls._compiled_row_fields = row_fields, relations
+        return cls._compiled_row_fields
+
+    @classmethod
+    def get_row_columns(cls):
+        """Return the columns to read with values(), the relations excepted."""
+        row_fields, relations = cls.get_row_fields()
+        return [
+            column for _, column, _ in row_fields if column not in relations
+        ]
+
+    @classmethod
+    def to_row_representations(cls, rows):
+        row_fields, _ = cls.get_row_fields()
+        representations = []
+        for row in rows:
+            representation = OrderedDict()
+            for name, column, to_representation in row_fields:
+                value = row[column]
+                if to_representation is not None and value is not None:
+                    value = to_representation(value)
+                representation[name] = value
+            representations.append(representation)
+        return representations
+
+
+class RecipeSerializer(RowRepresentationMixin, TimedDataMixin,
+                       serializers.ModelSerializer):
+    ingredients = AttributeRelatedField(
+        many=True, queryset=Ingredient.objects.all(), required=False
+    )
+    tags = AttributeRelatedField(
+        many=True, queryset=Tag.objects.all(), required=False
+    )
 
-class RecipeSerializer(serializers.ModelSerializer):
     class Meta:
+        list_serializer_class = TimedListSerializer
         model = Recipe
         fields = (
             'id', 'title', 'images', 'minutes_required', 'price',
@@ -48,8 +235,31 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id',)
 
+    def create(self, validated_data):
+        resolve_attribute_names(validated_data['user'], [validated_data])
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        resolve_attribute_names(instance.user, [validated_data])
+        return super().update(instance, validated_data)
+
+
+class BulkRecipeSerializer(RecipeSerializer):
+    """Recipe serializer of the bulk endpoint, which checks the related ids
+    and resolves the names of all the recipes at once rather than one by
+    one."""
+    images = serializers.ListField(
+        child=serializers.IntegerField(), required=False
+    )
+    ingredients = serializers.ListField(
+        child=AttributeReferenceField(), required=False
+    )
+    tags = serializers.ListField(
+        child=AttributeReferenceField(), required=False
+    )
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     images = ImageSerializer(many=True, read_only=True)
-    ingredients = IngredientSerializer(many=True, read_only=True)
-    tags = TagSerializer(many=True, read_only=True)
+    ingredients = NestedIngredientSerializer(many=True, read_only=True)
+    tags = NestedTagSerializer(many=True, read_only=True)
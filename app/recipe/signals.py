@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from core.signals import objects_changed
+
+from .cache import invalidate_user_responses
+
+
+@receiver(objects_changed)
+def invalidate_owner_responses(sender, user_id, **kwargs):
+    invalidate_user_responses(user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_new_user_responses(sender, instance, created, **kwargs):
+    # The id of a new user may have been used before, by a user of a database
+    # that has since been reset.
+    if created:
+        invalidate_user_responses(instance.pk)
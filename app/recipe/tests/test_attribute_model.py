@@ -7,6 +7,7 @@ from rest_framework import status
 
 from core.models import Tag, Recipe
 from recipe.serializers import TagSerializer
+from recipe.views import TagViewSet
 
 # TODO testing the Tag model instead of the Attribute model
 #  because I don't know a way to generate urls and send
@@ -90,7 +91,7 @@ class AuthorizedTagTests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['results'], serializer.data)
 
     def test_user_can_only_see_its_tags(self):
         other_user = get_user_model().objects.create_user(**USER_2)
@@ -101,8 +102,16 @@ class AuthorizedTagTests(TestCase):
         response = self.client.get(TAGS_URL)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['name'], tag.name)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['name'], tag.name)
+
+    def test_tags_have_no_detail_route(self):
+        tag = self.createTag()
+
+        response = self.client.get(f'{TAGS_URL}{tag.id}/')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(hasattr(TagViewSet, 'retrieve'))
 
     def test_create_valid_tag(self):
         payload = {
@@ -128,6 +137,8 @@ class AuthorizedTagTests(TestCase):
         self.createTestRecipe(tags=[tag2])
 
         response = self.client.get(TAGS_URL, {'assigned_only': 1})
+        for tag in (tag1, tag2, unassigned_tag):
+            tag.refresh_from_db()
 
         # TODO see why it doesn't work when you don't pass the tags in a list...
         serializer1 = TagSerializer([tag1], many=True)
@@ -135,10 +146,11 @@ class AuthorizedTagTests(TestCase):
         unassigned_serializer = TagSerializer([unassigned_tag], many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-        self.assertIn(serializer1.data[0], response.data)
-        self.assertIn(serializer2.data[0], response.data)
-        self.assertNotIn(unassigned_serializer.data[0], response.data)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIn(serializer1.data[0], response.data['results'])
+        self.assertIn(serializer2.data[0], response.data['results'])
+        self.assertNotIn(unassigned_serializer.data[0],
+                         response.data['results'])
 
     def test_list_assigned_only_tags_distinct(self):
         tag = self.createTag(name='a')
@@ -148,4 +160,4 @@ class AuthorizedTagTests(TestCase):
         response = self.client.get(TAGS_URL, {'assigned_only': 1})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
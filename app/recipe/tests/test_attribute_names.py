@@ -0,0 +1,154 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db.models.query import QuerySet
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class AttributeNameTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='names@email.com',
+            password='names123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def get_recipe_payload(self, **kwargs):
+        payload = {'title': 'abc', 'minutes_required': 5, 'price': '5.00'}
+        payload.update(kwargs)
+        return payload
+
+    def test_create_recipe_with_tag_and_ingredient_names(self):
+        existing = Tag.objects.create(user=self.user, name='vegan')
+
+        response = self.client.post(RECIPE_URL, self.get_recipe_payload(
+            tags=['vegan', 'quick'], ingredients=['salt']
+        ), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=response.data['id'])
+        quick = Tag.objects.get(user=self.user, name='quick')
+        self.assertEqual(
+            sorted(response.data['tags']), sorted([existing.id, quick.id])
+        )
+        self.assertEqual(
+            list(recipe.ingredients.values_list('name', flat=True)), ['salt']
+        )
+
+    def test_ids_and_names_can_be_mixed(self):
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        recipe = Recipe.objects.create(
+            user=self.user, title='abc', minutes_required=5, price=5
+        )
+
+        response = self.client.patch(
+            reverse('recipe:recipe-detail', args=[recipe.id]),
+            {'tags': [tag.id, 'quick']},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['quick', 'vegan']
+        )
+
+    def test_tags_and_ingredients_may_share_a_name(self):
+        Tag.objects.create(user=self.user, name='chocolate')
+
+        Ingredient.objects.create(user=self.user, name='chocolate')
+
+        self.assertEqual(Ingredient.objects.get().kind, 'ingredient')
+
+    def test_duplicate_tag_name_is_rejected(self):
+        Tag.objects.create(user=self.user, name='vegan')
+
+        response = self.client.post(TAGS_URL, {'name': 'vegan'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_concurrently_taken_tag_name_is_rejected(self):
+        Tag.objects.create(user=self.user, name='vegan')
+
+        # As if the name was taken after being checked.
+        with patch.object(QuerySet, 'exists', return_value=False):
+            response = self.client.post(TAGS_URL, {'name': 'vegan'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', response.data)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_names_made_of_digits_are_given_explicitly(self):
+        tag = Tag.objects.create(user=self.user, name='2024')
+
+        response = self.client.post(RECIPE_URL, self.get_recipe_payload(
+            tags=[{'name': '2024'}, tag.id],
+            ingredients=[{'name': '42'}]
+        ), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['tags'], [tag.id])
+        self.assertEqual(
+            Ingredient.objects.get(pk=response.data['ingredients'][0]).name,
+            '42'
+        )
+
+    def test_json_digits_are_ids(self):
+        tag = Tag.objects.create(user=self.user, name='vegan')
+
+        response = self.client.post(RECIPE_URL, self.get_recipe_payload(
+            tags=[str(tag.id)]
+        ), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['tags'], [tag.id])
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_form_digits_are_ids(self):
+        tag = Tag.objects.create(user=self.user, name='vegan')
+
+        response = self.client.post(RECIPE_URL, self.get_recipe_payload(
+            tags=[str(tag.id)]
+        ))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['tags'], [tag.id])
+
+    def test_bulk_recipes_resolve_names_together(self):
+        payload = [
+            self.get_recipe_payload(tags=['vegan', f'tag {index}'])
+            for index in range(10)
+        ]
+
+        response = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(name='vegan').count(), 1)
+        self.assertEqual(Tag.objects.count(), 11)
+        self.assertEqual(len(response.data[0]['tags']), 2)
+
+    def test_get_or_create_by_names(self):
+        existing = Tag.objects.create(user=self.user, name='a')
+
+        objects, created = Tag.objects.get_or_create_by_names(
+            self.user, ['a', 'b', 'c']
+        )
+
+        self.assertEqual(objects['a'], existing)
+        self.assertEqual(sorted(obj.name for obj in created), ['b', 'c'])
+        self.assertEqual(
+            sorted(Tag.objects.values_list('name', flat=True)),
+            ['a', 'b', 'c']
+        )
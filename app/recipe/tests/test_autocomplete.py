@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class NameCompletionTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='complete@email.com',
+            password='complete123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def complete(self, prefix, url=TAGS_URL, **params):
+        response = self.client.get(url, {'prefix': prefix, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in response.data]
+
+    def test_names_starting_with_the_prefix_in_name_order(self):
+        for name in ('Sweet', 'spicy', 'Salty', 'Sour', 'Vegan'):
+            Tag.objects.create(user=self.user, name=name)
+
+        self.assertEqual(
+            self.complete('s'), ['Salty', 'Sour', 'spicy', 'Sweet']
+        )
+        self.assertEqual(self.complete('SP'), ['spicy'])
+        self.assertEqual(self.complete('x'), [])
+
+    def test_wildcards_are_matched_literally(self):
+        Tag.objects.create(user=self.user, name='100% juice')
+        Tag.objects.create(user=self.user, name='1000 calories')
+
+        self.assertEqual(self.complete('100%'), ['100% juice'])
+        self.assertEqual(self.complete('10_'), [])
+
+    def test_completions_are_limited(self):
+        Tag.objects.bulk_create(
+            Tag(user=self.user, name=f'tag {index:02}') for index in range(60)
+        )
+
+        self.assertEqual(len(self.complete('tag')), 10)
+        self.assertEqual(self.complete('tag', limit=3),
+                         ['tag 00', 'tag 01', 'tag 02'])
+        self.assertEqual(len(self.complete('tag', limit=100)), 50)
+
+    def test_completions_are_limited_to_the_user_and_kind(self):
+        other_user = get_user_model().objects.create_user(
+            email='other@email.com',
+            password='complete123'
+        )
+        Tag.objects.create(user=other_user, name='Basil')
+        Ingredient.objects.create(user=self.user, name='Basil')
+
+        self.assertEqual(self.complete('bas'), [])
+        self.assertEqual(self.complete('bas', url=INGREDIENTS_URL), ['Basil'])
+
+    def test_assigned_only_completions(self):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pesto',
+            minutes_required=5,
+            price=5.00
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Green'))
+        Tag.objects.create(user=self.user, name='Grilled')
+
+        self.assertEqual(self.complete('gr', assigned_only=1), ['Green'])
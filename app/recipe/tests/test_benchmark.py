@@ -0,0 +1,115 @@
+import json
+import os
+import random
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import get_resolver
+
+from core.models import ChangeLog, Image, Ingredient, Recipe, Tag
+from recipe.benchmark import BENCHMARK_CASES, get_recipe_counts
+
+
+def get_url_names(namespace):
+    urlconf = get_resolver().namespace_dict[namespace][1]
+    return {
+        f'{namespace}:{name}' for name in urlconf.reverse_dict
+        if isinstance(name, str)
+    }
+
+
+class SeedBenchmarkTests(TestCase):
+
+    def seed(self, **options):
+        out = StringIO()
+        call_command('seed_benchmark', recipes=300, recipes_per_user=30,
+                     stdout=out, **options)
+        return out.getvalue()
+
+    def test_recipe_counts(self):
+        counts = get_recipe_counts(random.Random(1), 1000, 10)
+
+        self.assertEqual(len(counts), 100)
+        self.assertEqual(sum(counts), 1000)
+        self.assertGreater(max(counts), 3 * min(counts))
+        self.assertEqual(counts, get_recipe_counts(random.Random(1), 1000, 10))
+
+    def test_seed_dataset(self):
+        out = self.seed()
+
+        self.assertIn('10 users, 300 recipes', out)
+        self.assertEqual(Recipe.objects.count(), 300)
+        self.assertTrue(Tag.objects.exists())
+        self.assertTrue(Ingredient.objects.exists())
+        self.assertTrue(Image.objects.exists())
+        self.assertFalse(
+            Recipe.objects.filter(search_vector__isnull=True).exists()
+        )
+        self.assertEqual(Tag.objects.rebuild_recipe_counts(), [])
+        self.assertEqual(Ingredient.objects.rebuild_recipe_counts(), [])
+        self.assertEqual(
+            ChangeLog.objects.filter(model='recipe').count(), 300
+        )
+
+    def test_seed_is_refused_over_a_dataset(self):
+        self.seed()
+
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+class BenchmarkEndpointsTests(TestCase):
+
+    def setUp(self):
+        call_command('seed_benchmark', recipes=100, recipes_per_user=50,
+                     stdout=StringIO())
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def benchmark(self, **options):
+        out = StringIO()
+        call_command('benchmark_endpoints', requests=2, warmup=1,
+                     results_dir=self.directory.name, stdout=out, **options)
+        return out.getvalue()
+
+    def test_every_endpoint_is_benchmarked(self):
+        url_names = get_url_names('recipe') | get_url_names('user')
+
+        self.assertEqual(
+            url_names - {case.url_name for case in BENCHMARK_CASES}, set()
+        )
+
+    def test_benchmark_saves_results(self):
+        recipes = Recipe.objects.count()
+
+        out = self.benchmark()
+
+        self.assertNotIn('failed', out)
+        path = os.path.join(self.directory.name,
+                            os.listdir(self.directory.name)[0])
+        with open(path) as file:
+            results = json.load(file)
+        self.assertEqual(results['dataset']['recipes'], 100)
+        self.assertEqual(len(results['results']), len(BENCHMARK_CASES))
+        for result in results['results']:
+            self.assertEqual(result['requests'], 2)
+            self.assertEqual(result['errors'], 0, result['name'])
+            self.assertGreater(result['p99_ms'], 0)
+            self.assertGreater(result['requests_per_second_single_client'], 0)
+            self.assertNotIn('throughput', result)
+        self.assertEqual(Recipe.objects.count(), recipes)
+
+    def test_compare_with_earlier_results(self):
+        self.benchmark(cases=['tag list'])
+        path = os.path.join(self.directory.name,
+                            os.listdir(self.directory.name)[0])
+
+        out = self.benchmark(cases=['tag list'], compare=path, no_save=True)
+
+        self.assertIn('Tag list', out)
+        self.assertIn('before', out)
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
@@ -0,0 +1,252 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory, \
+    force_authenticate
+from rest_framework.viewsets import GenericViewSet
+
+from core.models import ChangeLog, Recipe, Tag
+from recipe.bulk import BulkModelMixin
+from recipe.views import RecipeViewSet, TagViewSet
+
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+TAG_BULK_URL = reverse('recipe:tag-bulk')
+
+
+class BulkTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = self.create_user('bulk@email.com')
+        self.client.force_authenticate(self.user)
+
+    def create_user(self, email):
+        return get_user_model().objects.create_user(
+            email=email,
+            password='bulk123'
+        )
+
+    def create_recipe(self, title='abc'):
+        return Recipe.objects.create(
+            user=self.user, title=title, minutes_required=5, price=5.00
+        )
+
+    def get_recipe_payload(self, title='abc', **kwargs):
+        payload = {'title': title, 'minutes_required': 5, 'price': '5.00'}
+        payload.update(kwargs)
+        return payload
+
+    def test_bulk_create_recipes(self):
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('a', 'b')]
+        payload = [
+            self.get_recipe_payload(title=str(index),
+                                    tags=[tag.id for tag in tags])
+            for index in range(50)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(RECIPE_BULK_URL, payload,
+                                        format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 50)
+        self.assertEqual(response.data[0]['tags'], [tag.id for tag in tags])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 50)
+        self.assertEqual(
+            Recipe.tags.through.objects.filter(tag__in=tags).count(), 100
+        )
+        # The number of queries does not depend on the number of recipes.
+        self.assertLess(len(queries), 20)
+        self.assertEqual(ChangeLog.objects.filter(
+            model='recipe', action=ChangeLog.CREATED
+        ).count(), 50)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        other_tag = Tag.objects.create(
+            user=self.create_user('other@email.com'), name='other'
+        )
+        payload = [
+            self.get_recipe_payload(),
+            self.get_recipe_payload(title=''),
+            self.get_recipe_payload(tags=[other_tag.id]),
+        ]
+
+        response = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('title', response.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+        payload.pop(1)
+        response = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('tags', response.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_update_recipes(self):
+        first = self.create_recipe()
+        second = self.create_recipe()
+        tag = Tag.objects.create(user=self.user, name='a')
+        first.tags.add(Tag.objects.create(user=self.user, name='b'))
+
+        response = self.client.patch(RECIPE_BULK_URL, [
+            {'id': first.id, 'tags': [tag.id]},
+            {'id': second.id, 'title': 'new', 'price': '2.50'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(list(first.tags.all()), [tag])
+        self.assertEqual(first.title, 'abc')
+        self.assertEqual(second.title, 'new')
+        self.assertEqual(str(second.price), '2.50')
+        self.assertEqual(response.data[1]['title'], 'new')
+
+    def test_bulk_update_unknown_recipe(self):
+        recipe = self.create_recipe()
+
+        response = self.client.patch(RECIPE_BULK_URL, [
+            {'id': recipe.id, 'title': 'new'},
+            {'id': recipe.id + 1, 'title': 'new'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, [{}, {'id': ['Not found.']}])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'abc')
+
+    def test_bulk_delete_recipes(self):
+        recipes = [self.create_recipe() for _ in range(3)]
+
+        response = self.client.delete(
+            RECIPE_BULK_URL, [recipe.id for recipe in recipes[:2]],
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Recipe.objects.all()), recipes[2:])
+        # Logged together, with a single query.
+        self.assertEqual(ChangeLog.objects.filter(
+            model='recipe', action=ChangeLog.DELETED
+        ).count(), 2)
+
+    def test_bulk_requires_a_list(self):
+        response = self.client.post(
+            RECIPE_BULK_URL, self.get_recipe_payload(), format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_methods_without_a_hook_are_not_allowed(self):
+        class DeleteOnlyViewSet(BulkModelMixin, GenericViewSet):
+            queryset = Tag.objects.all()
+
+        request = APIRequestFactory().post('/', [{'name': 'a'}],
+                                           format='json')
+        force_authenticate(request, self.user)
+        view = DeleteOnlyViewSet.as_view({'post': 'bulk'})
+
+        response = view(request)
+
+        self.assertEqual(response.status_code,
+                         status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_item_limit(self):
+        payload = [self.get_recipe_payload() for _ in range(3)]
+
+        with patch.object(RecipeViewSet, 'bulk_max_items', 2):
+            response = self.client.post(
+                RECIPE_BULK_URL, payload, format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_update_and_delete_tags(self):
+        response = self.client.post(
+            TAG_BULK_URL, [{'name': 'a'}, {'name': 'b'}], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        ids = [item['id'] for item in response.data]
+        self.assertEqual(
+            sorted(Tag.objects.values_list('name', flat=True)), ['a', 'b']
+        )
+
+        recipe = self.create_recipe()
+        recipe.tags.add(ids[0])
+        response = self.client.patch(
+            TAG_BULK_URL, [{'id': ids[0], 'name': 'c'}], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Tag.objects.get(id=ids[0]).name, 'c')
+        self.assertTrue(ChangeLog.objects.filter(
+            model='recipe', object_id=recipe.id, action=ChangeLog.UPDATED
+        ).exists())
+
+        response = self.client.delete(TAG_BULK_URL, ids, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_update_to_a_concurrently_taken_name_is_rejected(self):
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('a', 'b')]
+
+        # As if the name was taken after being checked.
+        with patch.object(TagViewSet, 'validate_bulk_items',
+                          return_value=[{}]):
+            response = self.client.patch(
+                TAG_BULK_URL, [{'id': tags[0].id, 'name': 'b'}],
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', response.data)
+        tags[0].refresh_from_db()
+        self.assertEqual(tags[0].name, 'a')
+
+    def delete_tags_of_recipes(self, count):
+        recipe = self.create_recipe()
+        tags = [Tag.objects.create(user=self.user, name=f'tag {i}')
+                for i in range(count)]
+        recipe.tags.add(*tags)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(
+                TAG_BULK_URL, [tag.id for tag in tags], format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        recipe.refresh_from_db()
+        # Without the names of the deleted tags.
+        self.assertEqual(recipe.search_vector, f"'u{self.user.pk}xabc':1A")
+        return len(queries)
+
+    def test_bulk_delete_queries_do_not_grow_with_the_items(self):
+        self.assertEqual(
+            self.delete_tags_of_recipes(2), self.delete_tags_of_recipes(6)
+        )
+
+    def test_bulk_delete_recipes_uncounts_their_tags(self):
+        tag = Tag.objects.create(user=self.user, name='a')
+        recipes = [self.create_recipe() for _ in range(3)]
+        for recipe in recipes:
+            recipe.tags.add(tag)
+
+        self.client.delete(
+            RECIPE_BULK_URL, [recipe.id for recipe in recipes[:2]],
+            format='json'
+        )
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
@@ -0,0 +1,24 @@
+from io import StringIO
+
+from django.test import TestCase
+from django.core.management import call_command
+
+from core.models import Recipe
+
+
+class CommandsTest(TestCase):
+
+    def test_explain_indexes_rolls_back(self):
+        out = StringIO()
+        call_command(
+            'explain_indexes',
+            users=2,
+            recipes_per_user=10,
+            attributes_per_user=5,
+            stdout=out
+        )
+        output = out.getvalue()
+
+        self.assertIn('Without composite indexes', output)
+        self.assertIn('With composite indexes', output)
+        self.assertFalse(Recipe.objects.exists())
@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def get_detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+# Without the response cache, which would answer before the validators are
+# computed.
+@override_settings(RESPONSE_CACHE={'CACHE_ALIAS': 'responses', 'TIMEOUT': 0})
+class ConditionalRequestTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='conditional@email.com',
+            password='conditional123'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = self.create_recipe()
+
+    def create_recipe(self, title='abc'):
+        return Recipe.objects.create(
+            user=self.user, title=title, minutes_required=5, price=5.00
+        )
+
+    def get_etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response['ETag']
+
+    def assertNotModified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def assertModified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unchanged_list_is_not_serialized(self):
+        etag = self.get_etag(RECIPE_URL)
+
+        # Only the aggregate is queried.
+        with self.assertNumQueries(1):
+            self.assertNotModified(RECIPE_URL, etag)
+
+    def test_list_changes_with_its_recipes(self):
+        etag = self.get_etag(RECIPE_URL)
+        recipe = self.create_recipe()
+        self.assertModified(RECIPE_URL, etag)
+
+        etag = self.get_etag(RECIPE_URL)
+        recipe.delete()
+        self.assertModified(RECIPE_URL, etag)
+
+    def test_list_changes_with_the_tags_of_its_recipes(self):
+        etag = self.get_etag(RECIPE_URL)
+
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='a'))
+
+        self.assertModified(RECIPE_URL, etag)
+
+    def test_detail_changes_with_its_related_objects(self):
+        url = get_detail_url(self.recipe.id)
+        tag = Tag.objects.create(user=self.user, name='a')
+        self.recipe.tags.add(tag)
+
+        etag = self.get_etag(url)
+        self.assertNotModified(url, etag)
+
+        tag.name = 'b'
+        tag.save()
+        self.assertModified(url, etag)
+
+        etag = self.get_etag(url)
+        tag.delete()
+        self.assertModified(url, etag)
+
+    def test_detail_changes_with_reverse_relation_changes(self):
+        url = get_detail_url(self.recipe.id)
+        tag = Tag.objects.create(user=self.user, name='a')
+        etag = self.get_etag(url)
+
+        tag.recipe_set.add(self.recipe)
+        self.assertModified(url, etag)
+
+        etag = self.get_etag(url)
+        tag.recipe_set.clear()
+        self.assertModified(url, etag)
+
+    def test_detail_is_not_modified_since_it_was_fetched(self):
+        url = get_detail_url(self.recipe.id)
+        response = self.client.get(url)
+
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_missing_detail_is_not_found(self):
+        response = self.client.get(get_detail_url(self.recipe.id + 1))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_attribute_list_changes_with_its_attributes(self):
+        tag = Tag.objects.create(user=self.user, name='a')
+        etag = self.get_etag(TAGS_URL)
+        self.assertNotModified(TAGS_URL, etag)
+
+        tag.name = 'b'
+        tag.save()
+
+        self.assertModified(TAGS_URL, etag)
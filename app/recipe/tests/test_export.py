@@ -0,0 +1,151 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Image, Ingredient, Recipe, Tag
+
+EXPORT_URL = reverse('recipe:export')
+
+
+class RecipeExportTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='export@email.com',
+            password='export123'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.recipe = self.create_recipe(self.user, 'Crème, "brûlée"')
+        self.recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Sweet'),
+            Tag.objects.create(user=self.user, name='French')
+        )
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Cream')
+        )
+        self.recipe.images.add(
+            Image.objects.create(user=self.user, image='upload/creme.jpg')
+        )
+        self.empty_recipe = self.create_recipe(self.user, 'Water')
+
+        other_user = get_user_model().objects.create_user(
+            email='other@email.com',
+            password='export123'
+        )
+        self.other_recipe = self.create_recipe(other_user, 'Toast')
+
+    def create_recipe(self, user, title):
+        return Recipe.objects.create(
+            user=user,
+            title=title,
+            minutes_required=15,
+            price=4.5,
+            link='https://example.com/'
+        )
+
+    def get_content(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        response = self.client.get(EXPORT_URL)
+
+        self.assertEqual(response['Content-Type'],
+                         'application/x-ndjson; charset=utf-8')
+        lines = self.get_content(response).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {
+                'id': self.recipe.id,
+                'title': 'Crème, "brûlée"',
+                'minutes_required': 15,
+                'price': '4.50',
+                'link': 'https://example.com/',
+                'tags': ['French', 'Sweet'],
+                'ingredients': ['Cream'],
+                'images': ['upload/creme.jpg'],
+            },
+            {
+                'id': self.empty_recipe.id,
+                'title': 'Water',
+                'minutes_required': 15,
+                'price': '4.50',
+                'link': 'https://example.com/',
+                'tags': [],
+                'ingredients': [],
+                'images': [],
+            },
+        ])
+
+    def test_export_csv(self):
+        response = self.client.get(EXPORT_URL, {'output': 'csv'})
+
+        self.assertIn('recipes.csv', response['Content-Disposition'])
+        rows = list(csv.reader(StringIO(self.get_content(response))))
+        self.assertEqual(rows[0], [
+            'id', 'title', 'minutes_required', 'price', 'link', 'tags',
+            'ingredients', 'images',
+        ])
+        self.assertEqual(rows[1], [
+            str(self.recipe.id), 'Crème, "brûlée"', '15', '4.50',
+            'https://example.com/', '["French", "Sweet"]', '["Cream"]',
+            '["upload/creme.jpg"]',
+        ])
+        self.assertEqual(len(rows), 3)
+
+    def test_export_is_streamed_in_chunks(self):
+        with patch('recipe.export.EXPORT_CHUNK_SIZE', 1):
+            response = self.client.get(EXPORT_URL)
+            chunks = list(response.streaming_content)
+
+        self.assertEqual(len(chunks), 2)
+
+    def test_unknown_output_is_rejected(self):
+        response = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('output', response.data)
+
+    def test_export_requires_authentication(self):
+        response = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_command_exports_every_user(self):
+        out = StringIO()
+
+        call_command('export_recipes', stdout=out)
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(
+            [(record['user'], record['title']) for record in records],
+            [('export@email.com', 'Crème, "brûlée"'),
+             ('export@email.com', 'Water'),
+             ('other@email.com', 'Toast')]
+        )
+
+    def test_command_exports_users_to_a_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recipes.csv')
+            call_command('export_recipes', output='csv',
+                         emails=['other@email.com'], file=path)
+            with open(path, encoding='utf-8', newline='') as file:
+                rows = list(csv.reader(file))
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][:2], [str(self.other_recipe.id), 'Toast'])
+
+    def test_command_rejects_unknown_users(self):
+        with self.assertRaises(CommandError):
+            call_command('export_recipes', emails=['nobody@email.com'])
@@ -1,7 +1,7 @@
 import os
 import tempfile
 import PIL
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework import status
 from core.models import Image
 from django.urls import reverse
@@ -46,7 +46,7 @@ class AuthorizedImageTests(TestCase):
         self.create_image()
         response = self.client.get(IMAGES_URL)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
     def test_images_are_limited_to_its_user(self):
         other_user = self.create_user()
@@ -54,13 +54,13 @@ class AuthorizedImageTests(TestCase):
         self.create_image()
         self.create_image()
 
-        images = Image.objects.filter(user=self.user)
+        images = Image.objects.filter(user=self.user).order_by('-id')
         serializer = ImageSerializer(images, many=True)
         response = self.client.get(IMAGES_URL)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-        self.assertEqual(serializer.data, response.data)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(serializer.data, response.data['results'])
 
     def test_upload_valid_image(self):
         with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
@@ -73,6 +73,61 @@ class AuthorizedImageTests(TestCase):
         self.assertEqual(images.count(), 1)
         self.assertTrue(os.path.exists(images[0].image.path))
 
+    def test_upload_response_has_urls(self):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            PIL.Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            response = self.client.post(IMAGES_URL, {'image': ntf},
+                                        format='multipart')
+
+        urls = response.data['urls']
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(urls['original'].endswith(response.data['image']))
+        self.assertIsNone(urls['thumbnail'])
+
+    def upload_image(self, size=(10, 10), image_format='JPEG'):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            PIL.Image.new('RGB', size).save(ntf, format=image_format)
+            ntf.seek(0)
+            return self.client.post(IMAGES_URL, {'image': ntf},
+                                    format='multipart')
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.upload_image()
+        second = self.upload_image()
+
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(first.data['id'], second.data['id'])
+        self.assertEqual(first.data['image'], second.data['image'])
+
+    @override_settings(IMAGE_UPLOAD={'MAX_BYTES': 1024, 'MAX_PIXELS': 10 ** 6})
+    def test_upload_too_large_image(self):
+        response = self.upload_image(size=(500, 500), image_format='BMP')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('1024 bytes', response.data['image'][0])
+        self.assertFalse(Image.objects.exists())
+
+    @override_settings(IMAGE_UPLOAD={'MAX_BYTES': 10 ** 6, 'MAX_PIXELS': 100})
+    def test_upload_image_with_too_many_pixels(self):
+        response = self.upload_image(size=(11, 10))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('100 pixels', response.data['image'][0])
+        self.assertFalse(Image.objects.exists())
+
+    def test_upload_unsupported_image_format(self):
+        response = self.upload_image(image_format='BMP')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Image.objects.exists())
+
+    def test_upload_file_that_is_not_an_image(self):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            ntf.write(b'not an image' * 100)
+            ntf.seek(0)
+            response = self.client.post(IMAGES_URL, {'image': ntf},
+                                        format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Image.objects.exists())
+
     def test_upload_invalid_image(self):
         response = self.client.post(IMAGES_URL, {'image': ''})
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,226 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase
+
+from core.models import ChangeLog, Image, Ingredient, Recipe, Tag
+from recipe.imports import get_worker
+
+RECORDS = [
+    {
+        'user': 'import@email.com',
+        'title': 'Crème brûlée',
+        'minutes_required': 45,
+        'price': '4.50',
+        'link': 'https://example.com/',
+        'tags': ['Sweet', 'French'],
+        'ingredients': ['Cream', 'Sugar'],
+        'images': ['upload/creme.jpg'],
+    },
+    {
+        'user': 'import@email.com',
+        'title': 'Pancakes',
+        'minutes_required': 20,
+        'price': '3.00',
+        'tags': ['Sweet', 'Sweet'],
+    },
+    {
+        'user': 'other@email.com',
+        'title': 'Toast',
+        'minutes_required': 5,
+        'price': '1.00',
+        'ingredients': ['Bread'],
+    },
+]
+
+
+class ImportTestMixin:
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.user = get_user_model().objects.create_user(
+            email='import@email.com',
+            password='import123'
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email='other@email.com',
+            password='import123'
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_ndjson(self, records, name='recipes.ndjson'):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            for record in records:
+                if not isinstance(record, str):
+                    record = json.dumps(record)
+                file.write(record + '\n')
+        return path
+
+    def import_recipes(self, path, **options):
+        out = StringIO()
+        call_command('import_recipes', path, stdout=out, **options)
+        return out.getvalue()
+
+    def get_titles(self, user):
+        return sorted(
+            Recipe.objects.filter(user=user).values_list('title', flat=True)
+        )
+
+
+class ImportRecipesTests(ImportTestMixin, TestCase):
+
+    def test_import_ndjson(self):
+        Tag.objects.create(user=self.user, name='Sweet')
+        image = Image.objects.create(user=self.user, image='upload/creme.jpg')
+
+        out = self.import_recipes(self.write_ndjson(RECORDS))
+
+        self.assertIn('Imported 3 recipes', out)
+        self.assertIn('recipes/s', out)
+        recipe = Recipe.objects.get(title='Crème brûlée')
+        self.assertEqual(recipe.user, self.user)
+        self.assertEqual(str(recipe.price), '4.50')
+        self.assertEqual(
+            sorted(tag.name for tag in recipe.tags.all()), ['French', 'Sweet']
+        )
+        self.assertEqual(list(recipe.images.all()), [image])
+        self.assertEqual(Tag.objects.filter(name='Sweet').count(), 1)
+        self.assertEqual(
+            dict(Tag.objects.values_list('name', 'recipe_count')),
+            {'Sweet': 2, 'French': 1}
+        )
+        self.assertEqual(
+            list(Ingredient.objects.filter(user=self.other_user)
+                 .values_list('name', 'recipe_count')),
+            [('Bread', 1)]
+        )
+        self.assertEqual(self.get_titles(self.other_user), ['Toast'])
+        self.assertIsNotNone(recipe.search_vector)
+        self.assertEqual(
+            ChangeLog.objects.filter(
+                user=self.user, model='recipe', action=ChangeLog.CREATED
+            ).count(), 2
+        )
+
+    def test_import_exported_csv(self):
+        recipe = Recipe.objects.create(
+            user=self.other_user,
+            title='Soup, "hot"',
+            minutes_required=30,
+            price=6
+        )
+        recipe.tags.add(Tag.objects.create(user=self.other_user, name='Warm'))
+        path = os.path.join(self.directory.name, 'recipes.csv')
+        call_command('export_recipes', output='csv', file=path,
+                     emails=['other@email.com'])
+
+        out = self.import_recipes(path, user='import@email.com')
+
+        self.assertIn('Imported 1 recipes', out)
+        imported = Recipe.objects.get(user=self.user)
+        self.assertEqual(imported.title, 'Soup, "hot"')
+        self.assertEqual([tag.name for tag in imported.tags.all()], ['Warm'])
+        self.assertEqual(imported.tags.get().user, self.user)
+
+    def test_unknown_image_paths_are_skipped(self):
+        out = self.import_recipes(self.write_ndjson(RECORDS[:1]))
+
+        self.assertIn('Skipped 1 unknown image paths', out)
+        self.assertFalse(Recipe.objects.get().images.exists())
+
+    def test_invalid_recipes_stop_the_import(self):
+        path = self.write_ndjson([
+            RECORDS[0], '{"title": ', dict(RECORDS[1], minutes_required='x'),
+        ])
+
+        with self.assertRaisesMessage(CommandError, 'Line 2: Invalid JSON'):
+            self.import_recipes(path, batch_size=1)
+
+        self.assertEqual(self.get_titles(self.user), ['Crème brûlée'])
+
+    def test_invalid_recipes_are_skipped(self):
+        path = self.write_ndjson([
+            '[]',
+            dict(RECORDS[0], title=''),
+            dict(RECORDS[0], tags='Sweet'),
+            dict(RECORDS[0], user='nobody@email.com'),
+            dict(RECORDS[0], user=None),
+            RECORDS[1],
+        ])
+
+        out = self.import_recipes(path, skip_invalid=True)
+
+        self.assertIn('Line 1: Expected a JSON object.', out)
+        self.assertIn('Line 2: title:', out)
+        self.assertIn('Line 3: tags:', out)
+        self.assertIn('Line 4: user: Unknown user nobody@email.com.', out)
+        self.assertIn('Line 5: user: This field is required.', out)
+        self.assertIn('Skipped 5 invalid recipes', out)
+        self.assertEqual(self.get_titles(self.user), ['Pancakes'])
+
+    def test_resume_from_a_checkpoint(self):
+        path = self.write_ndjson(RECORDS)
+        checkpoint = os.path.join(self.directory.name, 'checkpoint.json')
+        with open(checkpoint, 'w') as file:
+            json.dump({'input': path, 'line': 2}, file)
+
+        out = self.import_recipes(path, checkpoint=checkpoint)
+
+        self.assertIn('Imported 1 recipes', out)
+        self.assertEqual(self.get_titles(self.user), [])
+        self.assertEqual(self.get_titles(self.other_user), ['Toast'])
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_checkpoint_is_saved_after_each_batch(self):
+        path = self.write_ndjson(RECORDS[:2] + ['{'])
+        checkpoint = os.path.join(self.directory.name, 'checkpoint.json')
+
+        with self.assertRaises(CommandError):
+            self.import_recipes(path, checkpoint=checkpoint, batch_size=1)
+
+        with open(checkpoint) as file:
+            self.assertEqual(json.load(file), {'input': path, 'line': 2})
+
+    def test_checkpoint_of_another_input_is_rejected(self):
+        path = self.write_ndjson(RECORDS)
+        checkpoint = os.path.join(self.directory.name, 'checkpoint.json')
+        with open(checkpoint, 'w') as file:
+            json.dump({'input': '/other.ndjson', 'line': 2}, file)
+
+        with self.assertRaisesMessage(CommandError, '/other.ndjson'):
+            self.import_recipes(path, checkpoint=checkpoint)
+
+    def test_workers_partition_the_users(self):
+        records = [{'user': f'user{i}@email.com'} for i in range(50)]
+        workers = {get_worker(record, 4) for record in records}
+
+        self.assertEqual(workers, {0, 1, 2, 3})
+        for record in records:
+            self.assertEqual(get_worker(record, 4), get_worker(record, 4))
+        self.assertEqual(get_worker({'user': None}, 4), 0)
+
+
+class ParallelImportTests(ImportTestMixin, TransactionTestCase):
+
+    def test_import_with_workers(self):
+        out = self.import_recipes(self.write_ndjson(RECORDS), workers=2,
+                                  verbosity=0)
+
+        self.assertIn('Imported 3 recipes', out)
+        self.assertEqual(self.get_titles(self.user),
+                         ['Crème brûlée', 'Pancakes'])
+        self.assertEqual(self.get_titles(self.other_user), ['Toast'])
+        self.assertEqual(
+            Tag.objects.get(user=self.user, name='Sweet').recipe_count, 2
+        )
+
+    def test_workers_cannot_read_the_standard_input(self):
+        with self.assertRaises(CommandError):
+            self.import_recipes('-', workers=2)
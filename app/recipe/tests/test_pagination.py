@@ -0,0 +1,57 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class PaginationTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='page@email.com',
+            password='page123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, title='abc'):
+        return Recipe.objects.create(
+            user=self.user,
+            title=title,
+            minutes_required=5,
+            price=5.00
+        )
+
+    def collect_pages(self, url, params):
+        """Follow the `next` links and return the results of every page."""
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data['results'])
+            if not response.data['next']:
+                return pages
+            response = self.client.get(response.data['next'])
+
+    def test_recipes_are_paginated_by_descending_id(self):
+        recipes = [self.create_recipe(title=str(i)) for i in range(5)]
+
+        pages = self.collect_pages(RECIPE_URL, {'page_size': 2})
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        ids = [item['id'] for page in pages for item in page]
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+
+    def test_tags_are_paginated_by_descending_name(self):
+        for name in ('a', 'b', 'c'):
+            Tag.objects.create(user=self.user, name=name)
+
+        pages = self.collect_pages(TAGS_URL, {'page_size': 2})
+
+        names = [item['name'] for page in pages for item in page]
+        self.assertEqual(names, ['c', 'b', 'a'])
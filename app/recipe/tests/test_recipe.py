@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
@@ -79,7 +81,7 @@ class AuthorizedRecipeTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(serializer.data, response.data)
+        self.assertEqual(serializer.data, response.data['results'])
 
     def test_user_can_see_only_its_recipes(self):
         other_user = self.create_user()
@@ -92,8 +94,8 @@ class AuthorizedRecipeTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['results'], serializer.data)
 
     def get_detail_url(self, id):
         return reverse('recipe:recipe-detail', args=[id])
@@ -209,10 +211,10 @@ class AuthorizedRecipeTests(TestCase):
         serializer3 = RecipeSerializer(recipe3)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-        self.assertIn(serializer1.data, response.data)
-        self.assertIn(serializer2.data, response.data)
-        self.assertNotIn(serializer3.data, response.data)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIn(serializer1.data, response.data['results'])
+        self.assertIn(serializer2.data, response.data['results'])
+        self.assertNotIn(serializer3.data, response.data['results'])
 
     def assert_filter_recipes_are_distinct(self, attr_create_func, field_name):
         attr1 = attr_create_func(name='a')
@@ -224,7 +226,7 @@ class AuthorizedRecipeTests(TestCase):
         response = self.client.get(RECIPE_URL, {field_name: f'{attr1.id},{attr2.id}'})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_filter_recipes_by_tags(self):
         self.assert_filter_recipes_by_attributes(
@@ -249,3 +251,76 @@ class AuthorizedRecipeTests(TestCase):
             self.create_ingredient,
             'ingredients'
         )
+
+    def create_recipe_with_all_attributes(self, name):
+        recipe = self.create_recipe(title=name)
+        recipe.tags.add(self.create_tag(name=name))
+        recipe.ingredients.add(self.create_ingredient(name=name))
+        recipe.images.add(self.create_image())
+        return recipe
+
+    def test_list_recipes_query_budget(self):
+        for name in ('a', 'b', 'c', 'd'):
+            self.create_recipe_with_all_attributes(name)
+
+        # One query for the ETag, one for the recipes and one per prefetched
+        # relation, regardless of how many recipes are listed.
+        with self.assertNumQueries(5):
+            response = self.client.get(RECIPE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 4)
+
+    def test_retrieve_recipe_query_budget(self):
+        recipe = self.create_recipe_with_all_attributes('a')
+        recipe.tags.add(self.create_tag(name='b'))
+
+        with self.assertNumQueries(5):
+            response = self.client.get(self.get_detail_url(recipe.id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['tags']), 2)
+
+    def test_filter_recipes_by_all_tags(self):
+        tag1 = self.create_tag(name='a')
+        tag2 = self.create_tag(name='b')
+        recipe_with_both = self.create_recipe()
+        recipe_with_both.tags.add(tag1, tag2)
+        recipe_with_one = self.create_recipe()
+        recipe_with_one.tags.add(tag1)
+
+        response = self.client.get(
+            RECIPE_URL,
+            {'tags': f'{tag1.id},{tag2.id}', 'tags_mode': 'all'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [recipe['id'] for recipe in response.data['results']]
+        self.assertEqual(ids, [recipe_with_both.id])
+
+    def test_filter_recipes_by_tags_and_ingredients(self):
+        tag = self.create_tag(name='a')
+        ingredient = self.create_ingredient(name='b')
+        matching_recipe = self.create_recipe()
+        matching_recipe.tags.add(tag)
+        matching_recipe.ingredients.add(ingredient)
+        self.create_recipe().tags.add(tag)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                RECIPE_URL,
+                {'tags': f'{tag.id}', 'ingredients': f'{ingredient.id}'}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [recipe['id'] for recipe in response.data['results']]
+        self.assertEqual(ids, [matching_recipe.id])
+        self.assertNotIn('DISTINCT', queries[0]['sql'])
+
+    def test_filter_recipes_invalid_mode(self):
+        tag = self.create_tag()
+        response = self.client.get(
+            RECIPE_URL,
+            {'tags': f'{tag.id}', 'tags_mode': 'some'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
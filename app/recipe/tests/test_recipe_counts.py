@@ -0,0 +1,212 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import AttributeModel, ChangeLog, Ingredient, Recipe, Tag
+
+TAGS_URL = reverse('recipe:tag-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class RecipeCountTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='counts@email.com',
+            password='counts123'
+        )
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Quick', 'Spicy')
+        ]
+
+    def create_recipe(self, tags=()):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Curry',
+            minutes_required=20,
+            price=8.00
+        )
+        recipe.tags.add(*tags)
+        return recipe
+
+    def get_counts(self, model=Tag):
+        return dict(
+            model.objects.filter(user=self.user)
+            .values_list('name', 'recipe_count')
+        )
+
+    def test_counts_follow_the_recipes_of_a_tag(self):
+        vegan, quick, spicy = self.tags
+        recipe = self.create_recipe([vegan, quick])
+        self.create_recipe([vegan])
+        recipe.tags.add(vegan, spicy)
+
+        self.assertEqual(self.get_counts(),
+                         {'Vegan': 2, 'Quick': 1, 'Spicy': 1})
+
+        recipe.tags.remove(quick, spicy, spicy)
+        recipe.tags.remove(quick)
+        self.assertEqual(self.get_counts(),
+                         {'Vegan': 2, 'Quick': 0, 'Spicy': 0})
+
+        recipe.tags.clear()
+        self.assertEqual(self.get_counts(),
+                         {'Vegan': 1, 'Quick': 0, 'Spicy': 0})
+
+    def test_counts_follow_the_reverse_relation(self):
+        vegan = self.tags[0]
+        recipes = [self.create_recipe() for _ in range(3)]
+
+        vegan.recipe_set.add(*recipes)
+        self.assertEqual(self.get_counts()['Vegan'], 3)
+
+        vegan.recipe_set.remove(recipes[0])
+        self.assertEqual(self.get_counts()['Vegan'], 2)
+
+        vegan.recipe_set.clear()
+        self.assertEqual(self.get_counts()['Vegan'], 0)
+
+    def test_counts_follow_deleted_recipes(self):
+        vegan, quick, _ = self.tags
+        ingredient = Ingredient.objects.create(user=self.user, name='Rice')
+        recipe = self.create_recipe([vegan, quick])
+        recipe.ingredients.add(ingredient)
+        self.create_recipe([vegan])
+
+        recipe.delete()
+
+        self.assertEqual(self.get_counts(),
+                         {'Vegan': 1, 'Quick': 0, 'Spicy': 0})
+        self.assertEqual(self.get_counts(Ingredient), {'Rice': 0})
+
+    def test_counts_follow_bulk_changes(self):
+        vegan, quick, _ = self.tags
+        response = self.client.post(BULK_URL, [
+            {'title': 'a', 'minutes_required': 5, 'price': 1,
+             'tags': [vegan.id, 'New'], 'ingredients': ['Rice']},
+            {'title': 'b', 'minutes_required': 5, 'price': 1,
+             'tags': [vegan.id, quick.id]},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.get_counts(),
+                         {'Vegan': 2, 'Quick': 1, 'Spicy': 0, 'New': 1})
+        self.assertEqual(self.get_counts(Ingredient), {'Rice': 1})
+
+        response = self.client.patch(BULK_URL, [
+            {'id': response.data[1]['id'], 'tags': [quick.id, 'New']},
+        ], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_counts(),
+                         {'Vegan': 1, 'Quick': 1, 'Spicy': 0, 'New': 2})
+
+    def get_logged_tag_ids(self):
+        return set(
+            ChangeLog.objects.filter(model='tag', action=ChangeLog.UPDATED)
+            .values_list('object_id', flat=True)
+        )
+
+    def test_only_changed_counts_are_logged(self):
+        vegan, quick, spicy = self.tags
+        recipe = self.create_recipe([vegan, quick])
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        ChangeLog.objects.all().delete()
+
+        self.client.patch(url, {'title': 'Red curry'}, format='json')
+        self.client.patch(url, {'tags': [vegan.id, quick.id]}, format='json')
+        self.client.patch(BULK_URL, [
+            {'id': recipe.id, 'tags': [quick.id, vegan.id]},
+        ], format='json')
+        self.assertEqual(self.get_logged_tag_ids(), set())
+
+        self.client.patch(url, {'tags': [vegan.id, spicy.id]}, format='json')
+        self.assertEqual(self.get_logged_tag_ids(), {quick.id, spicy.id})
+
+    def test_counts_left_at_zero_are_not_logged(self):
+        vegan = self.tags[0]
+        recipe = self.create_recipe([vegan])
+        Tag.objects.filter(pk=vegan.pk).update(recipe_count=0)
+        ChangeLog.objects.all().delete()
+
+        recipe.tags.remove(vegan)
+
+        self.assertEqual(self.get_counts()['Vegan'], 0)
+        self.assertEqual(self.get_logged_tag_ids(), set())
+
+    def test_list_includes_the_counts(self):
+        self.create_recipe(self.tags[:1])
+
+        response = self.client.get(TAGS_URL)
+
+        self.assertEqual(
+            [(tag['name'], tag['recipe_count'])
+             for tag in response.data['results']],
+            [('Vegan', 1), ('Spicy', 0), ('Quick', 0)]
+        )
+
+    def test_most_used_first(self):
+        vegan, quick, spicy = self.tags
+        self.create_recipe([quick, spicy])
+        self.create_recipe([quick])
+
+        response = self.client.get(TAGS_URL, {'ordering': '-recipe_count'})
+
+        self.assertEqual(
+            [tag['id'] for tag in response.data['results']],
+            [quick.id, spicy.id, vegan.id]
+        )
+
+    def test_pages_of_the_most_used(self):
+        for tag in self.tags:
+            self.create_recipe([tag])
+        self.create_recipe([self.tags[1]])
+        ids = []
+
+        response = self.client.get(
+            TAGS_URL, {'ordering': '-recipe_count', 'page_size': 1}
+        )
+        while True:
+            ids.extend(tag['id'] for tag in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(ids, [self.tags[1].id, self.tags[2].id,
+                               self.tags[0].id])
+
+    def test_unknown_ordering_is_rejected(self):
+        response = self.client.get(TAGS_URL, {'ordering': 'user'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', response.data)
+
+    def test_recipe_details_leave_out_the_counts(self):
+        recipe = self.create_recipe(self.tags[:1])
+
+        response = self.client.get(
+            reverse('recipe:recipe-detail', args=[recipe.id])
+        )
+
+        self.assertEqual(response.data['tags'],
+                         [{'id': self.tags[0].id, 'name': 'Vegan'}])
+
+    def test_rebuild_fixes_wrong_counts(self):
+        vegan, quick, _ = self.tags
+        self.create_recipe([vegan])
+        AttributeModel.objects.filter(pk=vegan.pk).update(recipe_count=5)
+        AttributeModel.objects.filter(pk=quick.pk).update(recipe_count=2)
+        out = StringIO()
+
+        call_command('rebuild_recipe_counts', stdout=out)
+
+        self.assertEqual(self.get_counts(),
+                         {'Vegan': 1, 'Quick': 0, 'Spicy': 0})
+        self.assertIn('Fixed the recipe counts of 2 tags.', out.getvalue())
@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class RecipeRangeAndOrderingTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='filters@email.com',
+            password='filters123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, price, minutes_required, title='abc'):
+        return Recipe.objects.create(
+            user=self.user,
+            title=title,
+            minutes_required=minutes_required,
+            price=price
+        )
+
+    def list_ids(self, params):
+        response = self.client.get(RECIPE_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def collect_ids(self, params):
+        """Follow the `next` links and return the ids of every page."""
+        ids = []
+        response = self.client.get(RECIPE_URL, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            if not response.data['next']:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_filter_by_price_and_minutes(self):
+        cheap_quick = self.create_recipe(4.50, 10)
+        self.create_recipe(4.50, 60)
+        self.create_recipe(12.00, 10)
+        self.create_recipe(2.00, 10)
+
+        ids = self.list_ids(
+            {'min_price': '3', 'max_price': '5.5', 'max_minutes': 30}
+        )
+
+        self.assertEqual(ids, [cheap_quick.id])
+
+    def test_ranges_combine_with_tags(self):
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        tagged = self.create_recipe(5, 10)
+        tagged.tags.add(tag)
+        self.create_recipe(5, 10)
+        expensive = self.create_recipe(50, 10)
+        expensive.tags.add(tag)
+
+        ids = self.list_ids({'tags': tag.id, 'max_price': 10})
+
+        self.assertEqual(ids, [tagged.id])
+
+    def test_invalid_bounds_are_rejected(self):
+        for params in ({'min_price': 'cheap'}, {'max_minutes': '1.5'}):
+            response = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), response.data)
+
+    def test_order_by_price_and_minutes(self):
+        a = self.create_recipe(8, 30)
+        b = self.create_recipe(2, 45)
+        c = self.create_recipe(5, 15)
+
+        self.assertEqual(
+            self.list_ids({'ordering': 'price'}), [b.id, c.id, a.id]
+        )
+        self.assertEqual(
+            self.list_ids({'ordering': '-price'}), [a.id, c.id, b.id]
+        )
+        self.assertEqual(
+            self.list_ids({'ordering': '-minutes_required'}),
+            [b.id, a.id, c.id]
+        )
+
+    def test_unknown_ordering_is_rejected(self):
+        response = self.client.get(RECIPE_URL, {'ordering': 'title'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', response.data)
+
+    def test_pages_of_equal_prices_follow_the_id(self):
+        recipes = [self.create_recipe(5, 10) for _ in range(5)]
+        recipes.insert(2, self.create_recipe(3, 10))
+        expected = sorted(
+            recipes, key=lambda recipe: (recipe.price, recipe.id)
+        )
+
+        ids = self.collect_ids({'ordering': 'price', 'page_size': 2})
+
+        self.assertEqual(ids, [recipe.id for recipe in expected])
+
+    def test_previous_pages_of_an_ordering(self):
+        recipes = [self.create_recipe(price, 10) for price in (1, 1, 2, 2, 3)]
+        response = self.client.get(
+            RECIPE_URL, {'ordering': '-price', 'page_size': 2}
+        )
+        response = self.client.get(response.data['next'])
+        response = self.client.get(response.data['next'])
+
+        response = self.client.get(response.data['previous'])
+
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [recipes[2].id, recipes[1].id]
+        )
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(
+            RECIPE_URL, {'ordering': 'price', 'cursor': 'cD1bIngiXQ=='}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_results_can_be_ordered(self):
+        pricey = self.create_recipe(9, 10, title='Lentil soup')
+        cheap = self.create_recipe(3, 10, title='Lentil stew')
+
+        ids = self.list_ids({'q': 'lentil', 'ordering': 'price'})
+
+        self.assertEqual(ids, [cheap.id, pricey.id])
@@ -0,0 +1,117 @@
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def get_detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = self.create_user('cache@email.com')
+        self.client.force_authenticate(self.user)
+        self.recipe = self.create_recipe()
+
+    def create_user(self, email):
+        return get_user_model().objects.create_user(
+            email=email,
+            password='cache123'
+        )
+
+    def create_recipe(self, user=None, title='abc'):
+        return Recipe.objects.create(
+            user=user or self.user,
+            title=title,
+            minutes_required=5,
+            price=5.00
+        )
+
+    def test_tests_cache_responses_in_a_temporary_directory(self):
+        location = caches['responses']._dir
+
+        self.assertTrue(location.startswith(tempfile.gettempdir()))
+        self.assertFalse(location.startswith(settings.CACHE_ROOT))
+
+    def test_repeated_read_is_a_cache_hit(self):
+        first = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPE_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_query_strings_are_cached_separately(self):
+        tag = Tag.objects.create(user=self.user, name='a')
+        self.create_recipe(title='tagged').tags.add(tag)
+        self.client.get(RECIPE_URL)
+
+        response = self.client.get(RECIPE_URL, {'tags': tag.id})
+
+        self.assertEqual(len(response.data['results']), 1)
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'other.example.com'])
+    def test_links_are_cached_per_host(self):
+        self.create_recipe(title='second')
+        self.client.get(RECIPE_URL, {'page_size': 1})
+
+        response = self.client.get(RECIPE_URL, {'page_size': 1},
+                                   HTTP_HOST='other.example.com')
+
+        self.assertTrue(
+            response.data['next'].startswith('http://other.example.com/')
+        )
+
+    def test_created_recipe_is_listed(self):
+        self.client.get(RECIPE_URL)
+
+        payload = {'title': 'new', 'minutes_required': 1, 'price': 1}
+        self.client.post(RECIPE_URL, payload)
+        response = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_detail_shows_renamed_tag(self):
+        tag = Tag.objects.create(user=self.user, name='a')
+        self.recipe.tags.add(tag)
+        url = get_detail_url(self.recipe.id)
+        self.client.get(url)
+
+        tag.name = 'b'
+        tag.save()
+        response = self.client.get(url)
+
+        self.assertEqual(response.data['tags'][0]['name'], 'b')
+
+    def test_responses_are_cached_per_user(self):
+        self.client.get(RECIPE_URL)
+        other_user = self.create_user('other@email.com')
+        self.create_recipe(user=other_user)
+        self.create_recipe(user=other_user)
+
+        self.client.force_authenticate(other_user)
+        response = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_cached_etag_is_not_modified(self):
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -0,0 +1,123 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db.models import Prefetch
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import serializers, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Image, Ingredient, Recipe, Tag
+from recipe.mixins import RowListMixin
+from recipe.serializers import RecipeSerializer, RowRepresentationMixin, \
+    TagSerializer
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class RowRepresentationTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='rows@email.com',
+            password='rows123'
+        )
+        self.client.force_authenticate(self.user)
+
+        tags = [Tag.objects.create(user=self.user, name=f'tag {i}')
+                for i in range(3)]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'ingredient {i}')
+            for i in range(3)
+        ]
+        image = Image.objects.create(user=self.user, image='upload/a.jpg')
+        self.recipes = []
+        for i, price in enumerate(('4.50', '12', '0.99', '7.10')):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe "{i}" é',
+                minutes_required=10 * i,
+                price=price,
+                link='https://example.com/' if i % 2 else ''
+            )
+            recipe.tags.add(*reversed(tags[:i]))
+            recipe.ingredients.add(*ingredients[i:])
+            if i == 2:
+                recipe.images.add(image)
+            self.recipes.append(recipe)
+
+    def serialize_instances(self):
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        recipes = recipes.prefetch_related(*(
+            Prefetch(name, queryset=model.objects.only('pk').order_by('pk'))
+            for name, model in (('tags', Tag), ('ingredients', Ingredient),
+                                ('images', Image))
+        ))
+        return RecipeSerializer(recipes, many=True).data
+
+    def test_rows_render_the_same_bytes_as_instances(self):
+        rows = list(
+            Recipe.objects.filter(user=self.user).order_by('-id')
+            .values(*RecipeSerializer.get_row_columns())
+        )
+        for name in ('tags', 'ingredients', 'images'):
+            RowListMixin().add_related_pks(Recipe, rows, name)
+
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(RecipeSerializer.to_row_representations(rows)),
+            renderer.render(self.serialize_instances())
+        )
+
+    def test_list_matches_the_serializer(self):
+        response = self.client.get(RECIPE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], self.serialize_instances())
+
+    def test_pages_of_rows_follow_the_ordering(self):
+        ids = []
+        response = self.client.get(
+            RECIPE_URL, {'ordering': 'price', 'page_size': 3}
+        )
+        while True:
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        expected = sorted(self.recipes, key=lambda recipe: float(recipe.price))
+        self.assertEqual(ids, [recipe.id for recipe in expected])
+
+    def test_fields_which_are_not_columns_are_rejected(self):
+
+        class TitleSerializer(RowRepresentationMixin,
+                              serializers.ModelSerializer):
+            username = serializers.CharField(source='user.email')
+
+            class Meta:
+                model = Recipe
+                fields = ('id', 'username')
+
+        with self.assertRaises(ImproperlyConfigured):
+            TitleSerializer.get_row_fields()
+
+    def test_attribute_serializers_take_the_instance(self):
+        tag = Tag.objects.filter(user=self.user).first()
+
+        self.assertEqual(
+            TagSerializer(tag).data,
+            {'id': tag.id, 'name': tag.name, 'recipe_count': tag.recipe_count}
+        )
+
+    def test_benchmark_serialization_rolls_back(self):
+        out = StringIO()
+        call_command('benchmark_serialization', recipes=20, repeat=2,
+                     stdout=out)
+
+        self.assertIn('identical', out.getvalue())
+        self.assertEqual(Recipe.objects.count(), len(self.recipes))
@@ -0,0 +1,181 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class RecipeSearchTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='search@email.com',
+            password='search123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, title, user=None):
+        return Recipe.objects.create(
+            user=user or self.user,
+            title=title,
+            minutes_required=5,
+            price=5.00
+        )
+
+    def search(self, text):
+        response = self.client.get(RECIPE_URL, {'q': text})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_search_matches_all_the_words_of_the_title(self):
+        pancakes = self.create_recipe('Banana pancakes')
+        self.create_recipe('Banana bread')
+
+        self.assertEqual(self.search('pancakes BANANA'), [pancakes.id])
+
+    def test_search_matches_tag_and_ingredient_names(self):
+        recipe = self.create_recipe('Soup')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Pumpkin')
+        )
+
+        self.assertEqual(self.search('vegan'), [recipe.id])
+        self.assertEqual(self.search('pumpkin soup'), [recipe.id])
+
+    def test_last_word_is_a_prefix(self):
+        recipe = self.create_recipe('Chocolate cake')
+
+        self.assertEqual(self.search('choc'), [recipe.id])
+        self.assertEqual(self.search('cake choc'), [recipe.id])
+        self.assertEqual(self.search('choc cake'), [])
+
+    def test_title_matches_rank_first(self):
+        by_ingredient = self.create_recipe('Cookies')
+        by_ingredient.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Butter')
+        )
+        by_title = self.create_recipe('Butter chicken')
+
+        self.assertEqual(
+            self.search('butter'), [by_title.id, by_ingredient.id]
+        )
+
+    def test_search_is_limited_to_the_user(self):
+        other_user = get_user_model().objects.create_user(
+            email='other@email.com',
+            password='search123'
+        )
+        self.create_recipe('Lasagna', user=other_user)
+
+        self.assertEqual(self.search('lasagna'), [])
+
+    def test_search_vectors_are_of_the_user(self):
+        recipe = self.create_recipe('Lasagna')
+        recipe.refresh_from_db()
+
+        self.assertEqual(
+            recipe.search_vector, f"'u{self.user.pk}xlasagna':1A"
+        )
+
+    def test_search_matches_accented_and_joined_words(self):
+        recipe = self.create_recipe('Crème brûlée')
+        other = self.create_recipe('Peanut_butter cookies')
+
+        self.assertEqual(self.search('CRÈME brû'), [recipe.id])
+        self.assertEqual(self.search('peanut_butter'), [other.id])
+
+    def test_search_splits_words_like_the_vectors(self):
+        stir_fry = self.create_recipe('Stir-fry for 2.5 people')
+        blog = self.create_recipe("Chef's soup from cook@example.com")
+        site = self.create_recipe('Pie of http://example.com/pie')
+
+        self.assertEqual(self.search('stir-fry 2.5'), [stir_fry.id])
+        self.assertEqual(self.search('fry 2.'), [])
+        self.assertEqual(self.search('fry sti'), [stir_fry.id])
+        self.assertEqual(self.search("chef's cook@example.com"), [blog.id])
+        self.assertEqual(self.search('example.com/pie'), [site.id])
+        self.assertEqual(self.search("o'\\"), [])
+
+    def test_search_follows_renamed_and_deleted_tags(self):
+        recipe = self.create_recipe('Salad')
+        tag = Tag.objects.create(user=self.user, name='Summer')
+        recipe.tags.add(tag)
+
+        tag.name = 'Winter'
+        tag.save()
+        self.assertEqual(self.search('summer'), [])
+        self.assertEqual(self.search('winter'), [recipe.id])
+
+        tag.delete()
+        self.assertEqual(self.search('winter'), [])
+
+    def test_search_follows_title_changes(self):
+        recipe = self.create_recipe('Pie')
+
+        response = self.client.patch(
+            reverse('recipe:recipe-detail', args=[recipe.id]),
+            {'title': 'Tart'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.search('pie'), [])
+        self.assertEqual(self.search('tart'), [recipe.id])
+
+    def test_short_last_word_is_not_a_prefix(self):
+        recipe = self.create_recipe('Ox tail')
+        self.create_recipe('Oxtail soup')
+
+        self.assertEqual(self.search('ox'), [recipe.id])
+
+    def test_search_results_are_paginated_by_offset(self):
+        recipes = [self.create_recipe(f'Stew {i}') for i in range(3)]
+
+        response = self.client.get(RECIPE_URL, {'q': 'stew', 'limit': 2})
+
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [recipe.id for recipe in reversed(recipes[1:])]
+        )
+        self.assertIn('offset=2', response.data['next'])
+        self.assertNotIn('count', response.data)
+
+        response = self.client.get(response.data['next'])
+
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [recipes[0].id]
+        )
+        self.assertIsNone(response.data['next'])
+
+    def test_search_without_words_lists_every_recipe(self):
+        recipe = self.create_recipe('Curry')
+
+        response = self.client.get(RECIPE_URL, {'q': ' - '})
+
+        self.assertEqual(
+            [item['id'] for item in response.data['results']], [recipe.id]
+        )
+
+    def test_benchmark_search_rolls_back(self):
+        out = StringIO()
+        call_command(
+            'benchmark_search',
+            users=2,
+            recipes_per_user=20,
+            attributes_per_user=5,
+            vocabulary=200,
+            repeat=3,
+            stdout=out
+        )
+
+        self.assertIn('p95', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
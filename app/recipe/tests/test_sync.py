@@ -0,0 +1,184 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ChangeLog, Recipe, Tag
+from recipe.views import SyncAPIView
+
+SYNC_URL = reverse('recipe:sync')
+
+
+class UnauthorizedSyncTests(TestCase):
+
+    def test_authentication_is_required(self):
+        response = APIClient().get(SYNC_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SyncTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = self.create_user('sync@email.com')
+        self.client.force_authenticate(self.user)
+
+    def create_user(self, email):
+        return get_user_model().objects.create_user(
+            email=email,
+            password='sync123'
+        )
+
+    def create_recipe(self, user=None, title='abc'):
+        return Recipe.objects.create(
+            user=user or self.user,
+            title=title,
+            minutes_required=5,
+            price=5.00
+        )
+
+    def sync(self, since=None):
+        params = {} if since is None else {'since': since}
+        response = self.client.get(SYNC_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_first_sync_returns_everything(self):
+        recipe = self.create_recipe()
+        tag = Tag.objects.create(user=self.user, name='a')
+        recipe.tags.add(tag)
+
+        data = self.sync()
+
+        self.assertEqual(
+            [item['id'] for item in data['recipes']['created']], [recipe.id]
+        )
+        self.assertEqual(data['recipes']['created'][0]['tags'], [tag.id])
+        self.assertEqual(
+            data['tags']['created'],
+            [{'id': tag.id, 'name': 'a', 'recipe_count': 1}]
+        )
+        self.assertFalse(data['has_more'])
+
+    def test_sync_returns_only_changes_since_the_token(self):
+        recipe_id = self.create_recipe().id
+        tag = Tag.objects.create(user=self.user, name='a')
+        self.create_recipe(title='unchanged')
+        token = self.sync()['token']
+
+        self.assertEqual(self.sync(token)['recipes']['updated'], [])
+
+        tag.name = 'b'
+        tag.save()
+        Recipe.objects.get(id=recipe_id).delete()
+        data = self.sync(token)
+
+        self.assertEqual(
+            data['tags']['updated'],
+            [{'id': tag.id, 'name': 'b', 'recipe_count': 0}]
+        )
+        self.assertEqual(data['recipes']['deleted'], [recipe_id])
+        self.assertEqual(data['recipes']['created'], [])
+        self.assertEqual(data['recipes']['updated'], [])
+        self.assertGreater(data['token'], token)
+
+    def test_relation_changes_update_the_recipe(self):
+        recipe = self.create_recipe()
+        token = self.sync()['token']
+
+        recipe.tags.add(Tag.objects.create(user=self.user, name='a'))
+        data = self.sync(token)
+
+        self.assertEqual(
+            [item['id'] for item in data['recipes']['updated']], [recipe.id]
+        )
+
+    def test_changes_are_paged(self):
+        for title in ('a', 'b', 'c'):
+            self.create_recipe(title=title)
+
+        with patch.object(SyncAPIView, 'page_size', 2):
+            first = self.sync()
+            second = self.sync(first['token'])
+
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        titles = [
+            item['title'] for data in (first, second)
+            for item in data['recipes']['created']
+        ]
+        self.assertEqual(titles, ['a', 'b', 'c'])
+
+    def test_sync_is_limited_to_the_user(self):
+        self.create_recipe(user=self.create_user('other@email.com'))
+
+        self.assertEqual(self.sync()['recipes']['created'], [])
+
+    def test_invalid_token(self):
+        response = self.client.get(SYNC_URL, {'since': 'abc'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_change_log_is_deleted_with_its_user(self):
+        other_user = self.create_user('other@email.com')
+        self.create_recipe(user=other_user)
+
+        other_user.delete()
+
+        self.assertFalse(
+            ChangeLog.objects.filter(user_id=other_user.pk).exists()
+        )
+
+    def prune_change_log(self):
+        # Everything logged so far is older than the retention.
+        ChangeLog.objects.update(
+            created_at=timezone.now() - timedelta(days=365)
+        )
+        call_command('prune_change_log', stdout=StringIO())
+
+    def test_pruning_keeps_the_last_change_of_existing_objects(self):
+        recipe = self.create_recipe()
+        recipe.title = 'changed'
+        recipe.save()
+        self.create_recipe(title='deleted').delete()
+
+        self.prune_change_log()
+
+        self.assertEqual(
+            list(ChangeLog.objects.values_list('object_id', 'action')),
+            [(recipe.id, ChangeLog.UPDATED)]
+        )
+        data = self.sync()
+        self.assertEqual(
+            [item['title'] for item in data['recipes']['created']],
+            ['changed']
+        )
+        self.assertEqual(data['recipes']['deleted'], [])
+
+    def test_expired_token_is_gone(self):
+        self.create_recipe()
+        token = self.sync()['token']
+        self.create_recipe(title='other')
+
+        self.prune_change_log()
+
+        response = self.client.get(SYNC_URL, {'since': token})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        min_token = ChangeLog.objects.get_min_token()
+        self.assertEqual(self.sync(min_token)['token'], min_token)
+
+    def test_recent_changes_are_not_pruned(self):
+        self.create_recipe()
+        token = self.sync()['token']
+
+        call_command('prune_change_log', stdout=StringIO())
+
+        self.assertEqual(ChangeLog.objects.count(), 1)
+        self.assertEqual(self.sync(token)['token'], token)
@@ -1,7 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import TagViewSet, IngredientViewSet, RecipeViewSet, ImageViewSet
+from .views import TagViewSet, IngredientViewSet, RecipeViewSet, \
+    ImageViewSet, SyncAPIView, RecipeExportView
 
 app_name = 'recipe'
 
@@ -12,5 +13,7 @@ router.register('images', ImageViewSet)
 router.register('recipe', RecipeViewSet)
 
 urlpatterns = [
+    path('sync/', SyncAPIView.as_view(), name='sync'),
+    path('export/', RecipeExportView.as_view(), name='export'),
     path('', include(router.urls))
 ]
@@ -1,26 +1,192 @@
-from core.models import Tag, Ingredient, Recipe, Image
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.contrib.postgres.search import SearchRank
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Value
+from django.http import StreamingHttpResponse
+from core.models import Tag, Ingredient, Recipe, Image, ChangeLog, NameKey
+from core.search import PrefixSearchQuery
+from core.signals import COUNTED_RELATIONS, RECIPE_RELATIONS, \
+    add_recipe_counts, touch_recipes
+from core.tasks import generate_image_derivatives, clear_image_derivatives
+from core.uploads import ImageUploadHandler
+from rest_framework import serializers, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.mixins import ListModelMixin, CreateModelMixin
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
-from .serializers import TagSerializer, \
-    IngredientSerializer, RecipeSerializer, RecipeDetailSerializer, ImageSerializer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .bulk import BulkModelMixin, bulk_update_fields
+from .export import EXPORT_OUTPUTS, export_recipes
+from .mixins import CachedResponseMixin, ConditionalGetMixin, \
+    OrderingMixin, RowListMixin
+from .pagination import AttributeModelPagination, SearchPagination
+from .serializers import TagSerializer, IngredientSerializer, \
+    RecipeSerializer, RecipeDetailSerializer, ImageSerializer, \
+    BulkRecipeSerializer, resolve_attribute_names
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 
+# The relations of recipes, as (field name, related model) pairs.
+RELATED_MODELS = tuple(
+    (field_name, model) for model, field_name in RECIPE_RELATIONS.items()
+)
+
+# The values of the `ordering` parameter of tags and ingredients and their
+# orderings, the most used ones coming first with `-recipe_count`.
+ATTRIBUTE_ORDERINGS = {
+    'name': ('name', 'id'),
+    '-name': ('-name', 'id'),
+    'recipe_count': ('recipe_count', 'id'),
+    '-recipe_count': ('-recipe_count', '-id'),
+}
+
+# The values of the `ordering` parameter of recipes and their orderings,
+# which end with the id for the keyset pagination to have a unique position.
+RECIPE_ORDERINGS = {
+    'id': ('id',),
+    '-id': ('-id',),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    'minutes_required': ('minutes_required', 'id'),
+    '-minutes_required': ('-minutes_required', '-id'),
+}
+
+# The bounds recipes can be filtered by, as (parameter name, lookup, field
+# parsing the value) triples.
+RECIPE_RANGE_FILTERS = (
+    ('min_price', 'price__gte',
+     serializers.DecimalField(max_digits=None, decimal_places=None)),
+    ('max_price', 'price__lte',
+     serializers.DecimalField(max_digits=None, decimal_places=None)),
+    ('max_minutes', 'minutes_required__lte', serializers.IntegerField()),
+)
 
-class AttributeModelViewSet(GenericViewSet, ListModelMixin, CreateModelMixin):
-    authentication_classes = (TokenAuthentication,)
+
+class AttributeModelViewSet(BulkModelMixin, ConditionalGetMixin, OrderingMixin,
+                            GenericViewSet, ListModelMixin, CreateModelMixin):
     permission_classes = (IsAuthenticated,)
+    pagination_class = AttributeModelPagination
+    orderings = ATTRIBUTE_ORDERINGS
+    # Number of objects listed for a name prefix, by default and at most.
+    completion_limit = 10
+    max_completion_limit = 50
+
+    def get_name_prefix(self):
+        if self.action != 'list':
+            return ''
+        return self.request.query_params.get('prefix', '')
+
+    @property
+    def paginator(self):
+        # Completions are a short list rather than pages.
+        if self.get_name_prefix():
+            return None
+        return super().paginator
+
+    def get_completion_limit(self):
+        try:
+            limit = int(self.request.query_params['limit'])
+        except (KeyError, ValueError):
+            return self.completion_limit
+        return max(1, min(limit, self.max_completion_limit))
+
+    def complete_name(self, queryset, prefix):
+        """Return the first objects, in name order, whose name starts with
+        the prefix, ignoring case.
+
+        This is a range of core_attr_name_key_idx, read up to the limit, so
+        it costs the same however many objects the user has.
+        """
+        return queryset.annotate(name_key=NameKey('name')).filter(
+            name_key__gte=NameKey(Value(prefix)),
+            # No character sorts after this one.
+            name_key__lte=NameKey(Value(prefix + '\U0010ffff'))
+        ).order_by('name_key', 'id')[:self.get_completion_limit()]
 
     def get_queryset(self):
-        queryset = self.queryset
+        queryset = self.queryset.filter(
+            user=self.request.user, kind=self.queryset.model._meta.model_name
+        )
         assigned_only = bool(self.request.query_params.get('assigned_only'))
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            # The maintained count saves joining the recipes.
+            queryset = queryset.filter(recipe_count__gt=0)
 
-        return queryset.filter(user=self.request.user).distinct().order_by('-name')
+        prefix = self.get_name_prefix()
+        if prefix:
+            return self.complete_name(queryset, prefix)
+        ordering = self.get_ordering() or self.pagination_class.ordering
+        return queryset.order_by(*ordering)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        name = serializer.validated_data['name']
+        if self.queryset.filter(user=self.request.user, name=name).exists():
+            raise ValidationError({'name': [self.get_name_taken_message()]})
+        try:
+            # Concurrent creations of a name all pass the check above, and
+            # all but one then break the unique constraint of the names.
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            raise ValidationError({'name': [self.get_name_taken_message()]})
+
+    def get_name_taken_message(self):
+        model_name = self.queryset.model._meta.verbose_name
+        return f'A {model_name} with this name already exists.'
+
+    def get_names_taken_error(self):
+        model_name = self.queryset.model._meta.verbose_name
+        return ValidationError({'non_field_errors': [
+            f'A {model_name} with one of these names already exists.'
+        ]})
+
+    def validate_bulk_items(self, validated_data, pks=None):
+        """Check that the names are not taken, by other objects than the
+        updated ones, or given twice."""
+        errors = super().validate_bulk_items(validated_data, pks)
+        names = [item.get('name') for item in validated_data]
+        taken = set(self.get_bulk_queryset().filter(
+            name__in=[name for name in names if name is not None]
+        ).exclude(pk__in=pks or ()).values_list('name', flat=True))
+
+        seen = set()
+        for name, item_errors in zip(names, errors):
+            if name in taken:
+                item_errors['name'] = [self.get_name_taken_message()]
+            elif name in seen:
+                item_errors['name'] = [
+                    'The same name is given more than once.'
+                ]
+            if name is not None:
+                seen.add(name)
+        return errors
+
+    def perform_bulk_create(self, validated_data):
+        model = self.queryset.model
+        try:
+            # The names may have been taken since they were validated.
+            with transaction.atomic():
+                objects = model.objects.bulk_create(
+                    model(user=self.request.user, **item)
+                    for item in validated_data
+                )
+        except IntegrityError:
+            raise self.get_names_taken_error()
+        self.record_bulk_changes([obj.pk for obj in objects],
+                                 ChangeLog.CREATED)
+        return objects
+
+    def perform_bulk_update(self, pks, validated_data):
+        model = self.queryset.model
+        try:
+            # The names may have been taken since they were validated.
+            with transaction.atomic():
+                bulk_update_fields(model, list(zip(pks, validated_data)))
+        except IntegrityError:
+            raise self.get_names_taken_error()
+        # The names show in the details of the recipes.
+        touch_recipes(**{f'{RECIPE_RELATIONS[model]}__in': pks})
+        self.record_bulk_changes(pks, ChangeLog.UPDATED)
 
 
 class TagViewSet(AttributeModelViewSet):
@@ -33,27 +199,118 @@ class IngredientViewSet(AttributeModelViewSet):
     serializer_class = IngredientSerializer
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(BulkModelMixin, CachedResponseMixin, ConditionalGetMixin,
+                    OrderingMixin, RowListMixin, ModelViewSet):
     serializer_class = RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    orderings = RECIPE_ORDERINGS
 
     def _get_ints_list_from_str(self, str_list, split_str=','):
         return [int(id_str) for id_str in str_list.split(split_str)]
 
     def filter_queryset_from_GET_parameter(self, queryset, param_name):
+        """Filter recipes by a comma separated list of related ids.
+
+        By default a recipe matches when it has any of the ids, which is
+        tested with a correlated EXISTS on the through table so the recipes
+        are neither multiplied by the join nor deduplicated afterwards. With
+        `<param_name>_mode=all` a recipe must have every id, which is found
+        by counting the matching through rows per recipe.
+        """
         filter_str = self.request.query_params.get(param_name)
-        if filter_str:
-            filter_list = self._get_ints_list_from_str(filter_str)
-            queryset = queryset.filter(**{f'{param_name}__id__in': filter_list})
-        return queryset
+        if not filter_str:
+            return queryset
+
+        filter_list = self._get_ints_list_from_str(filter_str)
+        field = Recipe._meta.get_field(param_name)
+        recipe_column = field.m2m_field_name()
+        through_rows = field.remote_field.through.objects.filter(
+            **{f'{field.m2m_reverse_field_name()}__in': filter_list}
+        )
+
+        mode = self.request.query_params.get(f'{param_name}_mode', 'any')
+        if mode == 'all':
+            matching_recipes = through_rows.values(recipe_column).annotate(
+                matches=Count('pk')
+            ).filter(matches=len(set(filter_list))).values(recipe_column)
+            return queryset.filter(pk__in=matching_recipes)
+        if mode != 'any':
+            msg = f'{param_name}_mode must be either "any" or "all".'
+            raise ValidationError({f'{param_name}_mode': [msg]})
+
+        annotation = f'has_{param_name}'
+        matching_rows = through_rows.filter(**{recipe_column: OuterRef('pk')})
+        return queryset.annotate(
+            **{annotation: Exists(matching_rows)}
+        ).filter(**{annotation: True})
+
+    def get_related_prefetches(self):
+        """Return the prefetches the serializer of the current action needs.
+
+        The detail serializer nests whole objects, while the list serializer
+        only renders primary keys, so there the related rows are loaded
+        without their other columns. Write actions re-read the relations
+        after saving anyway, so nothing is prefetched for them.
+        """
+        if self.action not in ('list', 'retrieve', 'bulk'):
+            return ()
+
+        if issubclass(self.get_serializer_class(), RecipeDetailSerializer):
+            return tuple(field_name for field_name, _ in RELATED_MODELS)
+        return tuple(
+            Prefetch(field_name,
+                     queryset=model.objects.only('pk').order_by('pk'))
+            for field_name, model in RELATED_MODELS
+        )
+
+    def get_search_query(self):
+        """Return the full text search of the `q` parameter, if any."""
+        # Its words are read by the database, once per request.
+        if not hasattr(self, '_search_query'):
+            text = self.request.query_params.get('q', '')
+            self._search_query = PrefixSearchQuery.from_text(
+                text, self.request.user.pk
+            )
+        return self._search_query
+
+    @property
+    def paginator(self):
+        # Search results are ordered by rank, which is no key to paginate on,
+        # and there are few enough of them for offsets to be cheap.
+        if not hasattr(self, '_paginator') and self.get_search_query():
+            self._paginator = SearchPagination()
+        return super().paginator
+
+    def filter_queryset_by_ranges(self, queryset):
+        """Filter recipes by the bounds given in RECIPE_RANGE_FILTERS."""
+        lookups = {}
+        for param_name, lookup, field in RECIPE_RANGE_FILTERS:
+            value = self.request.query_params.get(param_name)
+            if not value:
+                continue
+            try:
+                lookups[lookup] = field.run_validation(value)
+            except ValidationError as error:
+                raise ValidationError({param_name: error.detail})
+        return queryset.filter(**lookups)
 
     def get_queryset(self):
         queryset = self.queryset
         queryset = self.filter_queryset_from_GET_parameter(queryset, 'tags')
         queryset = self.filter_queryset_from_GET_parameter(queryset, 'ingredients')
-        return queryset.filter(user=self.request.user).distinct('id').order_by('-id')
+        queryset = self.filter_queryset_by_ranges(queryset)
+        queryset = queryset.prefetch_related(*self.get_related_prefetches())
+        queryset = queryset.filter(user=self.request.user)
+        ordering = self.get_ordering()
+
+        query = self.get_search_query()
+        if query is not None:
+            queryset = queryset.filter(search_vector=query).annotate(
+                rank=SearchRank(F('search_vector'), query)
+            )
+            ordering = ordering or ('-rank', '-id')
+        return queryset.order_by(*(ordering or ('-id',)))
 
     def perform_create(self, serializer):
         return serializer.save(user=self.request.user)
@@ -63,15 +320,286 @@ class RecipeViewSet(ModelViewSet):
             return RecipeDetailSerializer
         return self.serializer_class
 
+    def get_bulk_serializer_class(self):
+        return BulkRecipeSerializer
+
+    def validate_bulk_items(self, validated_data, pks=None):
+        """Check the related ids of all the recipes with one query per
+        relation. Tags and ingredients given by name are always valid."""
+        errors = super().validate_bulk_items(validated_data, pks)
+        for field_name, model in RELATED_MODELS:
+            related_pks = {
+                pk for item in validated_data
+                for pk in item.get(field_name, ()) if isinstance(pk, int)
+            }
+            if not related_pks:
+                continue
+
+            existing = set(model.objects.filter(
+                user=self.request.user, pk__in=related_pks
+            ).values_list('pk', flat=True))
+            for item, item_errors in zip(validated_data, errors):
+                missing = [
+                    pk for pk in item.get(field_name, ())
+                    if isinstance(pk, int) and pk not in existing
+                ]
+                if missing:
+                    item_errors[field_name] = [
+                        f'Invalid pk "{pk}" - object does not exist.'
+                        for pk in missing
+                    ]
+        return errors
+
+    def split_relations(self, validated_data):
+        """Split validated recipes into their fields and their relations."""
+        relation_names = {field_name for field_name, _ in RELATED_MODELS}
+        fields, relations = [], []
+        for item in validated_data:
+            fields.append({
+                name: value for name, value in item.items()
+                if name not in relation_names
+            })
+            relations.append({
+                name: value for name, value in item.items()
+                if name in relation_names
+            })
+        return fields, relations
+
+    def set_bulk_relations(self, pks, relations, replace=False):
+        """Set the related ids of recipes with one insert per relation, after
+        removing their current ones when replacing them.
 
-class ImageViewSet(ModelViewSet):
+        The m2m signals are not sent, so the recipe counts of the tags and
+        ingredients are changed here, by the rows removed and inserted.
+        """
+        for field_name, model in RELATED_MODELS:
+            field = Recipe._meta.get_field(field_name)
+            through = field.remote_field.through
+            recipe_field = field.m2m_field_name()
+            related_field = field.m2m_reverse_field_name()
+            changed = [
+                (pk, related[field_name])
+                for pk, related in zip(pks, relations) if field_name in related
+            ]
+            if not changed:
+                continue
+
+            counts = Counter()
+            if replace:
+                removed = through.objects.filter(**{
+                    f'{recipe_field}__in': [pk for pk, _ in changed]
+                })
+                if model in COUNTED_RELATIONS:
+                    counts.subtract(
+                        removed.values_list(f'{related_field}_id', flat=True)
+                    )
+                removed.delete()
+            rows = through.objects.bulk_create(
+                through(**{
+                    f'{recipe_field}_id': pk,
+                    f'{related_field}_id': related_pk
+                })
+                for pk, related_pks in changed
+                for related_pk in dict.fromkeys(related_pks)
+            )
+            if model in COUNTED_RELATIONS:
+                counts.update(
+                    getattr(row, f'{related_field}_id') for row in rows
+                )
+                add_recipe_counts(self.request.user.pk, model, counts)
+
+    def perform_bulk_create(self, validated_data):
+        resolve_attribute_names(self.request.user, validated_data)
+        fields, relations = self.split_relations(validated_data)
+        recipes = Recipe.objects.bulk_create(
+            Recipe(user=self.request.user, **item_fields)
+            for item_fields in fields
+        )
+        pks = [recipe.pk for recipe in recipes]
+        self.set_bulk_relations(pks, relations)
+        self.record_bulk_changes(pks, ChangeLog.CREATED)
+        return recipes
+
+    def perform_bulk_update(self, pks, validated_data):
+        resolve_attribute_names(self.request.user, validated_data)
+        fields, relations = self.split_relations(validated_data)
+        bulk_update_fields(Recipe, list(zip(pks, fields)))
+        self.set_bulk_relations(pks, relations, replace=True)
+        self.record_bulk_changes(pks, ChangeLog.UPDATED)
+
+
+class ImageViewSet(ConditionalGetMixin, ModelViewSet):
     serializer_class = ImageSerializer
     queryset = Image.objects.all()
-    authentication_classes = (TokenAuthentication, )
     permission_classes = (IsAuthenticated, )
 
+    def initialize_request(self, request, *args, **kwargs):
+        self.upload_handler = ImageUploadHandler(request)
+        request.upload_handlers = [self.upload_handler]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def check_upload_errors(self):
+        # Parses the upload, rejected images are left out of request.data.
+        self.request.data
+        if self.upload_handler.errors:
+            raise ValidationError({'image': self.upload_handler.errors})
+
+    def create(self, request, *args, **kwargs):
+        self.check_upload_errors()
+        return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        self.check_upload_errors()
+        return super().update(request, *args, **kwargs)
+
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+        return self.queryset.filter(user=self.request.user).order_by('-id')
+
+    def schedule_derivatives(self, image):
+        # The workers read the image row, so it has to be committed first.
+        transaction.on_commit(lambda: generate_image_derivatives(image))
 
     def perform_create(self, serializer):
-        return serializer.save(user=self.request.user)
+        image = serializer.save(user=self.request.user)
+        self.schedule_derivatives(image)
+        return image
+
+    def perform_update(self, serializer):
+        if 'image' not in serializer.validated_data:
+            return serializer.save()
+
+        clear_image_derivatives(serializer.instance)
+        image = serializer.save()
+        self.schedule_derivatives(image)
+        return image
+
+
+class RecipeExportView(APIView):
+    """Stream every recipe of the user, with the names of their tags and
+    ingredients and the paths of their images, as NDJSON or, with
+    `output=csv`, as CSV.
+
+    The recipes are read through a server side cursor and sent in chunks,
+    so the memory used does not grow with the number of recipes.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_OUTPUTS:
+            choices = ', '.join(f'"{choice}"' for choice in EXPORT_OUTPUTS)
+            msg = f'output must be one of {choices}.'
+            raise ValidationError({'output': [msg]})
+
+        content_type, _ = EXPORT_OUTPUTS[output]
+        response = StreamingHttpResponse(
+            export_recipes(output, users=[request.user]),
+            content_type=f'{content_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{output}"'
+        return response
+
+
+class SyncAPIView(APIView):
+    """Return the recipes, tags, ingredients and images of the user created,
+    updated or deleted since the change token given as `since`, and the
+    token to send next time. Without a token every object is returned.
+
+    At most `page_size` changes are read per request, `has_more` telling
+    whether the next token has more of them.
+
+    Tokens older than the pruned part of the change log, see
+    `prune_change_log`, are answered 410 Gone, the client having to sync
+    again without one.
+    """
+    permission_classes = (IsAuthenticated,)
+    page_size = 1000
+    synced_models = (
+        ('recipes', Recipe, RecipeSerializer),
+        ('tags', Tag, TagSerializer),
+        ('ingredients', Ingredient, IngredientSerializer),
+        ('images', Image, ImageSerializer),
+    )
+
+    def get_since(self):
+        since = self.request.query_params.get('since', '0')
+        if not since.isdigit():
+            msg = 'since must be a change token returned by this endpoint.'
+            raise ValidationError({'since': [msg]})
+        return int(since)
+
+    def get_queryset(self, model):
+        queryset = model.objects.filter(user=self.request.user)
+        if model is Recipe:
+            queryset = queryset.prefetch_related(*(
+                Prefetch(field_name,
+                         queryset=related.objects.only('pk').order_by('pk'))
+                for field_name, related in RELATED_MODELS
+            ))
+        return queryset.order_by('pk')
+
+    def get(self, request):
+        since = self.get_since()
+        changes = list(ChangeLog.objects.filter(
+            user=request.user, id__gt=since
+        ).order_by('id').values_list(
+            'id', 'model', 'object_id', 'action'
+        )[:self.page_size + 1])
+        # Checked after reading the changes, since the log is only pruned
+        # once the tokens it invalidates are recorded.
+        if since and since < ChangeLog.objects.get_min_token():
+            return Response(
+                {'detail': 'The change token has expired, sync without one.'},
+                status=status.HTTP_410_GONE
+            )
+        has_more = len(changes) > self.page_size
+        changes = changes[:self.page_size]
+
+        # The last change of an object tells whether it still exists, and
+        # one created since the token is new to the client whatever followed.
+        last_actions = {}
+        created = set()
+        for _, model_name, object_id, action in changes:
+            last_actions[model_name, object_id] = action
+            # Without a token, objects are new to the client even when their
+            # creation has been pruned from the log.
+            if action == ChangeLog.CREATED or not since:
+                created.add((model_name, object_id))
+
+        data = {
+            'token': changes[-1][0] if changes else since,
+            'has_more': has_more,
+        }
+        for name, model, serializer_class in self.synced_models:
+            model_name = model._meta.model_name
+            deleted, changed = [], []
+            for (change_model, object_id), action in last_actions.items():
+                if change_model == model_name:
+                    if action == ChangeLog.DELETED:
+                        deleted.append(object_id)
+                    else:
+                        changed.append(object_id)
+
+            objects = []
+            if changed:
+                objects = self.get_queryset(model).filter(pk__in=changed)
+            serialized = serializer_class(
+                objects, many=True, context=self.get_serializer_context()
+            ).data
+            data[name] = {
+                'created': [
+                    item for item in serialized
+                    if (model_name, item['id']) in created
+                ],
+                'updated': [
+                    item for item in serialized
+                    if (model_name, item['id']) not in created
+                ],
+                'deleted': sorted(deleted),
+            }
+
+        return Response(data)
+
+    def get_serializer_context(self):
+        return {'request': self.request, 'view': self}
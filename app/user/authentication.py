@@ -0,0 +1,141 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from rest_framework.authentication import TokenAuthentication
+
+
+class LRUTokenCache:
+    """A thread safe in-process cache keeping at most `max_entries` entries
+    for `timeout` seconds each, evicting the least recently used first.
+    """
+
+    def __init__(self, timeout, max_entries):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # Every request gets its own copy, so a view changing request.user
+        # never leaks into the requests of other threads.
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoTokenCache:
+    """Token cache stored in one of the caches of the Django cache framework,
+    which is shared between processes when the cache backend is.
+    """
+
+    def __init__(self, timeout, cache_alias):
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def clear(self):
+        self.cache.clear()
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """Return the token cache configured by the TOKEN_AUTH_CACHE setting."""
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                config = settings.TOKEN_AUTH_CACHE
+                if config['BACKEND'] == 'django':
+                    _token_cache = DjangoTokenCache(
+                        config['TIMEOUT'],
+                        config['CACHE_ALIAS']
+                    )
+                else:
+                    _token_cache = LRUTokenCache(
+                        config['TIMEOUT'],
+                        config['MAX_ENTRIES']
+                    )
+    return _token_cache
+
+
+def get_token_cache_key(key):
+    # Tokens are credentials, so only their digest is used as a cache key.
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_tokens(*keys):
+    """Drop the cached credentials of the tokens, now and once the current
+    transaction is committed, since credentials cached in between may have
+    been read before the changes were visible.
+    """
+    def delete_entries():
+        token_cache = get_token_cache()
+        for key in keys:
+            token_cache.delete(get_token_cache_key(key))
+
+    delete_entries()
+    if connection.in_atomic_block:
+        transaction.on_commit(delete_entries)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication remembering the `(user, token)` pair of a key, so
+    only the first request made with a token queries the database.
+
+    Cached entries are invalidated when the token is deleted or its user is
+    saved, see `user.signals`.
+    """
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        cache_key = get_token_cache_key(key)
+
+        credentials = token_cache.get(cache_key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(cache_key, credentials)
+
+        return credentials
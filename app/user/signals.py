@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_tokens
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_tokens(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    # A saved user may have been deactivated or got a new password, in which
+    # case its tokens must be checked against the database again.
+    if not created:
+        keys = Token.objects.filter(user=instance).values_list(
+            'key', flat=True
+        )
+        invalidate_tokens(*keys)
@@ -0,0 +1,105 @@
+from django.urls import reverse
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.contrib.auth import get_user_model
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import DjangoTokenCache, get_token_cache, \
+    get_token_cache_key
+
+USER_PROFILE_UPDATE_URL = reverse('user:update')
+
+
+class CachedTokenAuthenticationMixin:
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='cached@email.com',
+            password='cached123',
+            name='cached'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_profile(self):
+        return self.client.get(USER_PROFILE_UPDATE_URL)
+
+    def is_cached(self):
+        cache_key = get_token_cache_key(self.token.key)
+        return get_token_cache().get(cache_key) is not None
+
+
+class CachedTokenAuthenticationTests(CachedTokenAuthenticationMixin,
+                                     TestCase):
+
+    def test_token_lookup_is_cached(self):
+        self.assertEqual(self.get_profile().status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            response = self.get_profile()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['email'], self.user.email)
+
+    def test_deleted_token_is_rejected(self):
+        self.get_profile()
+        self.token.delete()
+
+        response = self.get_profile()
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.get_profile()
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.get_profile()
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates_cache(self):
+        self.get_profile()
+        self.assertTrue(self.is_cached())
+
+        response = self.client.patch(
+            USER_PROFILE_UPDATE_URL,
+            {'password': 'changed123'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(self.is_cached())
+
+    def test_deleted_token_is_invalidated_for_other_processes(self):
+        self.get_profile()
+        # A cache of another process, reading the same files.
+        other_cache = DjangoTokenCache(300, 'tokens')
+        cache_key = get_token_cache_key(self.token.key)
+        self.assertIsNotNone(other_cache.get(cache_key))
+
+        self.token.delete()
+
+        self.assertIsNone(other_cache.get(cache_key))
+
+
+class CachedTokenInvalidationTests(CachedTokenAuthenticationMixin,
+                                   TransactionTestCase):
+
+    def test_user_cached_during_the_deactivation_is_invalidated(self):
+        active_user = get_user_model().objects.get(pk=self.user.pk)
+        with transaction.atomic():
+            self.user.is_active = False
+            self.user.save()
+            # Cached by a concurrent request, which still read the active
+            # user.
+            get_token_cache().set(
+                get_token_cache_key(self.token.key), (active_user, self.token)
+            )
+
+        self.assertFalse(self.is_cached())
+        response = self.get_profile()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
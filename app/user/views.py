@@ -1,4 +1,4 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 from .serializers import UserSerializer, UserTokenSerializer
@@ -16,7 +16,6 @@ class UserTokenAPIView(ObtainAuthToken):
 class UserProfileUpdateAPIView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
 
     def get_object(self):
         return self.request.user